@@ -0,0 +1,4 @@
+"""多事件计算器基准测试
+
+    python -m benchmarks --records 5000 --people 30 --filled 10 --output bench.json
+"""
@@ -0,0 +1,211 @@
+"""在合成的历史记录上测量主要操作的耗时
+
+    python -m benchmarks --records 5000 --people 30 --filled 10 --output bench.json
+    python -m benchmarks --records 5000 --compare bench.json
+    python -m benchmarks --records 200 --people 2000 --format binary
+
+先在临时目录（或 --dir 指定的目录）中生成 history/ 和 trash/，然后在 offscreen
+平台下打开主窗口，依次测量 load_history、update_history_list、加载记录、
+update_all_totals、show_person_details 和 save_current_calculation，每项重复
+--repeat 次，结果保存为 JSON，可以与其它版本的结果比较。
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+from core.record_format import JSON_FORMAT, RECORD_FORMATS
+
+from .synthetic import generate_history
+
+
+def git_revision():
+    """当前代码的 git 版本，不在 git 仓库中时返回 None"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def summarize(samples):
+    """把一组耗时（秒）汇总为毫秒统计"""
+    samples_ms = [sample * 1000 for sample in samples]
+    return {
+        "次数": len(samples_ms),
+        "最短": min(samples_ms),
+        "中位数": statistics.median(samples_ms),
+        "平均": statistics.fmean(samples_ms),
+        "最长": max(samples_ms),
+    }
+
+
+def time_calls(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_core_benchmarks(base_dir, repeat):
+    """不需要 Qt 的部分：冷启动重建索引和读取已有索引"""
+    from core import open_storage
+    from core.history_index import INDEX_FILE_NAME
+    from core.ledger import LEDGER_FILE_NAME
+
+    history_dir = os.path.join(base_dir, "history")
+
+    def cold_load():
+        for file_name in (INDEX_FILE_NAME, LEDGER_FILE_NAME):
+            path = os.path.join(history_dir, file_name)
+            if os.path.exists(path):
+                os.remove(path)
+        open_storage(base_dir).load()
+
+    def warm_load():
+        open_storage(base_dir).load()
+
+    results = {"重建索引和账本": summarize(time_calls(cold_load, repeat))}
+    results["读取索引和账本"] = summarize(time_calls(warm_load, repeat))
+    return results
+
+
+def run_gui_benchmarks(base_dir, repeat):
+    """在 offscreen 平台下打开主窗口，测量界面上的主要操作"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtWidgets import QApplication, QMessageBox
+
+    import main
+
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    # 基准测试中不能弹出模态对话框，只打印其内容
+    QMessageBox.information = staticmethod(lambda *args, **kwargs: None)
+    QMessageBox.warning = staticmethod(lambda parent, title, text, *args: print(f"{title}: {text}"))
+
+    def process_events():
+        app.processEvents()
+
+    start = time.perf_counter()
+    window = main.ExpenseCalculator(base_dir)
+    construct_time = time.perf_counter() - start
+    window.startup_loader.flush()
+    process_events()
+    startup_time = time.perf_counter() - start
+    # 修改历史记录时不弹出确认框
+    window.confirm_history_edit = lambda: True
+
+    results = {
+        "创建窗口": summarize([construct_time]),
+        "启动到历史记录可用": summarize([startup_time]),
+        "load_history": summarize(time_calls(window.load_history, repeat)),
+        "update_history_list": summarize(time_calls(window.update_history_list, repeat)),
+    }
+
+    # 每次加载不同的记录，测量的是从磁盘加载（不在记录存储中）的情况
+    items = [window.history_list.item(i) for i in range(min(repeat, window.history_list.count()))]
+    results["加载记录"] = summarize(time_calls(
+        lambda: window.load_calculation_from_history(items.pop(0)), len(items)))
+
+    results["update_all_totals"] = summarize(time_calls(window.update_all_totals, repeat))
+
+    calc_id = window.current_calculation_id
+    people = list(window.calculations[calc_id]["人员"])
+
+    def open_person():
+        window.show_person_details(people[open_person.count % len(people)])
+        open_person.count += 1
+    open_person.count = 0
+    results["show_person_details"] = summarize(time_calls(open_person, repeat))
+    window.return_from_details()
+
+    def save():
+        window.save_current_calculation()
+        window.save_writer.flush()
+        # 保存完成后在主线程中更新索引、账本和历史记录列表
+        process_events()
+    results["save_current_calculation"] = summarize(time_calls(save, repeat))
+
+    window.close()
+    return results
+
+
+def compare(results, previous):
+    """打印与之前一次结果的中位数对比"""
+    print(f"\n与 {previous.get('版本') or '之前的结果'} 比较（中位数）:")
+    for name, current in results["结果"].items():
+        old = previous.get("结果", {}).get(name)
+        if old is None:
+            continue
+        ratio = current["中位数"] / old["中位数"] if old["中位数"] else float("inf")
+        print(f"  {name:<28} {old['中位数']:10.2f} ms -> {current['中位数']:10.2f} ms  ({ratio:.2f}x)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="多事件计算器基准测试")
+    parser.add_argument("--records", type=int, default=1000, help="记录数（默认 1000）")
+    parser.add_argument("--people", type=int, default=20, help="每期人数（默认 20）")
+    parser.add_argument("--filled", type=int, default=8, help="每人有投注的号码数（默认 8）")
+    parser.add_argument("--versions", type=int, default=1, help="有备份的记录在垃圾桶中的版本数（默认 1）")
+    parser.add_argument("--format", default=JSON_FORMAT, choices=RECORD_FORMATS,
+                        help="记录文件格式：json（默认）或 binary（紧凑格式）")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子，相同参数和种子生成相同的数据")
+    parser.add_argument("--repeat", type=int, default=5, help="每项操作的重复次数（默认 5）")
+    parser.add_argument("--dir", help="在此目录中生成数据并保留（默认使用临时目录，结束后删除）")
+    parser.add_argument("--no-gui", action="store_true", help="只运行不需要 PyQt6 的部分")
+    parser.add_argument("--output", help="把结果写入此 JSON 文件")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果比较")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    base_dir = args.dir or tempfile.mkdtemp(prefix="calculator-bench-")
+    try:
+        start = time.perf_counter()
+        generate_history(base_dir, args.records, args.people, args.filled, args.versions, seed=args.seed,
+                         record_format=args.format)
+        print(f"已生成 {args.records} 条记录（{time.perf_counter() - start:.1f} 秒）: {base_dir}")
+
+        results = run_core_benchmarks(base_dir, args.repeat)
+        if not args.no_gui:
+            results.update(run_gui_benchmarks(base_dir, args.repeat))
+    finally:
+        if not args.dir:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    report = {
+        "版本": git_revision(),
+        "时间": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "Python": platform.python_version(),
+        "平台": platform.platform(),
+        "参数": {"记录数": args.records, "每期人数": args.people, "每人号码数": args.filled,
+                 "备份版本数": args.versions, "记录格式": args.format, "种子": args.seed, "重复次数": args.repeat},
+        "结果": results,
+    }
+
+    for name, stats in results.items():
+        print(f"{name:<28} 中位数 {stats['中位数']:10.2f} ms  最短 {stats['最短']:10.2f} ms  "
+              f"最长 {stats['最长']:10.2f} ms")
+
+    if args.output:
+        from core.fileio import atomic_write_json
+        atomic_write_json(args.output, report, indent=2)
+        print(f"结果已写入 {args.output}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
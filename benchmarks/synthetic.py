@@ -0,0 +1,68 @@
+import os
+import time
+import random
+
+from core.record_format import JSON_FORMAT, write_format_setting, write_record_file
+from core.rounds import Round
+from core.versions import VersionStore
+
+# 合成记录的日期从这一天开始，每期间隔若干小时
+START_TIME = time.mktime((2024, 1, 1, 9, 0, 0, 0, 0, -1))
+
+
+def person_name(number):
+    return f"客户{number:04d}"
+
+
+def generate_round(rng, index, people, filled, name_pool):
+    """生成一期记录：people 个人，每人在 filled 个号码上有投注"""
+    date = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(START_TIME + index * 6 * 3600))
+    calc_round = Round.new(f"第 {index + 1} 期", date)
+    for number in rng.sample(range(1, name_pool + 1), min(people, name_pool)):
+        name = person_name(number)
+        calc_round.add_person(name)
+        for bet_number in rng.sample(range(1, 50), filled):
+            calc_round.set_bet(name, bet_number, float(rng.randint(1, 20) * 5))
+    calc_round.set_prize(rng.randint(1, 49), 40)
+    calc_round.settle()
+    return calc_round
+
+
+def generate_history(base_dir, records=1000, people=20, filled=8, versions=1,
+                     versioned_fraction=0.2, seed=0, record_format=JSON_FORMAT):
+    """在 base_dir 中生成 history/ 和 trash/ 目录
+
+    records 期记录，每期 people 人、每人 filled 个号码有投注；人员从一个
+    固定大小的人员池中抽取，因此同一个人会出现在很多期中。
+    versioned_fraction 比例的记录在垃圾桶中有 versions 个较早的版本（备份
+    时间为生成时，不会在启动时被当作过期版本清理掉）。record_format 为记录文件
+    的格式（JSON 或紧凑格式），同时设置为之后保存时使用的格式。
+    相同的参数和 seed 总是生成相同的数据。返回生成的记录 ID 列表。
+    """
+    rng = random.Random(seed)
+    history_dir = os.path.join(base_dir, "history")
+    trash_dir = os.path.join(base_dir, "trash")
+    for directory in (history_dir, trash_dir, os.path.join(base_dir, "templates")):
+        os.makedirs(directory, exist_ok=True)
+
+    write_format_setting(history_dir, record_format)
+    version_store = VersionStore(trash_dir)
+    now = time.time()
+    name_pool = max(people * 5, 50)
+    calc_ids = []
+    for index in range(records):
+        calc_id = f"calc_{1700000000 + index}"
+        calc_round = generate_round(rng, index, people, filled, name_pool)
+        data = calc_round.to_json()
+
+        if versions and rng.random() < versioned_fraction:
+            # 较早的版本：只有一部分人员、开奖号码不同
+            for version in range(versions):
+                old_data = dict(data)
+                old_data["人员"] = data["人员"][:max(1, len(data["人员"]) * (version + 1) // (versions + 1))]
+                old_data["开奖设置"] = {"中奖号码": rng.randint(1, 49), "赔率": 40}
+                version_store.add_version(calc_id, old_data, now - (versions - version) * 60)
+
+        write_record_file(os.path.join(history_dir, f"{calc_id}.json"), calc_round.record, record_format)
+        calc_ids.append(calc_id)
+    return calc_ids
@@ -0,0 +1,16 @@
+"""多事件计算器核心逻辑，不依赖 PyQt6"""
+
+from .history_index import HistoryIndex
+from .search import SearchIndex
+from .record_store import RecordStore
+from .settlement import NUMBER_COUNT, NUMBERS, BetMatrix, BetRow, liability_table, settle
+from .people import PeopleList
+from .records import record_from_json, record_to_json
+from .record_format import decode_record, encode_record, read_record_file, write_record_file
+from .rounds import Bet, Round, Settlement, new_round_id, parse_payout_rate, parse_winning_number
+from .writer import BackgroundWriter
+from .storage import JsonStorage, open_storage, save_record_file
+from .sqlite_storage import SqliteStorage
+from .journal import RecordJournal
+from .ledger import PersonLedger
+from .versions import VersionStore
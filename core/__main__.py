@@ -0,0 +1,169 @@
+"""多事件计算器命令行工具（不需要 PyQt6）
+
+    python -m core settle history/ --since 2024-01-01 --until 2024-01-31 --summary 对账.json
+    python -m core migrate
+    python -m core export -o 全部记录.csv --since 2024-01-01
+    python -m core convert --format binary
+"""
+
+import os
+import sys
+import argparse
+
+from .fileio import atomic_write_json
+from .record_format import RECORD_FORMATS
+
+
+def default_base_dir():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def default_history_dir():
+    return os.path.join(default_base_dir(), "history")
+
+
+def cmd_settle(args):
+    from .batch import settle_history, settle_storage, summarize
+    from .sqlite_storage import SQLITE_FILE_NAME
+    from .storage import open_storage
+
+    ids = set(args.ids) if args.ids else None
+    base_dir = os.path.dirname(os.path.abspath(args.history_dir))
+    if os.path.exists(os.path.join(base_dir, SQLITE_FILE_NAME)):
+        # 已迁移到 SQLite：程序读写的是数据库，history 目录中的文件不再使用
+        storage = open_storage(base_dir)
+        try:
+            results, errors = settle_storage(storage, since=args.since, until=args.until,
+                                             ids=ids, write=args.write)
+        finally:
+            storage.close()
+    elif not os.path.isdir(args.history_dir):
+        print(f"找不到历史记录目录: {args.history_dir}", file=sys.stderr)
+        return 1
+    else:
+        results, errors = settle_history(args.history_dir, since=args.since, until=args.until,
+                                         ids=ids, write=args.write, workers=args.workers)
+    summary = summarize(results)
+
+    for calc_id, error in errors:
+        print(f"结算 {calc_id} 时出错: {error}", file=sys.stderr)
+    changed = sum(1 for result in results if result["已修改"])
+    print(f"已结算 {summary['记录数']} 条记录（{'已写回' if args.write else '需要更新'} {changed} 条，出错 {len(errors)} 条）")
+    print(f"总投注额: {summary['总投注额']:.2f}  总派彩额: {summary['总派彩额']:.2f}  商家盈亏: {summary['商家盈亏']:.2f}")
+
+    if args.summary:
+        atomic_write_json(args.summary, {
+            "总览": summary,
+            "记录": results,
+            "错误": [{"ID": calc_id, "错误": error} for calc_id, error in errors]
+        }, indent=2)
+        print(f"汇总已写入 {args.summary}")
+    return 1 if errors else 0
+
+
+def cmd_migrate(args):
+    from .migrate import migrate_to_sqlite
+
+    try:
+        counts, errors = migrate_to_sqlite(args.base_dir, args.db, args.force)
+    except FileExistsError as e:
+        print(f"{e}（使用 --force 重新迁移）", file=sys.stderr)
+        return 1
+
+    for calc_id, error in errors:
+        print(f"迁移 {calc_id} 时出错: {error}", file=sys.stderr)
+    print(f"已导入 {counts['记录']} 条记录、{counts['模板']} 个模板、{counts['备份版本']} 个备份版本")
+    return 1 if errors else 0
+
+
+def cmd_export(args):
+    from .batch import select_records
+    from .csv_io import iter_export_rows, iter_stored_records, write_csv
+    from .storage import open_storage
+
+    storage = open_storage(args.base_dir)
+    try:
+        # 只需要索引来筛选记录，记录内容在写出时逐条读取
+        storage.index.load()
+        selected = select_records(storage.index, args.since, args.until, set(args.ids) if args.ids else None)
+        errors = []
+        count = write_csv(args.output, iter_export_rows(iter_stored_records(storage, selected, errors)))
+    finally:
+        storage.close()
+
+    for calc_id, error in errors:
+        print(f"导出 {calc_id} 时出错: {error}", file=sys.stderr)
+    if args.output != "-":
+        print(f"已导出 {len(selected) - len(errors)} 条记录（{count} 行）到 {args.output}")
+    return 1 if errors else 0
+
+
+def cmd_convert(args):
+    from .record_format import convert_history
+    from .storage import JsonStorage
+
+    history_dir = os.path.join(args.base_dir, "history")
+    if not os.path.isdir(history_dir):
+        print(f"找不到历史记录目录: {history_dir}", file=sys.stderr)
+        return 1
+
+    converted, errors = convert_history(history_dir, args.format)
+    for calc_id, error in errors:
+        print(f"转换 {calc_id} 时出错: {error}", file=sys.stderr)
+    # 文件大小和修改时间都变了，在这里更新索引和账本，程序启动时不必再重新读取
+    storage = JsonStorage(args.base_dir)
+    storage.load()
+    storage.close()
+    print(f"已转换 {converted} 条记录（出错 {len(errors)} 条），之后保存的记录使用 {args.format} 格式")
+    return 1 if errors else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m core", description="多事件计算器命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    settle_parser = subparsers.add_parser("settle", help="重新结算历史记录")
+    settle_parser.add_argument("history_dir", nargs="?", default=default_history_dir(),
+                               help="历史记录目录（默认为程序目录下的 history；"
+                                    "上一级目录中有 calculator.db 时结算数据库中的记录）")
+    settle_parser.add_argument("--since", help="只结算日期不早于此值的记录，如 2024-01-01")
+    settle_parser.add_argument("--until", help="只结算日期不晚于此值的记录，如 2024-01-31")
+    settle_parser.add_argument("--id", dest="ids", action="append", help="只结算指定 ID 的记录，可重复")
+    settle_parser.add_argument("--write", action="store_true", help="把结算结果写回记录文件")
+    settle_parser.add_argument("--summary", help="把每条记录的总览和合计写入此 JSON 文件")
+    settle_parser.add_argument("-j", "--workers", type=int, default=None,
+                               help="并行进程数（默认为 CPU 核心数，使用 SQLite 时不并行）")
+    settle_parser.set_defaults(func=cmd_settle)
+
+    migrate_parser = subparsers.add_parser("migrate", help="把 history、templates、trash 导入 SQLite 数据库")
+    migrate_parser.add_argument("base_dir", nargs="?", default=default_base_dir(),
+                                help="包含 history、templates、trash 的程序目录")
+    migrate_parser.add_argument("--db", help="数据库文件路径（默认为程序目录下的 calculator.db）")
+    migrate_parser.add_argument("--force", action="store_true", help="数据库已存在时删除后重新迁移")
+    migrate_parser.set_defaults(func=cmd_migrate)
+
+    export_parser = subparsers.add_parser("export", help="把记录的投注、用户结果和总览导出为 CSV")
+    export_parser.add_argument("base_dir", nargs="?", default=default_base_dir(),
+                               help="包含 history 的程序目录（迁移后也可以读取 calculator.db）")
+    export_parser.add_argument("-o", "--output", required=True, help="输出的 CSV 文件，- 表示标准输出")
+    export_parser.add_argument("--since", help="只导出日期不早于此值的记录，如 2024-01-01")
+    export_parser.add_argument("--until", help="只导出日期不晚于此值的记录，如 2024-01-31")
+    export_parser.add_argument("--id", dest="ids", action="append", help="只导出指定 ID 的记录，可重复")
+    export_parser.set_defaults(func=cmd_export)
+
+    convert_parser = subparsers.add_parser("convert", help="把 history 中的记录转换为 JSON 或紧凑格式")
+    convert_parser.add_argument("base_dir", nargs="?", default=default_base_dir(),
+                                help="包含 history 的程序目录（程序运行时不要转换）")
+    convert_parser.add_argument("--format", required=True, choices=RECORD_FORMATS,
+                                help="binary 为紧凑格式（文件小、读取快），json 为缩进的 JSON（可以直接查看）")
+    convert_parser.set_defaults(func=cmd_convert)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
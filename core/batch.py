@@ -0,0 +1,161 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .history_index import HistoryIndex
+from .journal import SEQUENCE_KEY, RecordJournal, apply_entries
+from .records import record_to_json
+from .record_format import read_format_setting, read_record_file, write_record_file
+from .rounds import Round
+
+
+def select_records(index, since=None, until=None, ids=None):
+    """按日期范围和记录 ID 从索引中筛选记录，返回按日期排序的 ID 列表
+
+    since / until 与记录的 "日期" 按前缀比较，可以只写日期（2024-01-31）。
+    """
+    selected = []
+    for calc_id, entry in sorted(index.entries.items(), key=lambda x: x[1].get("日期", "")):
+        date = entry.get("日期", "")
+        if ids and calc_id not in ids:
+            continue
+        if since and date[:len(since)] < since:
+            continue
+        if until and date[:len(until)] > until:
+            continue
+        selected.append(calc_id)
+    return selected
+
+
+def settle_record_file(history_dir, calc_id, write=False):
+    """重新结算一条记录（在工作进程中执行）
+
+    加载记录并重放修改日志后结算；write 为 True 且结果与文件内容不同时，
+    以原子替换的方式写回（使用 history 目录设置的记录格式）并压缩修改日志。
+    返回结算摘要字典。
+    """
+    file_path = os.path.join(history_dir, f"{calc_id}.json")
+    original = record_to_json(read_record_file(file_path))
+
+    journal = RecordJournal(history_dir)
+    calc_round = Round.from_json(original)
+    entries = journal.read(calc_id)
+    if entries:
+        apply_entries(calc_round.record, entries)
+    settlement = calc_round.settle()
+
+    data = calc_round.to_json()
+    changed = data != original
+    if write and changed:
+        write_record_file(file_path, data, read_format_setting(history_dir))
+        journal.compact(calc_id, data.get(SEQUENCE_KEY, 0))
+
+    return _settle_result(calc_id, calc_round, settlement, changed)
+
+
+def settle_stored_record(storage, calc_id, write=False):
+    """通过存储（JsonStorage / SqliteStorage）重新结算一条记录
+
+    write 为 True 且结果有变化时用 storage.save_record 写回（不另存备份版本）。
+    返回与 settle_record_file 相同的结算摘要。
+    """
+    calc_round = Round(storage.load_record(calc_id))
+    original = calc_round.to_json()
+    settlement = calc_round.settle()
+    changed = calc_round.to_json() != original
+    if write and changed:
+        storage.save_record(calc_id, calc_round.record, backup=False)
+    return _settle_result(calc_id, calc_round, settlement, changed)
+
+
+def _settle_result(calc_id, calc_round, settlement, changed):
+    return {
+        "ID": calc_id,
+        "标题": calc_round.title,
+        "日期": calc_round.date,
+        "总览": settlement.summary,
+        "已修改": changed,
+    }
+
+
+def settle_history(history_dir, since=None, until=None, ids=None, write=False, workers=None):
+    """用多个进程重新结算 history 目录中的记录
+
+    workers 为 None 时使用全部 CPU 核心，为 1 时在当前进程中依次执行。
+    返回 (每条记录的结算摘要列表, 出错的 (ID, 错误信息) 列表)。
+    """
+    index = HistoryIndex(history_dir)
+    index.load()
+    selected = select_records(index, since, until, ids)
+    tasks = [(history_dir, calc_id, write) for calc_id in selected]
+
+    results = []
+    errors = []
+    if workers == 1 or len(tasks) <= 1:
+        for calc_id, result, error in map(_try_settle, tasks):
+            _collect(calc_id, result, error, results, errors)
+    elif tasks:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for calc_id, result, error in executor.map(_try_settle, tasks, chunksize=chunksize):
+                _collect(calc_id, result, error, results, errors)
+
+    # 写回的记录文件大小和修改时间变了，重新读取这些文件（索引条目还需要人员名单）
+    # 更新索引后统一保存一次
+    if write and any(result["已修改"] for result in results):
+        for result in results:
+            if result["已修改"]:
+                calc_id = result["ID"]
+                try:
+                    data = read_record_file(os.path.join(history_dir, f"{calc_id}.json"))
+                except Exception as e:
+                    errors.append((calc_id, f"更新索引时出错: {type(e).__name__}: {e}"))
+                    continue
+                index.update(calc_id, data, save=False)
+        index.save()
+    return results, errors
+
+
+def settle_storage(storage, since=None, until=None, ids=None, write=False):
+    """在当前进程中依次重新结算存储中的记录（迁移到 SQLite 后使用）
+
+    数据库连接不能在进程间共享，因此不使用多进程；写回的记录由存储更新
+    索引和账本。返回值与 settle_history 相同。
+    """
+    storage.index.load()
+    results = []
+    errors = []
+    for calc_id in select_records(storage.index, since, until, ids):
+        try:
+            result, error = settle_stored_record(storage, calc_id, write), None
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+        _collect(calc_id, result, error, results, errors)
+    return results, errors
+
+
+def _try_settle(args):
+    """工作进程中的一条任务，异常转换为错误信息返回，不影响其它记录"""
+    try:
+        return args[1], settle_record_file(*args), None
+    except Exception as e:
+        return args[1], None, f"{type(e).__name__}: {e}"
+
+
+def _collect(calc_id, result, error, results, errors):
+    if error is None:
+        results.append(result)
+    else:
+        errors.append((calc_id, error))
+
+
+def summarize(results):
+    """汇总多期的总投注额、总派彩额和商家盈亏"""
+    total_bets = sum(result["总览"]["总投注额"] for result in results)
+    total_winnings = sum(result["总览"]["总派彩额"] for result in results)
+    return {
+        "记录数": len(results),
+        "总投注额": total_bets,
+        "总派彩额": total_winnings,
+        "商家盈亏": total_bets - total_winnings
+    }
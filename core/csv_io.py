@@ -0,0 +1,190 @@
+import os
+import csv
+import sys
+import tempfile
+
+from .rounds import Round, parse_winning_number
+from .settlement import settle
+
+# 导入时可识别的表头（第一行是表头时跳过）
+PERSON_HEADERS = {"人员", "姓名", "用户", "person", "name"}
+NUMBER_HEADERS = {"号码", "number"}
+AMOUNT_HEADERS = {"金额", "投注", "投注金额", "amount"}
+
+# 导入时最多保留的错误信息条数，其余只计数
+MAX_IMPORT_ERRORS = 100
+
+# 依次尝试的文件编码（Excel 导出的 CSV 常为带 BOM 的 UTF-8 或 GBK）
+IMPORT_ENCODINGS = ("utf-8-sig", "gbk")
+
+
+class ImportResult:
+    """CSV 导入的结果：有效行数、新增人员、出错行数和前若干条错误信息"""
+
+    def __init__(self):
+        self.rows = 0
+        self.bets = 0
+        self.new_people = []
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_IMPORT_ERRORS:
+            self.errors.append(f"第 {line_number} 行: {message}")
+
+
+def _is_header(row):
+    return (len(row) >= 3 and row[0].strip().lower() in PERSON_HEADERS
+            and row[1].strip().lower() in NUMBER_HEADERS and row[2].strip().lower() in AMOUNT_HEADERS)
+
+
+def parse_bet_rows(lines, result):
+    """逐行解析 (人员, 号码, 金额)，返回 {人员: {号码: 金额}}
+
+    lines 可以是打开的文件，按行读取，内存占用只与人数 × 49 有关，与行数无关。
+    号码必须是 1-49，金额必须是正数；同一人同一号码出现多行时金额累加。
+    无效的行记入 result 并跳过。
+    """
+    bets = {}
+    for line_number, row in enumerate(csv.reader(lines), 1):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if line_number == 1 and _is_header(row):
+            continue
+        if len(row) < 3:
+            result.add_error(line_number, "需要 人员,号码,金额 三列")
+            continue
+
+        person = row[0].strip()
+        if not person:
+            result.add_error(line_number, "人员为空")
+            continue
+        number = parse_winning_number(row[1])
+        if number is None:
+            result.add_error(line_number, f"号码 {row[1].strip()!r} 不是 1-49 的整数")
+            continue
+        try:
+            amount = float(row[2].strip())
+        except ValueError:
+            amount = None
+        if amount is None or not amount > 0 or amount == float("inf"):
+            result.add_error(line_number, f"金额 {row[2].strip()!r} 不是正数")
+            continue
+
+        person_bets = bets.setdefault(person, {})
+        person_bets[number] = person_bets.get(number, 0.0) + amount
+        result.rows += 1
+    return bets
+
+
+def import_bets_csv(calc_round, file_path):
+    """把 CSV 文件中的投注导入一期记录（Round），返回 ImportResult
+
+    先完整解析文件，全部读取成功后才修改记录，读取失败时记录保持不变。
+    文件中出现的 (人员, 号码) 的金额设置为文件中的合计（覆盖原有金额，重复导入
+    同一文件结果不变），其它投注保持不变；不在 "人员" 中的人员按首次出现的
+    顺序添加。导入后需要由调用方结算并保存一次。
+    """
+    for encoding in IMPORT_ENCODINGS:
+        result = ImportResult()
+        try:
+            with open(file_path, 'r', encoding=encoding, newline='') as f:
+                bets = parse_bet_rows(f, result)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError("无法识别文件编码，请保存为 UTF-8 或 GBK 编码的 CSV")
+
+    for person, person_bets in bets.items():
+        if calc_round.add_person(person):
+            result.new_people.append(person)
+        row = calc_round.bets[person]
+        for number, amount in person_bets.items():
+            row[str(number)] = amount
+            result.bets += 1
+    return result
+
+
+# 导出的 CSV 每行一条数据，"类型" 为 投注 / 用户结果 / 总览：
+# 投注行的金额是该号码的投注金额，用户结果行是投注总额，总览行是总投注额
+EXPORT_HEADER = ["记录ID", "标题", "日期", "类型", "人员", "号码", "金额", "中奖金额", "商家盈亏", "中奖号码", "赔率"]
+
+
+def _amount(value):
+    return f"{value:.2f}"
+
+
+def iter_round_rows(calc_id, record):
+    """依次生成一期记录的投注行、每人的用户结果行和总览行
+
+    结算结果按当前数据重新计算（不修改记录），因此修改日志中尚未结算的修改
+    也会反映在导出结果中。
+    """
+    calc_round = Round(record)
+    winning_number, payout_rate = calc_round.winning_number, calc_round.payout_rate
+    results, summary = settle(calc_round.bets, winning_number, payout_rate)
+    prefix = [calc_id, calc_round.title, calc_round.date]
+
+    for bet in calc_round.iter_bets():
+        winnings = bet.amount * payout_rate if payout_rate and bet.number == winning_number else 0.0
+        yield prefix + ["投注", bet.person, bet.number, _amount(bet.amount), _amount(winnings), "", "", ""]
+    for person, person_results in results.items():
+        yield prefix + ["用户结果", person, "", _amount(person_results["投注总额"]),
+                        _amount(person_results["中奖金额"]), "", "", ""]
+    yield prefix + ["总览", "", "", _amount(summary["总投注额"]), _amount(summary["总派彩额"]),
+                    _amount(summary["商家盈亏"]), winning_number or "", payout_rate or ""]
+
+
+def iter_export_rows(records):
+    """records 为 (记录ID, 记录) 的可迭代对象（可以是逐条读取的生成器），生成全部导出行"""
+    for calc_id, record in records:
+        yield from iter_round_rows(calc_id, record)
+
+
+def iter_stored_records(storage, calc_ids, errors=None):
+    """从存储中逐条读取记录，同一时间只有一条记录在内存中
+
+    读取出错的记录跳过，(ID, 错误信息) 追加到 errors 中。
+    """
+    for calc_id in calc_ids:
+        try:
+            record = storage.load_record(calc_id)
+        except Exception as e:
+            if errors is not None:
+                errors.append((calc_id, f"{type(e).__name__}: {e}"))
+            continue
+        yield calc_id, record
+
+
+def write_csv(output, rows, header=EXPORT_HEADER):
+    """把行流式写入 CSV，返回写入的行数（不含表头）
+
+    output 为 "-" 时写到标准输出；否则先写临时文件再原子替换，写到一半出错时
+    不会留下不完整的文件。文件带 BOM，可以直接用 Excel 打开。
+    """
+    if output == "-":
+        return _write_rows(sys.stdout, rows, header)
+
+    directory = os.path.dirname(os.path.abspath(output))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".part", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8-sig', newline='') as f:
+            count = _write_rows(f, rows, header)
+        os.replace(temp_path, output)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return count
+
+
+def _write_rows(f, rows, header):
+    writer = csv.writer(f)
+    writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
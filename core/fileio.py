@@ -0,0 +1,17 @@
+import os
+import json
+import tempfile
+
+
+def atomic_write_json(file_path, data, indent=None):
+    """先写入临时文件再替换目标文件，避免写到一半时留下损坏的文件"""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".part", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+        os.replace(temp_path, file_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,181 @@
+import os
+import json
+
+from .fileio import atomic_write_json
+from .record_format import read_record_file
+from .search import SearchIndex
+
+# 索引文件名不以 .json 结尾，避免被当作历史记录扫描
+INDEX_FILE_NAME = ".index"
+INDEX_VERSION = 2
+
+
+class HistoryIndex:
+    """历史记录索引
+
+    为每条记录缓存 ID、标题、日期、人员名单、文件修改时间和大小。保存、重命名、
+    删除记录时只更新对应条目（同时更新搜索用的倒排索引），侧边栏直接从索引生成，
+    无需读取每个记录文件。
+
+    图形界面中 update / remove 传入 save=False，只修改内存并标记为未保存，
+    之后在主线程中取 pending_snapshot()，由后台线程 write_snapshot() 写入。
+    """
+
+    def __init__(self, history_dir):
+        self.history_dir = history_dir
+        self.index_path = os.path.join(history_dir, INDEX_FILE_NAME)
+        self.entries = {}
+        # 搜索用的倒排索引，第一次搜索时才建立，之后随条目一起更新
+        self.search_index = None
+        # 内存中的修改是否还没有写入索引文件
+        self.dirty = False
+
+    def load(self):
+        """读取索引文件，并与目录中的实际文件进行核对"""
+        self.entries = {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("版本") == INDEX_VERSION:
+                self.entries = data.get("记录", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取历史索引时出错，将重建索引: {e}")
+        self.dirty = False
+
+        if self.reconcile():
+            self.save()
+        self.search_index = None
+
+    def reconcile(self):
+        """只通过 stat 检查文件变化，仅对新增或已修改的文件重新解析
+
+        返回索引是否有变化。
+        """
+        changed = False
+        seen = set()
+
+        if not os.path.exists(self.history_dir):
+            changed = bool(self.entries)
+            self.entries = {}
+            return changed
+
+        with os.scandir(self.history_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.json') or not entry.is_file():
+                    continue
+                calc_id = entry.name[:-len('.json')]
+                seen.add(calc_id)
+                stat = entry.stat()
+                cached = self.entries.get(calc_id)
+                if cached and cached.get("mtime") == stat.st_mtime and cached.get("size") == stat.st_size:
+                    continue
+                try:
+                    data = read_record_file(entry.path)
+                except Exception as e:
+                    print(f"读取历史记录文件 {entry.name} 时出错: {e}")
+                    continue
+                self.entries[calc_id] = self._make_entry(data, stat)
+                changed = True
+
+        for calc_id in list(self.entries):
+            if calc_id not in seen:
+                del self.entries[calc_id]
+                changed = True
+
+        return changed
+
+    def save(self):
+        """将索引写回磁盘"""
+        self.write_snapshot(self.snapshot())
+
+    def snapshot(self):
+        """取得要写入索引文件的内容，并清除未保存标记
+
+        条目只会被整体替换，不会原地修改，复制外层的字典后即可交给后台线程写入。
+        """
+        self.dirty = False
+        return {"版本": INDEX_VERSION, "记录": dict(self.entries)}
+
+    def pending_snapshot(self):
+        """有未保存的修改时返回 snapshot()，否则返回 None"""
+        return self.snapshot() if self.dirty else None
+
+    def write_snapshot(self, snapshot):
+        """写入 snapshot() 的结果（可在后台线程中调用）"""
+        try:
+            atomic_write_json(self.index_path, snapshot)
+        except Exception as e:
+            print(f"保存历史索引时出错: {e}")
+
+    def update(self, calc_id, data, file_path=None, save=True):
+        """记录被保存或重命名后更新对应条目
+
+        批量更新时可传入 save=False，最后再调用一次 save()（或由调用方稍后
+        写入 pending_snapshot()）。
+        """
+        if file_path is None:
+            file_path = os.path.join(self.history_dir, f"{calc_id}.json")
+        try:
+            stat = os.stat(file_path)
+        except OSError as e:
+            print(f"更新历史索引时无法读取文件信息 {calc_id}: {e}")
+            return
+        self.entries[calc_id] = self._make_entry(data, stat)
+        if self.search_index is not None:
+            self.search_index.add(calc_id, self.entries[calc_id])
+        if save:
+            self.save()
+        else:
+            self.dirty = True
+
+    def remove(self, calc_id, save=True):
+        """记录被删除后移除对应条目"""
+        if self.search_index is not None:
+            self.search_index.remove(calc_id)
+        if self.entries.pop(calc_id, None) is not None:
+            if save:
+                self.save()
+            else:
+                self.dirty = True
+
+    def get(self, calc_id):
+        return self.entries.get(calc_id)
+
+    def __contains__(self, calc_id):
+        return calc_id in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def sorted_entries(self):
+        """按日期排序（最新的在前面），返回 (calc_id, 条目) 列表"""
+        return sorted(self.entries.items(), key=lambda x: x[1].get("日期", ""), reverse=True)
+
+    def search(self, query):
+        """按标题、日期和人员名搜索，返回与 sorted_entries 相同格式的列表
+
+        查询为空时返回全部记录。
+        """
+        if not query.strip():
+            return self.sorted_entries()
+        if self.search_index is None:
+            self.search_index = SearchIndex()
+            self.search_index.rebuild(self.entries)
+        ids = self.search_index.search(query)
+        if ids is None:
+            return self.sorted_entries()
+        return sorted(((calc_id, self.entries[calc_id]) for calc_id in ids if calc_id in self.entries),
+                      key=lambda x: x[1].get("日期", ""), reverse=True)
+
+    @staticmethod
+    def _make_entry(data, stat):
+        date = data.get("日期", "未知日期")
+        return {
+            "标题": data.get("标题", f"计算 {date}"),
+            "日期": date,
+            "人员": list(data.get("人员", [])),
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+        }
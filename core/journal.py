@@ -0,0 +1,154 @@
+import os
+import json
+import threading
+import time
+
+from .rounds import Round
+
+# 记录中保存“快照已包含到第几条日志”的字段
+SEQUENCE_KEY = "日志序号"
+
+# 修改日志累计到这么多条后，把记录重新完整保存一次并压缩日志
+DEFAULT_COMPACT_THRESHOLD = 200
+
+
+def journal_path(history_dir, calc_id):
+    return os.path.join(history_dir, f"{calc_id}.journal")
+
+
+def bet_entry(person, number, amount):
+    """某人某号码的投注金额被改为 amount（0 表示取消）"""
+    return {"op": "bet", "p": person, "n": int(number), "v": float(amount)}
+
+
+def add_person_entry(person):
+    return {"op": "add", "p": person}
+
+
+def delete_person_entry(person):
+    return {"op": "del", "p": person}
+
+
+def apply_entries(record, entries):
+    """按顺序把日志条目重放到记录上，跳过快照中已包含的条目
+
+    record 应是 record_from_json 转换后的内存记录。
+    """
+    calc_round = Round(record)
+    last_seq = record.get(SEQUENCE_KEY, 0)
+
+    for entry in entries:
+        seq = entry.get("s", 0)
+        if seq <= last_seq:
+            continue
+        op = entry.get("op")
+        person = entry.get("p")
+        if op == "bet":
+            # 有投注的人一定属于本期人员
+            calc_round.set_bet(person, entry["n"], entry["v"])
+        elif op == "add":
+            calc_round.add_person(person)
+        elif op == "del":
+            calc_round.remove_person(person)
+        last_seq = seq
+
+    record[SEQUENCE_KEY] = last_seq
+    record["人数"] = len(calc_round.people)
+    return record
+
+
+class RecordJournal:
+    """记录的追加式修改日志
+
+    每条记录一个 {calc_id}.journal 文件，每行是一条 JSON（序号、时间、
+    人员、号码、新金额等）。单笔修改只追加一行，不再重写整个记录文件；
+    记录完整保存后，快照中已包含的条目会被压缩掉。崩溃后重新加载记录时
+    重放快照之后的条目即可恢复。
+    """
+
+    def __init__(self, history_dir, compact_threshold=DEFAULT_COMPACT_THRESHOLD):
+        self.history_dir = history_dir
+        self.compact_threshold = compact_threshold
+        # 追加（主线程）和压缩（后台保存线程）共用一把锁
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def append(self, record, calc_id, entries):
+        """为条目分配序号并追加到日志文件，同时更新记录中的序号"""
+        seq = record.get(SEQUENCE_KEY, 0)
+        now = time.time()
+        lines = []
+        for entry in entries:
+            seq += 1
+            lines.append(json.dumps(dict(entry, s=seq, t=now), ensure_ascii=False))
+        if not lines:
+            return
+        with self._lock:
+            with open(journal_path(self.history_dir, calc_id), 'a', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+            self._counts[calc_id] = self._counts.get(calc_id, 0) + len(lines)
+        record[SEQUENCE_KEY] = seq
+
+    def read(self, calc_id):
+        """读取日志条目
+
+        崩溃时写了一半的最后一行会被忽略并从文件中截掉，之后的追加不会受影响。
+        """
+        entries = []
+        path = journal_path(self.history_dir, calc_id)
+        with self._lock:
+            if not os.path.exists(path):
+                self._counts[calc_id] = 0
+                return entries
+            with open(path, 'rb') as f:
+                data = f.read()
+            valid_end = 0
+            for line in data.splitlines(keepends=True):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+                valid_end += len(line)
+            if valid_end < len(data):
+                with open(path, 'r+b') as f:
+                    f.truncate(valid_end)
+            self._counts[calc_id] = len(entries)
+        return entries
+
+    def needs_compaction(self, calc_id):
+        return self._counts.get(calc_id, 0) >= self.compact_threshold
+
+    def compact(self, calc_id, upto_seq):
+        """删除序号不大于 upto_seq 的条目（这些修改已写入记录快照）"""
+        path = journal_path(self.history_dir, calc_id)
+        with self._lock:
+            if not os.path.exists(path):
+                return
+            remaining = []
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    if entry.get("s", 0) > upto_seq:
+                        remaining.append(line if line.endswith("\n") else line + "\n")
+            if remaining:
+                temp_path = path + ".part"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    f.writelines(remaining)
+                os.replace(temp_path, path)
+            else:
+                os.remove(path)
+            self._counts[calc_id] = len(remaining)
+
+    def remove(self, calc_id):
+        """丢弃记录的全部日志（删除或恢复记录时）"""
+        path = journal_path(self.history_dir, calc_id)
+        with self._lock:
+            if os.path.exists(path):
+                os.remove(path)
+            self._counts.pop(calc_id, None)
@@ -0,0 +1,192 @@
+import os
+import json
+
+from .fileio import atomic_write_json
+from .journal import apply_entries
+from .rounds import Round
+
+# 账本文件名不以 .json 结尾，避免被当作历史记录扫描
+LEDGER_FILE_NAME = ".ledger"
+LEDGER_VERSION = 1
+
+
+def _in_range(date, since=None, until=None):
+    """日期与 since / until 按前缀比较，可以只写年月（2024-01）或日期（2024-01-31）"""
+    if since and date[:len(since)] < since:
+        return False
+    if until and date[:len(until)] > until:
+        return False
+    return True
+
+
+class PersonLedger:
+    """跨期的每人账本
+
+    为每条记录保存其日期、文件修改时间和每个人的投注总额、中奖金额（来自
+    "用户结果"），并在内存中按人员、按天汇总。记录保存或删除时只增减这一期的
+    贡献；启动时与历史索引核对，只重新读取修改时间发生变化的记录。
+
+    图形界面中 update / remove 传入 save=False，只修改内存并标记为未保存，
+    之后在主线程中取 pending_snapshot()，由后台线程 write_snapshot() 写入，
+    连续保存多条记录时账本文件只重写一次。
+    """
+
+    def __init__(self, history_dir, index, journal=None):
+        self.history_dir = history_dir
+        self.index = index
+        self.journal = journal
+        self.ledger_path = os.path.join(history_dir, LEDGER_FILE_NAME)
+        self.rounds = {}
+        # 人员 -> {日期(天): [投注总额, 中奖金额, 期数]}
+        self._days = {}
+        # 内存中的修改是否还没有写入账本文件
+        self.dirty = False
+
+    def load(self):
+        """读取账本文件，并与历史索引进行核对"""
+        self.rounds = {}
+        try:
+            with open(self.ledger_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("版本") == LEDGER_VERSION:
+                self.rounds = data.get("记录", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取账本时出错，将重建账本: {e}")
+        self.dirty = False
+
+        changed = self.reconcile()
+        self._days = {}
+        for calc_id in self.rounds:
+            self._apply(calc_id, 1)
+        if changed:
+            self.save()
+
+    def reconcile(self):
+        """按索引中的修改时间找出新增、修改和删除的记录，返回账本是否有变化"""
+        changed = False
+        for calc_id in list(self.rounds):
+            if calc_id not in self.index:
+                del self.rounds[calc_id]
+                changed = True
+
+        for calc_id, entry in self.index.entries.items():
+            cached = self.rounds.get(calc_id)
+            if cached and cached.get("mtime") == entry.get("mtime"):
+                continue
+            try:
+                calc_round = self._read_round(calc_id)
+            except Exception as e:
+                print(f"读取历史记录 {calc_id} 的结果时出错: {e}")
+                continue
+            self.rounds[calc_id] = self._make_round(calc_round.record, entry.get("mtime"))
+            changed = True
+        return changed
+
+    def save(self):
+        """将账本写回磁盘"""
+        self.write_snapshot(self.snapshot())
+
+    def snapshot(self):
+        """取得要写入账本文件的内容，并清除未保存标记
+
+        每一期的条目只会被整体替换，不会原地修改，复制外层的字典后即可
+        交给后台线程写入。
+        """
+        self.dirty = False
+        return {"版本": LEDGER_VERSION, "记录": dict(self.rounds)}
+
+    def pending_snapshot(self):
+        """有未保存的修改时返回 snapshot()，否则返回 None"""
+        return self.snapshot() if self.dirty else None
+
+    def write_snapshot(self, snapshot):
+        """写入 snapshot() 的结果（可在后台线程中调用）"""
+        try:
+            atomic_write_json(self.ledger_path, snapshot)
+        except Exception as e:
+            print(f"保存账本时出错: {e}")
+
+    def _changed(self, save):
+        if save:
+            self.save()
+        else:
+            self.dirty = True
+
+    def update(self, calc_id, record, save=True):
+        """记录保存后用其 "用户结果" 替换这一期在账本中的贡献
+
+        save=False 时只标记为未保存，由调用方稍后写入（见 pending_snapshot）。
+        """
+        entry = self.index.get(calc_id) or {}
+        if calc_id in self.rounds:
+            self._apply(calc_id, -1)
+        self.rounds[calc_id] = self._make_round(record, entry.get("mtime"))
+        self._apply(calc_id, 1)
+        self._changed(save)
+
+    def remove(self, calc_id, save=True):
+        """记录被删除后去掉这一期的贡献"""
+        if calc_id in self.rounds:
+            self._apply(calc_id, -1)
+            del self.rounds[calc_id]
+            self._changed(save)
+
+    def people(self):
+        return sorted(self._days)
+
+    def query(self, since=None, until=None, people=None):
+        """按日期范围汇总每个人的投注总额、中奖金额、盈亏（中奖减投注）和期数"""
+        summary = {}
+        for person in (people if people is not None else self._days):
+            total_bet = total_win = 0.0
+            count = 0
+            for day, (bet, win, rounds) in self._days.get(person, {}).items():
+                if _in_range(day, since, until):
+                    total_bet += bet
+                    total_win += win
+                    count += rounds
+            if count:
+                summary[person] = {
+                    "投注总额": total_bet,
+                    "中奖金额": total_win,
+                    "盈亏": total_win - total_bet,
+                    "期数": count
+                }
+        return summary
+
+    def _read_round(self, calc_id):
+        calc_round = Round.load(os.path.join(self.history_dir, f"{calc_id}.json"))
+        if self.journal is not None:
+            entries = self.journal.read(calc_id)
+            if entries:
+                apply_entries(calc_round.record, entries)
+        calc_round.settle()
+        return calc_round
+
+    @staticmethod
+    def _make_round(record, mtime):
+        return {
+            "日期": record.get("日期", ""),
+            "mtime": mtime,
+            "结果": {
+                person: [results.get("投注总额", 0.0), results.get("中奖金额", 0.0)]
+                for person, results in record.get("用户结果", {}).items()
+            }
+        }
+
+    def _apply(self, calc_id, sign):
+        """把一期的结果加入（sign=1）或移出（sign=-1）按天汇总"""
+        entry = self.rounds[calc_id]
+        day = entry.get("日期", "")[:10]
+        for person, (bet, win) in entry.get("结果", {}).items():
+            days = self._days.setdefault(person, {})
+            bucket = days.setdefault(day, [0.0, 0.0, 0])
+            bucket[0] += sign * bet
+            bucket[1] += sign * win
+            bucket[2] += sign
+            if bucket[2] <= 0:
+                del days[day]
+                if not days:
+                    del self._days[person]
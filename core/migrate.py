@@ -0,0 +1,65 @@
+import os
+
+from .records import record_to_json
+from .storage import JsonStorage
+from .sqlite_storage import SQLITE_FILE_NAME, SqliteStorage
+
+
+def migrate_to_sqlite(base_dir, db_path=None, force=False):
+    """把 history/、templates/、trash/ 中的数据一次性导入 SQLite 数据库
+
+    原有的文件不会被修改或删除。数据库已存在时需要 force=True（会先删除旧数据库）。
+    返回 (数量, 出错的 (ID, 错误信息) 列表)，数量为 {"记录", "模板", "备份版本"}
+    三项导入数量的字典。
+    """
+    db_path = db_path or os.path.join(base_dir, SQLITE_FILE_NAME)
+    if os.path.exists(db_path):
+        if not force:
+            raise FileExistsError(f"数据库已存在: {db_path}")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    source = JsonStorage(base_dir)
+    source.index.load()
+    target = SqliteStorage(base_dir, db_path)
+    counts = {"记录": 0, "模板": 0, "备份版本": 0}
+    errors = []
+
+    try:
+        with target.transaction() as conn:
+            for calc_id in source.index.entries:
+                try:
+                    # 读取时会重放修改日志
+                    record = source.load_record(calc_id)
+                except Exception as e:
+                    errors.append((calc_id, f"{type(e).__name__}: {e}"))
+                    continue
+                target.write_json(conn, calc_id, record_to_json(record))
+                counts["记录"] += 1
+
+            for template_name, template_data in source.load_templates().items():
+                target.write_template(conn, template_name, template_data)
+                counts["模板"] += 1
+
+            # 版本历史和旧格式的整份备份按时间顺序重新编号
+            backups = []
+            for calc_id in source.versions.record_ids():
+                for entry in source.versions.versions(calc_id):
+                    backups.append((calc_id, entry["时间"], entry["版本"], None))
+            for file_name, calc_id, mod_time in source.legacy_backups():
+                backups.append((calc_id, mod_time, None, file_name))
+            for calc_id, timestamp, version, file_name in sorted(backups, key=lambda x: (x[0], x[1])):
+                try:
+                    if file_name is None:
+                        data = source.versions.get(calc_id, version)
+                    else:
+                        data = source.read_legacy_backup(file_name)
+                    target.versions.insert(conn, calc_id, data, timestamp)
+                except Exception as e:
+                    errors.append((calc_id, f"{type(e).__name__}: {e}"))
+                    continue
+                counts["备份版本"] += 1
+    finally:
+        target.close()
+    return counts, errors
@@ -0,0 +1,93 @@
+from collections.abc import Sequence
+
+
+class PeopleList(Sequence):
+    """一期记录的人员名单：保持加入顺序，人名不重复
+
+    内部用（有序的）dict 保存人名，判断人员是否存在、添加和删除都是 O(1)，
+    不再逐个比较列表中的人名。按位置取人名时使用缓存的列表，名单有变化时
+    才重新生成，因此按下标遍历仍是 O(n)。保持 list 的
+    常用接口（in、迭代、len、append、remove、与列表比较），因此可以直接
+    替代记录中原来的 "人员" 列表；保存时由 record_to_json 转换回列表。
+    """
+
+    __slots__ = ("_names", "_list")
+
+    def __init__(self, names=()):
+        self._names = dict.fromkeys(names)
+        # 按位置访问用的列表，名单修改后置为 None
+        self._list = None
+
+    def _as_list(self):
+        if self._list is None:
+            self._list = list(self._names)
+        return self._list
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __reversed__(self):
+        return reversed(self._as_list())
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, index):
+        return self._as_list()[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (PeopleList, list, tuple)):
+            return len(self) == len(other) and self._as_list() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def append(self, name):
+        """把人员加到末尾，已存在时不变，返回是否为新添加的人员"""
+        if name in self._names:
+            return False
+        self._names[name] = None
+        self._list = None
+        return True
+
+    def extend(self, names):
+        for name in names:
+            self.append(name)
+
+    def remove(self, name):
+        """删除人员，不存在时与 list.remove 一样抛出 ValueError"""
+        try:
+            del self._names[name]
+        except KeyError:
+            raise ValueError(f"{name!r} 不在人员名单中")
+        self._list = None
+
+    def discard(self, name):
+        """删除人员，返回是否存在"""
+        if name not in self._names:
+            return False
+        del self._names[name]
+        self._list = None
+        return True
+
+    def copy(self):
+        people = PeopleList()
+        people._names = dict(self._names)
+        return people
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __repr__(self):
+        return f"PeopleList({self._as_list()!r})"
+
+    @classmethod
+    def from_json(cls, data):
+        """从记录 JSON 中的 "人员" 列表构建，重复的人名只保留第一次出现的位置"""
+        return cls(data if isinstance(data, (list, tuple, PeopleList)) else ())
+
+    def to_json(self):
+        return list(self._names)
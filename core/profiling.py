@@ -0,0 +1,187 @@
+import os
+import time
+import cProfile
+import threading
+import functools
+
+from .fileio import atomic_write_json
+
+# 设置为 1 时开启性能分析模式，只记录耗时
+PROFILE_ENV_VAR = "CALCULATOR_PROFILE"
+# 设置为目录时还会把每次操作的 cProfile 结果保存到该目录
+PROFILE_DIR_ENV_VAR = "CALCULATOR_PROFILE_DIR"
+# 分析目录中的耗时汇总文件
+REPORT_FILE_NAME = "timings.json"
+
+
+def _file_name(name):
+    """操作名称转换为可用作文件名的形式"""
+    return "".join("_" if c in '<>:"/\\|?* ' else c for c in name)
+
+
+class Profiler:
+    """性能分析模式
+
+    关闭时 measure() 几乎没有开销。开启后记录启动各阶段和主要操作（加载记录、
+    打开人员、保存、结算）的实际耗时并打印出来；设置了 output_dir 时还会对每次
+    操作运行 cProfile，把结果保存为 output_dir 中的 .prof 文件（可以用
+    python -m pstats 或 snakeviz 查看），程序退出时写入耗时汇总 timings.json。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.output_dir = None
+        # (操作名称, 开始时间, 耗时秒数)
+        self.timings = []
+        # 进程启动时间的近似值，启动阶段的时间点相对于它计算
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._sequence = 0
+        # 同一时间只能有一个 cProfile 在运行，嵌套或并发的操作只记录耗时
+        self._cprofile_active = False
+
+    def configure(self, enabled=True, output_dir=None):
+        self.enabled = enabled or output_dir is not None
+        self.output_dir = output_dir
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def configure_from_env(self, environ=None):
+        """按环境变量开启性能分析模式"""
+        environ = os.environ if environ is None else environ
+        output_dir = environ.get(PROFILE_DIR_ENV_VAR) or None
+        enabled = environ.get(PROFILE_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on")
+        if enabled or output_dir:
+            self.configure(True, output_dir)
+
+    def measure(self, name):
+        """记录一段代码耗时的上下文管理器"""
+        if not self.enabled:
+            return _NULL_MEASUREMENT
+        return _Measurement(self, name)
+
+    def profiled(self, name):
+        """记录函数每次调用耗时的装饰器"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Measurement(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def call(self, name, func, *args):
+        """调用 func 并记录耗时，可以提交给后台线程执行"""
+        with self.measure(name):
+            return func(*args)
+
+    def mark(self, name):
+        """记录从进程启动到现在的时间，用于"窗口已显示"这类时间点"""
+        if self.enabled:
+            self.record(name, self.started, time.perf_counter() - self.started)
+
+    def record(self, name, start, elapsed):
+        with self._lock:
+            self.timings.append((name, start - self.started, elapsed))
+        print(f"[性能] {name}: {elapsed * 1000:.1f} ms")
+
+    def summary(self):
+        """按操作名称汇总，返回 {名称: {次数, 总耗时, 平均耗时, 最长耗时}}（毫秒）"""
+        summary = {}
+        with self._lock:
+            timings = list(self.timings)
+        for name, _, elapsed in timings:
+            item = summary.setdefault(name, {"次数": 0, "总耗时": 0.0, "平均耗时": 0.0, "最长耗时": 0.0})
+            item["次数"] += 1
+            item["总耗时"] += elapsed * 1000
+            item["最长耗时"] = max(item["最长耗时"], elapsed * 1000)
+        for item in summary.values():
+            item["平均耗时"] = item["总耗时"] / item["次数"]
+        return summary
+
+    def save_report(self):
+        """打印耗时汇总；设置了分析目录时同时写入 timings.json，返回写入的路径"""
+        if not self.enabled:
+            return None
+        summary = self.summary()
+        for name, item in summary.items():
+            print(f"[性能] {name}: {item['次数']} 次，平均 {item['平均耗时']:.1f} ms，最长 {item['最长耗时']:.1f} ms")
+        if self.output_dir is None:
+            return None
+
+        report_path = os.path.join(self.output_dir, REPORT_FILE_NAME)
+        with self._lock:
+            timings = [{"操作": name, "开始": start * 1000, "耗时": elapsed * 1000}
+                       for name, start, elapsed in self.timings]
+        try:
+            atomic_write_json(report_path, {"汇总": summary, "记录": timings}, indent=2)
+        except Exception as e:
+            print(f"保存性能分析结果时出错: {e}")
+            return None
+        return report_path
+
+    def _start_cprofile(self):
+        if self.output_dir is None:
+            return None
+        with self._lock:
+            if self._cprofile_active:
+                return None
+            self._cprofile_active = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 已有其它分析工具在运行
+            with self._lock:
+                self._cprofile_active = False
+            return None
+        return profile
+
+    def _finish_cprofile(self, profile, name):
+        profile.disable()
+        with self._lock:
+            self._cprofile_active = False
+            self._sequence += 1
+            sequence = self._sequence
+        try:
+            profile.dump_stats(os.path.join(self.output_dir, f"{sequence:04d}_{_file_name(name)}.prof"))
+        except Exception as e:
+            print(f"保存 cProfile 结果时出错: {e}")
+
+
+class _Measurement:
+    __slots__ = ("profiler", "name", "start", "profile")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profile = self.profiler._start_cprofile()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if self.profile is not None:
+            self.profiler._finish_cprofile(self.profile, self.name)
+        self.profiler.record(self.name, self.start, elapsed)
+        return False
+
+
+class _NullMeasurement:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_MEASUREMENT = _NullMeasurement()
+
+# 程序共用的性能分析器，由 main.py 按命令行参数或环境变量开启
+profiler = Profiler()
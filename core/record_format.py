@@ -0,0 +1,275 @@
+import os
+import sys
+import json
+import zlib
+import struct
+import tempfile
+from array import array
+
+from .fileio import atomic_write_json
+from .records import record_to_json
+from .settlement import NUMBER_COUNT, BetMatrix
+
+# 记录文件的两种格式：缩进的 JSON（默认，可以直接用文本编辑器查看）和紧凑格式。
+# 文件名都是 {calc_id}.json，读取时按文件开头识别格式，切换格式只需原子替换文件
+JSON_FORMAT = "json"
+BINARY_FORMAT = "binary"
+RECORD_FORMATS = (JSON_FORMAT, BINARY_FORMAT)
+
+# history 目录中记录新保存时使用的格式，不以 .json 结尾，避免被当作历史记录扫描
+FORMAT_FILE_NAME = ".format"
+
+# 紧凑格式的固定文件头：
+#   魔数、格式版本、标志、人名表字节数、人名数、"人员" 人数、"数据" 行数、
+#   "用户结果" 人数、其余字段（JSON）字节数
+# 之后依次为：人名表（UTF-8，以 \0 分隔）、"人员"、"数据" 各行、"用户结果"
+# 各人在人名表中的序号（uint32），"数据" 每行 49 个 float64，每行的合计和
+# 49 个号码的合计（float64，读取时不必重新求和），"用户结果" 每人
+# (投注总额, 中奖金额) 两个 float64，最后是其余字段的 JSON。
+# 同一个人名在人名表中只出现一次。数值一律为小端序。
+MAGIC = b"CALB"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHIIIIII")
+# 标志位：文件头之后的内容经过 zlib 压缩（未投注的号码为 0，压缩后几乎不占空间）；
+# "用户结果" 已打包（否则保存在其余字段的 JSON 中）
+FLAG_ZLIB = 1
+FLAG_RESULTS = 2
+COMPRESS_LEVEL = 1
+
+RESULT_KEYS = ("投注总额", "中奖金额")
+
+
+def _to_little_endian(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _packable_results(results):
+    """"用户结果" 只有投注总额和中奖金额两个数值时才打包，否则原样保存在 JSON 中"""
+    if not isinstance(results, dict):
+        return False
+    for value in results.values():
+        if not isinstance(value, dict) or len(value) != len(RESULT_KEYS):
+            return False
+        for key in RESULT_KEYS:
+            amount = value.get(key)
+            if not isinstance(amount, (int, float)) or isinstance(amount, bool):
+                return False
+    return True
+
+
+def encode_record(record):
+    """把记录编码为紧凑格式
+
+    record 的 "数据" 可以是 BetMatrix 或 JSON 中的字典。人名不是字符串或含有
+    \\0 等无法编码的内容时抛出 ValueError，调用方可以改用 JSON 保存。
+    """
+    bets = record.get("数据")
+    if not isinstance(bets, BetMatrix):
+        bets = BetMatrix.from_json(bets or {})
+    people = record.get("人员", [])
+    results = record.get("用户结果")
+    pack_results = _packable_results(results)
+
+    names = []
+    name_ids = {}
+
+    def intern(name):
+        name_id = name_ids.get(name)
+        if name_id is None:
+            if not isinstance(name, str) or "\0" in name:
+                raise ValueError(f"人名无法保存为紧凑格式: {name!r}")
+            name_id = name_ids[name] = len(names)
+            names.append(name)
+        return name_id
+
+    people_ids = array('I', (intern(name) for name in people))
+    row_names = list(bets.rows)
+    row_ids = array('I', (intern(name) for name in row_names))
+    values = array('d')
+    row_totals = array('d')
+    for name in row_names:
+        row = bets.rows[name]
+        values.extend(bets.values[row * NUMBER_COUNT:(row + 1) * NUMBER_COUNT])
+        row_totals.append(bets.row_totals[row])
+
+    result_ids = array('I')
+    result_values = array('d')
+    if pack_results:
+        for name, result in results.items():
+            result_ids.append(intern(name))
+            result_values.append(float(result["投注总额"]))
+            result_values.append(float(result["中奖金额"]))
+
+    # 打包的字段在 JSON 中留一个占位，读取时按原来的字段顺序还原
+    meta = {}
+    for key, value in record.items():
+        if key in ("人员", "数据") or (key == "用户结果" and pack_results):
+            meta[key] = None
+        else:
+            meta[key] = value
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    names_bytes = "\0".join(names).encode('utf-8')
+
+    body = b"".join((names_bytes, _to_little_endian(people_ids), _to_little_endian(row_ids),
+                     _to_little_endian(result_ids), _to_little_endian(values), _to_little_endian(row_totals),
+                     _to_little_endian(bets.column_totals), _to_little_endian(result_values), meta_bytes))
+    flags = FLAG_ZLIB | (FLAG_RESULTS if pack_results else 0)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, flags, len(names_bytes), len(names), len(people_ids),
+                         len(row_ids), len(result_ids), len(meta_bytes))
+    return header + zlib.compress(body, COMPRESS_LEVEL)
+
+
+def decode_record(data):
+    """解码紧凑格式，返回内存中的记录（"数据" 为 BetMatrix）
+
+    文件头不对、版本高于当前程序支持的版本或内容不完整时抛出 ValueError。
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("记录文件不完整")
+    (magic, version, flags, names_length, name_count, people_count, row_count,
+     result_count, meta_length) = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("不是紧凑格式的记录文件")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"记录文件格式版本 {version} 高于程序支持的版本 {FORMAT_VERSION}，请升级程序")
+
+    body = data[HEADER.size:]
+    if flags & FLAG_ZLIB:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error as e:
+            raise ValueError(f"记录文件已损坏: {e}")
+
+    sizes = (names_length, 4 * people_count, 4 * row_count, 4 * result_count,
+             8 * NUMBER_COUNT * row_count, 8 * row_count, 8 * NUMBER_COUNT, 16 * result_count, meta_length)
+    if len(body) != sum(sizes):
+        raise ValueError("记录文件已损坏：内容长度与文件头不符")
+    sections = []
+    offset = 0
+    for size in sizes:
+        sections.append(body[offset:offset + size])
+        offset += size
+    (names_bytes, people_bytes, rows_bytes, results_bytes, values_bytes, row_totals_bytes, column_totals_bytes,
+     result_values_bytes, meta_bytes) = sections
+
+    names = names_bytes.decode('utf-8').split("\0") if name_count else []
+    if len(names) != name_count:
+        raise ValueError("记录文件已损坏：人名表与文件头不符")
+    try:
+        people = [names[i] for i in _from_little_endian('I', people_bytes)]
+        row_names = [names[i] for i in _from_little_endian('I', rows_bytes)]
+        result_names = [names[i] for i in _from_little_endian('I', results_bytes)]
+    except IndexError:
+        raise ValueError("记录文件已损坏：人名序号超出人名表")
+
+    record = json.loads(meta_bytes.decode('utf-8'))
+    record["人员"] = people
+    record["数据"] = BetMatrix.from_packed(row_names, _from_little_endian('d', values_bytes),
+                                         _from_little_endian('d', row_totals_bytes),
+                                         _from_little_endian('d', column_totals_bytes))
+    if flags & FLAG_RESULTS:
+        result_values = _from_little_endian('d', result_values_bytes)
+        record["用户结果"] = {
+            name: {"投注总额": result_values[2 * i], "中奖金额": result_values[2 * i + 1]}
+            for i, name in enumerate(result_names)
+        }
+    return record
+
+
+def read_record_file(file_path):
+    """按文件开头识别格式读取记录文件
+
+    紧凑格式返回的记录 "数据" 已是 BetMatrix，JSON 返回原样的字典；需要内存
+    中的表示时用 record_from_json，需要 JSON 格式时用 record_to_json。
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] == MAGIC:
+        return decode_record(data)
+    return json.loads(data.decode('utf-8'))
+
+
+def write_record_file(file_path, record, record_format=JSON_FORMAT):
+    """以指定格式原子写入记录文件，返回实际使用的格式
+
+    记录无法保存为紧凑格式时（见 encode_record）改用 JSON。
+    """
+    if record_format == BINARY_FORMAT:
+        try:
+            data = encode_record(record)
+        except ValueError as e:
+            print(f"记录无法保存为紧凑格式，改用 JSON: {e}")
+        else:
+            _atomic_write_bytes(file_path, data)
+            return BINARY_FORMAT
+    atomic_write_json(file_path, record_to_json(record), indent=2)
+    return JSON_FORMAT
+
+
+def _atomic_write_bytes(file_path, data):
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".part", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, file_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def read_format_setting(history_dir):
+    """history 目录中记录新保存时使用的格式，没有设置时为 JSON"""
+    try:
+        with open(os.path.join(history_dir, FORMAT_FILE_NAME), 'r', encoding='utf-8') as f:
+            record_format = json.load(f).get("格式", JSON_FORMAT)
+    except FileNotFoundError:
+        return JSON_FORMAT
+    except Exception as e:
+        print(f"读取记录格式设置时出错，使用 JSON: {e}")
+        return JSON_FORMAT
+    return record_format if record_format in RECORD_FORMATS else JSON_FORMAT
+
+
+def write_format_setting(history_dir, record_format):
+    if record_format not in RECORD_FORMATS:
+        raise ValueError(f"未知的记录格式: {record_format}")
+    atomic_write_json(os.path.join(history_dir, FORMAT_FILE_NAME), {"格式": record_format})
+
+
+def convert_history(history_dir, record_format):
+    """把 history 目录中的记录转换为指定格式，并设置为之后保存时使用的格式
+
+    修改日志不受影响（记录内容不变，只是换了编码）。已经是目标格式的文件跳过。
+    返回 (转换数量, 出错的 (ID, 错误信息) 列表)。
+    """
+    write_format_setting(history_dir, record_format)
+    converted = 0
+    errors = []
+    with os.scandir(history_dir) as it:
+        file_names = sorted(entry.name for entry in it if entry.name.endswith('.json') and entry.is_file())
+    for file_name in file_names:
+        calc_id = file_name[:-len('.json')]
+        file_path = os.path.join(history_dir, file_name)
+        try:
+            with open(file_path, 'rb') as f:
+                is_binary = f.read(len(MAGIC)) == MAGIC
+            if is_binary == (record_format == BINARY_FORMAT):
+                continue
+            if write_record_file(file_path, read_record_file(file_path), record_format) == record_format:
+                converted += 1
+        except Exception as e:
+            errors.append((calc_id, f"{type(e).__name__}: {e}"))
+    return converted, errors
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+# 默认最多常驻内存的完整记录数
+DEFAULT_MAX_RESIDENT = 16
+
+
+class RecordStore(MutableMapping):
+    """按需加载记录内容的存储
+
+    侧边栏只需要索引中的标题和日期；完整记录（含每个人的 1-49 投注数据）在第一次
+    访问时才通过存储（JsonStorage / SqliteStorage）读取，并按最近最少使用（LRU）
+    的顺序最多保留 max_resident 条。
+    被固定（pin）的记录、尚未写入磁盘的新记录和正在后台保存的记录不会被淘汰。
+    """
+
+    def __init__(self, storage, max_resident=DEFAULT_MAX_RESIDENT):
+        self.storage = storage
+        self.index = storage.index
+        self.max_resident = max_resident
+        self._bodies = OrderedDict()
+        self._pinned = None
+        self._saving = set()
+
+    def pin(self, calc_id):
+        """固定当前正在使用的记录，使其不会被淘汰"""
+        self._pinned = calc_id
+        self._evict()
+
+    def mark_saving(self, calc_id):
+        """记录已提交后台保存，写完之前磁盘上的文件可能是旧版本"""
+        self._saving.add(calc_id)
+
+    def mark_saved(self, calc_id):
+        self._saving.discard(calc_id)
+        self._evict()
+
+    def header(self, calc_id):
+        """返回记录的索引条目（标题、日期等），不加载记录内容"""
+        return self.index.get(calc_id)
+
+    def is_loaded(self, calc_id):
+        return calc_id in self._bodies
+
+    def __contains__(self, calc_id):
+        return calc_id in self._bodies or calc_id in self.index
+
+    def __getitem__(self, calc_id):
+        if calc_id in self._bodies:
+            self._bodies.move_to_end(calc_id)
+            return self._bodies[calc_id]
+        if calc_id not in self.index:
+            raise KeyError(calc_id)
+        body = self.storage.load_record(calc_id)
+        self._bodies[calc_id] = body
+        self._evict()
+        return body
+
+    def __setitem__(self, calc_id, body):
+        self._bodies[calc_id] = body
+        self._bodies.move_to_end(calc_id)
+        self._evict()
+
+    def __delitem__(self, calc_id):
+        if calc_id not in self:
+            raise KeyError(calc_id)
+        self._bodies.pop(calc_id, None)
+
+    def __iter__(self):
+        for calc_id in self.index.entries:
+            yield calc_id
+        for calc_id in list(self._bodies):
+            if calc_id not in self.index:
+                yield calc_id
+
+    def __len__(self):
+        return len(self.index) + sum(1 for calc_id in self._bodies if calc_id not in self.index)
+
+    def clear(self):
+        """丢弃所有常驻内存的记录内容"""
+        self._bodies.clear()
+
+    def _evict(self):
+        """超出上限时淘汰最久未使用的记录，跳过固定的、未保存的、保存中的和刚访问的记录"""
+        excess = len(self._bodies) - self.max_resident
+        if excess <= 0:
+            return
+        for calc_id in list(self._bodies)[:-1]:
+            if excess <= 0:
+                break
+            if calc_id == self._pinned or calc_id in self._saving or calc_id not in self.index:
+                continue
+            del self._bodies[calc_id]
+            excess -= 1
@@ -0,0 +1,26 @@
+from .people import PeopleList
+from .settlement import BetMatrix
+
+
+def record_from_json(data):
+    """将从磁盘读取的记录转换为内存中的表示（"数据" 使用 BetMatrix，"人员" 使用 PeopleList）
+
+    紧凑格式读取的记录 "数据" 已经是 BetMatrix，直接使用。
+    """
+    record = dict(data)
+    bets = data.get("数据", {})
+    record["数据"] = bets if isinstance(bets, BetMatrix) else BetMatrix.from_json(bets)
+    record["人员"] = PeopleList.from_json(data.get("人员", []))
+    return record
+
+
+def record_to_json(record):
+    """将内存中的记录转换回可以直接 json.dump 的字典"""
+    data = dict(record)
+    bets = record.get("数据")
+    if isinstance(bets, BetMatrix):
+        data["数据"] = bets.to_json()
+    people = record.get("人员")
+    if isinstance(people, PeopleList):
+        data["人员"] = people.to_json()
+    return data
@@ -0,0 +1,228 @@
+import time
+from collections import namedtuple
+
+from .people import PeopleList
+from .settlement import NUMBER_COUNT, BetMatrix, liability_table, settle, settle_summary
+from .records import record_from_json, record_to_json
+from .record_format import read_record_file
+
+# 一笔投注：人员、号码（1-49）、金额
+Bet = namedtuple("Bet", ["person", "number", "amount"])
+
+
+def parse_winning_number(text):
+    """解析中奖号码输入，不是 1-49 的整数时返回 None"""
+    text = str(text).strip() if text is not None else ""
+    if text.isdigit() and 1 <= int(text) <= NUMBER_COUNT:
+        return int(text)
+    return None
+
+
+def parse_payout_rate(text):
+    """解析赔率输入，不是正数时返回 None"""
+    text = str(text).strip() if text is not None else ""
+    if not text:
+        return None
+    try:
+        rate = float(text)
+    except ValueError:
+        return None
+    return rate if rate > 0 else None
+
+
+def new_round_id():
+    return f"calc_{int(time.time())}"
+
+
+class Settlement:
+    """一期的结算结果
+
+    results 与记录中的 "用户结果" 格式相同，summary 与 "总览" 相同。
+    """
+
+    __slots__ = ("results", "summary")
+
+    def __init__(self, results, summary):
+        self.results = results
+        self.summary = summary
+
+    @property
+    def total_bets(self):
+        return self.summary["总投注额"]
+
+    @property
+    def total_winnings(self):
+        return self.summary["总派彩额"]
+
+    @property
+    def merchant_profit(self):
+        return self.summary["商家盈亏"]
+
+    def person(self, name):
+        """某人的 {"投注总额", "中奖金额"}，没有投注时返回 None"""
+        return self.results.get(name)
+
+    def __repr__(self):
+        return f"Settlement({len(self.results)} 人, {self.summary!r})"
+
+
+class Round:
+    """一期记录的操作接口
+
+    Round 不复制数据，而是直接读写传入的记录字典（格式与 history 目录中的
+    JSON 相同，"数据" 为 BetMatrix，"人员" 为 PeopleList），因此图形界面、
+    修改日志和命令行工具可以共用同一份记录和同一套规则。
+    """
+
+    __slots__ = ("record",)
+
+    def __init__(self, record):
+        if not isinstance(record.get("数据"), BetMatrix):
+            record["数据"] = BetMatrix.from_json(record.get("数据") or {})
+        if not isinstance(record.get("人员"), PeopleList):
+            record["人员"] = PeopleList.from_json(record.get("人员") or [])
+        self.record = record
+
+    @classmethod
+    def new(cls, title=None, date=None):
+        """创建一期空记录"""
+        date = date or time.strftime("%Y-%m-%d %H:%M:%S")
+        return cls({
+            "日期": date,
+            "创建时间": date,
+            "标题": title or f"计算 {date}",
+            "人员": PeopleList(),
+            "人数": 0,
+            "数据": BetMatrix(),
+            "开奖设置": {"中奖号码": None, "赔率": None},
+            "总览": {},
+            "用户结果": {}
+        })
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(record_from_json(data))
+
+    @classmethod
+    def load(cls, file_path):
+        """读取记录文件（JSON 或紧凑格式）"""
+        return cls.from_json(read_record_file(file_path))
+
+    def to_json(self):
+        return record_to_json(self.record)
+
+    @property
+    def title(self):
+        return self.record.get("标题", "")
+
+    @property
+    def date(self):
+        return self.record.get("日期", "")
+
+    @property
+    def people(self):
+        return self.record["人员"]
+
+    @property
+    def bets(self):
+        return self.record["数据"]
+
+    @property
+    def winning_number(self):
+        return self.record.get("开奖设置", {}).get("中奖号码")
+
+    @property
+    def payout_rate(self):
+        return self.record.get("开奖设置", {}).get("赔率")
+
+    def add_person(self, name):
+        """添加人员，返回是否为新添加的人员"""
+        if name not in self.bets:
+            self.bets[name] = {}
+        if not self.people.append(name):
+            return False
+        self.record["人数"] = len(self.people)
+        return True
+
+    def remove_person(self, name):
+        """删除人员及其全部投注"""
+        if name in self.bets:
+            del self.bets[name]
+        self.people.discard(name)
+        self.record["人数"] = len(self.people)
+
+    def set_bet(self, person, number, amount):
+        """设置某人某号码的投注金额（0 表示取消），返回金额是否有变化"""
+        self.add_person(person)
+        row = self.bets[person]
+        old_amount = row.get(str(number), 0)
+        row[str(number)] = amount
+        return row.get(str(number), 0) != old_amount
+
+    def iter_bets(self):
+        """依次返回每一笔金额为正的投注（Bet）"""
+        values = self.bets.values
+        for person, row in self.bets.rows.items():
+            start = row * NUMBER_COUNT
+            for number, amount in enumerate(values[start:start + NUMBER_COUNT], 1):
+                if amount > 0:
+                    yield Bet(person, number, amount)
+
+    def set_prize(self, winning_number, payout_rate):
+        """设置开奖号码和赔率，无效的值按未设置处理"""
+        self.record["开奖设置"] = {
+            "中奖号码": parse_winning_number(winning_number),
+            "赔率": parse_payout_rate(payout_rate)
+        }
+
+    def settle(self):
+        """清理数据并结算，结果写回记录的 "总览" 和 "用户结果"
+
+        只保留 "人员" 中且至少有一笔投注的人的数据。
+        """
+        self.bets.clean(self.people)
+        results, summary = settle(self.bets, self.winning_number, self.payout_rate)
+        self.record["总览"] = summary
+        self.record["用户结果"] = results
+        self.record["人数"] = len(self.people)
+        return Settlement(results, summary)
+
+    def update_prize(self, winning_number, payout_rate):
+        """修改开奖设置并就地更新结算结果，返回中奖金额发生变化的人员
+
+        总览由各号码合计直接得到；只有在原中奖号码或新中奖号码上有投注的人
+        中奖金额会变化，其他人的结果保持不变。记录的 "用户结果" 需要是最近一次
+        settle() 的结果，否则退回完整结算并返回 None（"用户结果" 已整体重新生成，
+        人员可能有增减）。
+        """
+        old_number, old_rate = self.winning_number, self.payout_rate
+        self.set_prize(winning_number, payout_rate)
+        new_number, new_rate = self.winning_number, self.payout_rate
+
+        results = self.record.get("用户结果")
+        if not isinstance(results, dict) or not self.record.get("总览"):
+            self.settle()
+            return None
+        if (new_number, new_rate) == (old_number, old_rate):
+            return []
+
+        affected = set()
+        for number in {old_number, new_number}:
+            if number is not None:
+                affected.update(self.bets.number_holders(number))
+        if any(name not in results for name in affected):
+            self.settle()
+            return None
+
+        for name in affected:
+            amount = self.bets[name].get(str(new_number), 0.0) if new_number is not None else 0.0
+            results[name]["中奖金额"] = amount * new_rate if new_rate is not None else 0.0
+        self.record["总览"] = settle_summary(self.bets, new_number, new_rate)
+        return list(affected)
+
+    def liability(self):
+        """每个号码开出时的 (号码, 投注合计, 派彩额, 商家盈亏)，按当前赔率计算"""
+        return liability_table(self.bets, self.payout_rate)
+
+    def __repr__(self):
+        return f"Round({self.title!r}, {len(self.people)} 人)"
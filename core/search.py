@@ -0,0 +1,76 @@
+def _normalize(text):
+    return str(text).casefold()
+
+
+class SearchIndex:
+    """历史记录的倒排索引
+
+    对每条记录的标题、日期和人员名单按字建立倒排表（中文人名、标题按字切分
+    即可检索），只使用历史索引中的条目，不需要读取记录内容。查询时每个以空格
+    分隔的词都要在某一字段中作为子串出现（不区分大小写）：先用倒排表求交集
+    得到候选，再逐条核对原文，去掉只是各个字碰巧都出现的记录。
+    """
+
+    def __init__(self):
+        # 字 -> {calc_id}
+        self.postings = {}
+        # calc_id -> 规范化后的可检索文本（各字段以换行分隔）
+        self.texts = {}
+
+    def rebuild(self, entries):
+        """根据全部历史索引条目重建倒排表"""
+        self.postings = {}
+        self.texts = {}
+        for calc_id, entry in entries.items():
+            self.add(calc_id, entry)
+
+    def add(self, calc_id, entry):
+        """加入或替换一条记录"""
+        if calc_id in self.texts:
+            self.remove(calc_id)
+        fields = [entry.get("标题", ""), entry.get("日期", "")]
+        fields.extend(entry.get("人员", []))
+        text = _normalize("\n".join(fields))
+        self.texts[calc_id] = text
+        postings = self.postings
+        for char in set(text):
+            ids = postings.get(char)
+            if ids is None:
+                postings[char] = {calc_id}
+            else:
+                ids.add(calc_id)
+
+    def remove(self, calc_id):
+        text = self.texts.pop(calc_id, None)
+        if text is None:
+            return
+        for char in set(text):
+            ids = self.postings.get(char)
+            if ids is not None:
+                ids.discard(calc_id)
+                if not ids:
+                    del self.postings[char]
+
+    def search(self, query):
+        """返回匹配全部查询词的记录 ID 集合，查询为空时返回 None"""
+        terms = _normalize(query).split()
+        if not terms:
+            return None
+
+        # 先处理倒排表最短的字，候选集合尽快缩小
+        chars = set("".join(terms))
+        candidates = None
+        for char in sorted(chars, key=lambda c: len(self.postings.get(c, ()))):
+            ids = self.postings.get(char)
+            if not ids:
+                return set()
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+
+        texts = self.texts
+        return {calc_id for calc_id in candidates
+                if all(term in texts[calc_id] for term in terms)}
+
+    def __len__(self):
+        return len(self.texts)
@@ -0,0 +1,328 @@
+from array import array
+from collections.abc import MutableMapping
+
+# 可投注的号码为 1-49
+NUMBER_COUNT = 49
+NUMBERS = range(1, NUMBER_COUNT + 1)
+
+_ZERO_ROW = array('d', bytes(8 * NUMBER_COUNT))
+
+
+def _clean_amount(amount):
+    """只接受正数金额，其它值视为没有投注"""
+    if isinstance(amount, (int, float)) and not isinstance(amount, bool) and amount > 0:
+        return float(amount)
+    return 0.0
+
+
+def _parse_number(key):
+    """将 "1"-"49"（或整数 1-49）转换为号码，其它键返回 None"""
+    if isinstance(key, str):
+        if not key.isdigit():
+            return None
+        key = int(key)
+    elif not isinstance(key, int) or isinstance(key, bool):
+        return None
+    return key if 1 <= key <= NUMBER_COUNT else None
+
+
+class BetRow(MutableMapping):
+    """某个人在 BetMatrix 中那一行的字典视图
+
+    行为与原来 "数据" 中每个人的 {"号码": 金额} 字典一致：只有金额为正的号码
+    算作存在，设置为 0 或非正数即表示取消该号码的投注。
+    """
+
+    __slots__ = ("_matrix", "_name")
+
+    def __init__(self, matrix, name):
+        self._matrix = matrix
+        self._name = name
+
+    def _index(self, key):
+        number = _parse_number(key)
+        if number is None:
+            raise KeyError(key)
+        return self._matrix.rows[self._name] * NUMBER_COUNT + number - 1
+
+    def __getitem__(self, key):
+        value = self._matrix.values[self._index(key)]
+        if value <= 0:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, amount):
+        self._matrix._set_value(self._index(key), _clean_amount(amount))
+
+    def __delitem__(self, key):
+        index = self._index(key)
+        if self._matrix.values[index] <= 0:
+            raise KeyError(key)
+        self._matrix._set_value(index, 0.0)
+
+    def __iter__(self):
+        start = self._matrix.rows[self._name] * NUMBER_COUNT
+        values = self._matrix.values
+        return iter([str(n) for n in NUMBERS if values[start + n - 1] > 0])
+
+    def __len__(self):
+        start = self._matrix.rows[self._name] * NUMBER_COUNT
+        values = self._matrix.values
+        return sum(1 for n in NUMBERS if values[start + n - 1] > 0)
+
+    def total(self):
+        """该行的投注总额"""
+        return self._matrix.row_total(self._name)
+
+    def __repr__(self):
+        return f"BetRow({self._name!r}, {dict(self)!r})"
+
+
+class BetMatrix(MutableMapping):
+    """一期投注的稠密矩阵：人员 × 49 个号码
+
+    所有金额存放在同一个 array('d') 中，行号为 row 的人的第 n 号投注位于
+    values[row * 49 + n - 1]；rows 是人名到行号的索引（保持加入顺序）。
+    作为映射使用时，matrix[人名] 返回该行的 BetRow 视图，因此可以直接替代
+    记录中原来的 "数据" 字典；删除人员后空出的行会被复用。
+
+    每次修改金额时同时更新每个号码的投注合计（column_totals，49 项）和每行的
+    投注合计（row_totals，按行号），结算和风险表直接读取合计，不再遍历矩阵。
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.values = array('d')
+        self.column_totals = array('d', _ZERO_ROW)
+        self.row_totals = array('d')
+        self._names_by_row = []
+        self._free_rows = []
+
+    def add_person(self, name):
+        """添加一行并返回其行号；人员已存在时直接返回原行号"""
+        row = self.rows.get(name)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+                self._names_by_row[row] = name
+            else:
+                row = len(self.values) // NUMBER_COUNT
+                self.values.extend(_ZERO_ROW)
+                self.row_totals.append(0.0)
+                self._names_by_row.append(name)
+            self.rows[name] = row
+        return row
+
+    def _set_value(self, index, amount):
+        """修改一个金额，并按差值更新所在行和所在号码的合计"""
+        delta = amount - self.values[index]
+        if not delta:
+            return
+        self.values[index] = amount
+        row, column = divmod(index, NUMBER_COUNT)
+        self.row_totals[row] = _settle_total(self.row_totals[row] + delta)
+        self.column_totals[column] = _settle_total(self.column_totals[column] + delta)
+
+    def _clear_row(self, row):
+        """清空一行并从各号码的合计中减去该行的金额"""
+        start = row * NUMBER_COUNT
+        amounts = self.values[start:start + NUMBER_COUNT]
+        if any(amounts):
+            column_totals = self.column_totals
+            for column, amount in enumerate(amounts):
+                if amount:
+                    column_totals[column] = _settle_total(column_totals[column] - amount)
+            self.values[start:start + NUMBER_COUNT] = _ZERO_ROW
+        self.row_totals[row] = 0.0
+
+    def __getitem__(self, name):
+        if name not in self.rows:
+            raise KeyError(name)
+        return BetRow(self, name)
+
+    def __setitem__(self, name, bets):
+        items = list(bets.items())
+        row = self.add_person(name)
+        start = row * NUMBER_COUNT
+        self._clear_row(row)
+        for key, amount in items:
+            number = _parse_number(key)
+            if number is not None:
+                self._set_value(start + number - 1, _clean_amount(amount))
+
+    def __delitem__(self, name):
+        row = self.rows.pop(name)
+        self._clear_row(row)
+        self._names_by_row[row] = None
+        self._free_rows.append(row)
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def copy(self):
+        matrix = BetMatrix()
+        matrix.rows = dict(self.rows)
+        matrix.values = array('d', self.values)
+        matrix.column_totals = array('d', self.column_totals)
+        matrix.row_totals = array('d', self.row_totals)
+        matrix._names_by_row = list(self._names_by_row)
+        matrix._free_rows = list(self._free_rows)
+        return matrix
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __repr__(self):
+        return f"BetMatrix({len(self.rows)} 人)"
+
+    def row_total(self, name):
+        return self.row_totals[self.rows[name]]
+
+    def total(self):
+        """全部投注合计（对 49 个号码的合计求和）"""
+        return _settle_total(sum(self.column_totals))
+
+    def bet_count(self):
+        """金额为正的投注笔数（已删除人员的行已清零）"""
+        return len(self.values) - self.values.count(0.0)
+
+    def number_total(self, number):
+        """押在某个号码上的投注合计"""
+        return self.column_totals[number - 1]
+
+    def number_holders(self, number):
+        """在某个号码上有投注的人员"""
+        names = self._names_by_row
+        return [names[row] for row, amount in enumerate(self.values[number - 1::NUMBER_COUNT]) if amount > 0]
+
+    def clean(self, people):
+        """按原有的清理规则整理数据：只保留 "人员" 中且至少有一笔投注的人"""
+        keep = set(people)
+        for name in list(self.rows):
+            if name not in keep or self.row_total(name) <= 0:
+                del self[name]
+
+    @classmethod
+    def from_json(cls, data):
+        """从记录 JSON 中的 "数据" 字典构建矩阵
+
+        每个人都会占用一行（包括没有投注的人）；非 1-49 的键以及非正数金额
+        本来就不代表投注，不会被保留。
+        """
+        matrix = cls()
+        if isinstance(data, dict):
+            for name, bets in data.items():
+                matrix[name] = bets if isinstance(bets, dict) else {}
+        return matrix
+
+    @classmethod
+    def from_packed(cls, names, values, row_totals=None, column_totals=None):
+        """从紧凑格式直接构建矩阵
+
+        names 为各行的人名，values 为按行排列的 len(names) × 49 个金额
+        （array('d')，来自另一个 BetMatrix，金额均不为负），不逐个设置金额。
+        没有给出每行、每个号码的合计时按行、按列求和得到。
+        """
+        if len(values) != len(names) * NUMBER_COUNT:
+            raise ValueError("投注金额的数量与人数不符")
+        matrix = cls()
+        matrix.rows = {name: row for row, name in enumerate(names)}
+        if len(matrix.rows) != len(names):
+            raise ValueError("人员名单中有重复的人名")
+        matrix.values = values
+        if row_totals is None:
+            row_totals = array('d', (_settle_total(sum(values[start:start + NUMBER_COUNT]))
+                                     for start in range(0, len(values), NUMBER_COUNT)))
+        if column_totals is None:
+            column_totals = array('d', (_settle_total(sum(values[column::NUMBER_COUNT]))
+                                        for column in range(NUMBER_COUNT)))
+        if len(row_totals) != len(names) or len(column_totals) != NUMBER_COUNT:
+            raise ValueError("投注合计的数量与人数不符")
+        matrix.row_totals = row_totals
+        matrix.column_totals = column_totals
+        matrix._names_by_row = list(names)
+        return matrix
+
+    def to_json(self):
+        """转换回记录 JSON 中 "数据" 的格式，只包含金额为正的号码"""
+        data = {}
+        values = self.values
+        for name, row in self.rows.items():
+            start = row * NUMBER_COUNT
+            data[name] = {str(n): values[start + n - 1] for n in NUMBERS if values[start + n - 1] > 0}
+        return data
+
+
+def _settle_total(amount):
+    """按差值累加的合计在减回 0 时可能留下浮点误差，误差范围内视为 0"""
+    return 0.0 if abs(amount) < 1e-9 else amount
+
+
+def _can_calculate_winnings(winning_number, payout_rate):
+    return (
+        winning_number is not None and payout_rate is not None and payout_rate > 0
+        and 1 <= int(winning_number) <= NUMBER_COUNT
+    )
+
+
+def settle_summary(matrix, winning_number=None, payout_rate=None):
+    """只计算总览：总额取各号码合计之和，派彩取中奖号码的合计乘以赔率"""
+    total_bets = matrix.total()
+    if _can_calculate_winnings(winning_number, payout_rate):
+        total_winnings = matrix.number_total(int(winning_number)) * payout_rate
+    else:
+        total_winnings = 0.0
+    return {
+        "总投注额": total_bets,
+        "总派彩额": total_winnings,
+        "商家盈亏": total_bets - total_winnings
+    }
+
+
+def liability_table(matrix, payout_rate=None):
+    """开奖前每个号码开出时的派彩和商家盈亏
+
+    返回 49 项 (号码, 该号码投注合计, 派彩额, 商家盈亏)；没有有效赔率时
+    派彩按 0 计算。只读取维护好的合计，不遍历矩阵。
+    """
+    total_bets = matrix.total()
+    rate = payout_rate if payout_rate is not None and payout_rate > 0 else 0.0
+    table = []
+    for number in NUMBERS:
+        stake = matrix.column_totals[number - 1]
+        payout = stake * rate
+        table.append((number, stake, payout, total_bets - payout))
+    return table
+
+
+def settle(matrix, winning_number=None, payout_rate=None):
+    """结算一期投注
+
+    返回 (用户结果, 总览)，格式与记录 JSON 中的 "用户结果" 和 "总览" 相同。
+    每人的投注总额直接读取行合计，派彩只取中奖号码所在的一列，
+    总览由各号码合计得到（见 settle_summary）。
+    """
+    can_calculate_winnings = _can_calculate_winnings(winning_number, payout_rate)
+    values = matrix.values
+    row_totals = matrix.row_totals
+    win_offset = int(winning_number) - 1 if can_calculate_winnings else 0
+
+    results_by_person = {}
+    for name, row in matrix.rows.items():
+        person_total_bet = row_totals[row]
+        if person_total_bet <= 0:
+            # 没有投注的人不出现在结果中
+            continue
+        person_total_winnings = values[row * NUMBER_COUNT + win_offset] * payout_rate if can_calculate_winnings else 0.0
+        results_by_person[name] = {
+            "投注总额": person_total_bet,
+            "中奖金额": person_total_winnings
+        }
+
+    return results_by_person, settle_summary(matrix, winning_number, payout_rate)
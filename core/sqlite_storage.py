@@ -0,0 +1,462 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from .history_index import HistoryIndex
+from .journal import SEQUENCE_KEY
+from .records import record_from_json, record_to_json
+from .settlement import _clean_amount, _parse_number
+from .tracing import tracer
+from .trash import DEFAULT_EXPIRY_DAYS, expiry_timestamp
+
+# 迁移后程序目录中存在此文件时，默认使用 SQLite 存储
+SQLITE_FILE_NAME = "calculator.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    date TEXT NOT NULL,
+    winning_number INTEGER,
+    payout_rate REAL,
+    extra TEXT NOT NULL,
+    modified REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rounds_date ON rounds(date);
+
+CREATE TABLE IF NOT EXISTS people (
+    round_id TEXT NOT NULL REFERENCES rounds(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (round_id, name)
+);
+
+CREATE TABLE IF NOT EXISTS bets (
+    round_id TEXT NOT NULL REFERENCES rounds(id) ON DELETE CASCADE,
+    person TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    PRIMARY KEY (round_id, person, number)
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    round_id TEXT NOT NULL REFERENCES rounds(id) ON DELETE CASCADE,
+    person TEXT NOT NULL,
+    bet_total REAL NOT NULL,
+    winnings REAL NOT NULL,
+    PRIMARY KEY (round_id, person)
+);
+CREATE INDEX IF NOT EXISTS results_person ON results(person);
+
+CREATE TABLE IF NOT EXISTS versions (
+    round_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    time REAL NOT NULL,
+    title TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (round_id, version)
+);
+CREATE INDEX IF NOT EXISTS versions_time ON versions(time);
+
+CREATE TABLE IF NOT EXISTS templates (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+# 这些字段保存在单独的列或表中，其余字段以 JSON 保存在 rounds.extra
+_STRUCTURED_KEYS = ("标题", "日期", "人员", "数据", "开奖设置", "用户结果")
+
+
+class SqliteStorage:
+    """SQLite 存储
+
+    记录拆分到 rounds、people、bets、results 表中，备份版本和模板也在同一个
+    数据库里；每次保存在一个事务中完成。接口与 JsonStorage 相同。
+    """
+
+    def __init__(self, base_dir, db_path=None):
+        self.base_dir = base_dir
+        self.db_path = db_path or os.path.join(base_dir, SQLITE_FILE_NAME)
+        # 后台保存线程和主线程共用一个连接，由锁串行化
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+        self.index = SqliteIndex(self)
+        self.journal = SqliteJournal(self)
+        self.versions = SqliteVersionStore(self)
+        self.ledger = SqliteLedger(self)
+
+    @contextmanager
+    def transaction(self):
+        """在一个事务中执行，出错时回滚（不要嵌套调用）"""
+        with self._lock:
+            with self._conn:
+                yield self._conn
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def load(self):
+        self.index.load()
+
+    def record_exists(self, calc_id):
+        return bool(self.query("SELECT 1 FROM rounds WHERE id = ?", (calc_id,)))
+
+    def modified(self, calc_id):
+        rows = self.query("SELECT modified FROM rounds WHERE id = ?", (calc_id,))
+        return rows[0][0] if rows else None
+
+    def load_record(self, calc_id):
+        with self._lock:
+            data = self.read_json(self._conn, calc_id)
+        if data is None:
+            raise KeyError(calc_id)
+        return record_from_json(data)
+
+    def save_record(self, calc_id, record, backup=True, trash_expiry_days=DEFAULT_EXPIRY_DAYS):
+        """在一个事务中备份旧版本并写入记录（可在后台线程中调用）"""
+        data = record_to_json(record)
+        with tracer.span("save_record"), self.transaction() as conn:
+            if backup:
+                previous = self.read_json(conn, calc_id)
+                if previous is not None:
+                    self.versions.insert(conn, calc_id, previous)
+                    self.versions.delete_older(conn, calc_id, expiry_timestamp(trash_expiry_days))
+            self.write_json(conn, calc_id, data)
+            tracer.annotate(people=len(data.get("人员", [])))
+        return calc_id
+
+    def delete_record(self, calc_id):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM rounds WHERE id = ?", (calc_id,))
+
+    def restore_record(self, calc_id, data):
+        with self.transaction() as conn:
+            self.write_json(conn, calc_id, data)
+
+    def clean_trash(self, expiry_days=DEFAULT_EXPIRY_DAYS):
+        with tracer.span("clean_trash"), self.transaction() as conn:
+            removed = conn.execute("DELETE FROM versions WHERE time < ?",
+                                   (expiry_timestamp(expiry_days),)).rowcount
+            tracer.annotate(removed=removed)
+        return removed
+
+    def legacy_backups(self):
+        # 迁移时旧格式备份已转为备份版本
+        return []
+
+    def read_legacy_backup(self, file_name):
+        raise KeyError(file_name)
+
+    def delete_legacy_backup(self, file_name):
+        pass
+
+    def load_templates(self):
+        return {name: json.loads(data) for name, data in self.query("SELECT name, data FROM templates")}
+
+    def template_exists(self, template_name):
+        return bool(self.query("SELECT 1 FROM templates WHERE name = ?", (template_name,)))
+
+    def save_template(self, template_name, template_data):
+        with self.transaction() as conn:
+            self.write_template(conn, template_name, template_data)
+
+    def delete_template(self, template_name):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM templates WHERE name = ?", (template_name,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def write_template(conn, template_name, template_data):
+        conn.execute("INSERT OR REPLACE INTO templates (name, data) VALUES (?, ?)",
+                     (template_name, json.dumps(template_data, ensure_ascii=False)))
+
+    @staticmethod
+    def write_json(conn, calc_id, data):
+        """把 JSON 格式的记录写入各表（替换原有的行）"""
+        prize_settings = data.get("开奖设置") or {}
+        extra = {key: value for key, value in data.items() if key not in _STRUCTURED_KEYS}
+        date = data.get("日期", "未知日期")
+
+        conn.execute("DELETE FROM rounds WHERE id = ?", (calc_id,))
+        conn.execute(
+            "INSERT INTO rounds (id, title, date, winning_number, payout_rate, extra, modified) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (calc_id, data.get("标题", f"计算 {date}"), date, prize_settings.get("中奖号码"),
+             prize_settings.get("赔率"), json.dumps(extra, ensure_ascii=False), time.time()))
+        conn.executemany(
+            "INSERT OR IGNORE INTO people (round_id, position, name) VALUES (?, ?, ?)",
+            [(calc_id, position, name) for position, name in enumerate(data.get("人员", []))])
+
+        bets = []
+        for person, person_bets in (data.get("数据") or {}).items():
+            for key, amount in (person_bets if isinstance(person_bets, dict) else {}).items():
+                number = _parse_number(key)
+                amount = _clean_amount(amount)
+                if number is not None and amount > 0:
+                    bets.append((calc_id, person, number, amount))
+        conn.executemany("INSERT OR REPLACE INTO bets (round_id, person, number, amount) VALUES (?, ?, ?, ?)", bets)
+        SqliteLedger.write_results(conn, calc_id, data.get("用户结果") or {})
+
+    @staticmethod
+    def read_json(conn, calc_id):
+        """从各表组装 JSON 格式的记录，记录不存在时返回 None"""
+        row = conn.execute(
+            "SELECT title, date, winning_number, payout_rate, extra FROM rounds WHERE id = ?",
+            (calc_id,)).fetchone()
+        if row is None:
+            return None
+        title, date, winning_number, payout_rate, extra = row
+
+        data = {"日期": date}
+        data.update(json.loads(extra))
+        data["标题"] = title
+        data["人员"] = [name for (name,) in conn.execute(
+            "SELECT name FROM people WHERE round_id = ? ORDER BY position", (calc_id,))]
+        bets = {}
+        for person, number, amount in conn.execute(
+                "SELECT person, number, amount FROM bets WHERE round_id = ?", (calc_id,)):
+            bets.setdefault(person, {})[str(number)] = amount
+        data["数据"] = bets
+        data["开奖设置"] = {"中奖号码": winning_number, "赔率": payout_rate}
+        data["用户结果"] = {
+            person: {"投注总额": bet_total, "中奖金额": winnings}
+            for person, bet_total, winnings in conn.execute(
+                "SELECT person, bet_total, winnings FROM results WHERE round_id = ?", (calc_id,))
+        }
+        return data
+
+
+class SqliteIndex(HistoryIndex):
+    """SQLite 存储的历史记录索引，条目由 rounds 表查询得到"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.entries = {}
+        self.search_index = None
+
+    def load(self):
+        self.entries = {
+            calc_id: {"标题": title, "日期": date, "人员": [], "mtime": modified}
+            for calc_id, title, date, modified in self.storage.query(
+                "SELECT id, title, date, modified FROM rounds")
+        }
+        for calc_id, name in self.storage.query(
+                "SELECT round_id, name FROM people ORDER BY round_id, position"):
+            if calc_id in self.entries:
+                self.entries[calc_id]["人员"].append(name)
+        self.search_index = None
+
+    def reconcile(self):
+        return False
+
+    def save(self):
+        # 数据库本身就是索引，不需要单独的索引文件
+        pass
+
+    def pending_snapshot(self):
+        return None
+
+    def write_snapshot(self, snapshot):
+        pass
+
+    def update(self, calc_id, data, file_path=None, save=True):
+        date = data.get("日期", "未知日期")
+        self.entries[calc_id] = {
+            "标题": data.get("标题", f"计算 {date}"),
+            "日期": date,
+            "人员": list(data.get("人员", [])),
+            "mtime": self.storage.modified(calc_id),
+        }
+        if self.search_index is not None:
+            self.search_index.add(calc_id, self.entries[calc_id])
+
+
+class SqliteJournal:
+    """SQLite 存储的单笔修改：在一个事务中直接更新 people / bets 表
+
+    不需要日志文件，也不需要压缩。接口与 RecordJournal 相同。
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def append(self, record, calc_id, entries):
+        seq = record.get(SEQUENCE_KEY, 0)
+        with self.storage.transaction() as conn:
+            for entry in entries:
+                seq += 1
+                op = entry.get("op")
+                person = entry.get("p")
+                if op in ("bet", "add"):
+                    conn.execute(
+                        "INSERT OR IGNORE INTO people (round_id, position, name) "
+                        "SELECT ?, COALESCE(MAX(position), -1) + 1, ? FROM people WHERE round_id = ?",
+                        (calc_id, person, calc_id))
+                if op == "bet":
+                    if entry["v"] > 0:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO bets (round_id, person, number, amount) VALUES (?, ?, ?, ?)",
+                            (calc_id, person, entry["n"], entry["v"]))
+                    else:
+                        conn.execute("DELETE FROM bets WHERE round_id = ? AND person = ? AND number = ?",
+                                     (calc_id, person, entry["n"]))
+                elif op == "del":
+                    conn.execute("DELETE FROM people WHERE round_id = ? AND name = ?", (calc_id, person))
+                    conn.execute("DELETE FROM bets WHERE round_id = ? AND person = ?", (calc_id, person))
+
+            row = conn.execute("SELECT extra FROM rounds WHERE id = ?", (calc_id,)).fetchone()
+            if row is not None:
+                extra = json.loads(row[0])
+                extra["人数"] = len(record.get("人员", []))
+                extra[SEQUENCE_KEY] = seq
+                conn.execute("UPDATE rounds SET extra = ?, modified = ? WHERE id = ?",
+                             (json.dumps(extra, ensure_ascii=False), time.time(), calc_id))
+        record[SEQUENCE_KEY] = seq
+
+    def read(self, calc_id):
+        return []
+
+    def needs_compaction(self, calc_id):
+        return False
+
+    def compact(self, calc_id, upto_seq):
+        pass
+
+    def remove(self, calc_id):
+        pass
+
+
+class SqliteVersionStore:
+    """SQLite 存储的备份版本，接口与 VersionStore 相同"""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def versions(self, calc_id):
+        return [
+            {"版本": version, "时间": timestamp, "标题": title}
+            for version, timestamp, title in self.storage.query(
+                "SELECT version, time, title FROM versions WHERE round_id = ? ORDER BY version", (calc_id,))
+        ]
+
+    def record_ids(self):
+        return [calc_id for (calc_id,) in self.storage.query("SELECT DISTINCT round_id FROM versions")]
+
+    def latest(self, calc_id):
+        rows = self.storage.query(
+            "SELECT data FROM versions WHERE round_id = ? ORDER BY version DESC LIMIT 1", (calc_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def get(self, calc_id, version):
+        rows = self.storage.query(
+            "SELECT data FROM versions WHERE round_id = ? AND version = ?", (calc_id, version))
+        if not rows:
+            raise KeyError(version)
+        return json.loads(rows[0][0])
+
+    def add_version(self, calc_id, data, timestamp=None):
+        with self.storage.transaction() as conn:
+            return self.insert(conn, calc_id, data, timestamp)
+
+    def delete_version(self, calc_id, version):
+        with self.storage.transaction() as conn:
+            conn.execute("DELETE FROM versions WHERE round_id = ? AND version = ?", (calc_id, version))
+
+    def expire(self, calc_id, expiry_timestamp):
+        with self.storage.transaction() as conn:
+            return self.delete_older(conn, calc_id, expiry_timestamp)
+
+    def remove(self, calc_id):
+        with self.storage.transaction() as conn:
+            conn.execute("DELETE FROM versions WHERE round_id = ?", (calc_id,))
+
+    @staticmethod
+    def insert(conn, calc_id, data, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        (number,) = conn.execute(
+            "SELECT COALESCE(MAX(version), 0) + 1 FROM versions WHERE round_id = ?", (calc_id,)).fetchone()
+        conn.execute(
+            "INSERT INTO versions (round_id, version, time, title, data) VALUES (?, ?, ?, ?, ?)",
+            (calc_id, number, timestamp, data.get("标题", "未知记录"), json.dumps(data, ensure_ascii=False)))
+        return number
+
+    @staticmethod
+    def delete_older(conn, calc_id, expiry_timestamp):
+        return conn.execute("DELETE FROM versions WHERE round_id = ? AND time < ?",
+                            (calc_id, expiry_timestamp)).rowcount
+
+
+class SqliteLedger:
+    """SQLite 存储的每人账本：直接对 results 表按人员分组求和，接口与 PersonLedger 相同"""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def load(self):
+        pass
+
+    def update(self, calc_id, record, save=True):
+        with self.storage.transaction() as conn:
+            if conn.execute("SELECT 1 FROM rounds WHERE id = ?", (calc_id,)).fetchone():
+                self.write_results(conn, calc_id, record.get("用户结果", {}))
+
+    def remove(self, calc_id, save=True):
+        # 删除记录时 results 中的行随之删除
+        pass
+
+    def pending_snapshot(self):
+        # 结果直接写入数据库，没有需要稍后写入的账本文件
+        return None
+
+    def write_snapshot(self, snapshot):
+        pass
+
+    def people(self):
+        return [person for (person,) in self.storage.query("SELECT DISTINCT person FROM results ORDER BY person")]
+
+    def query(self, since=None, until=None, people=None):
+        sql = ("SELECT results.person, SUM(results.bet_total), SUM(results.winnings), COUNT(*) "
+               "FROM results JOIN rounds ON rounds.id = results.round_id WHERE 1")
+        params = []
+        if since:
+            # 与按前缀比较等价，并且可以使用日期索引
+            sql += " AND rounds.date >= ?"
+            params.append(since)
+        if until:
+            sql += " AND substr(rounds.date, 1, ?) <= ?"
+            params.extend([len(until), until])
+        sql += " GROUP BY results.person"
+
+        summary = {}
+        for person, total_bet, total_win, count in self.storage.query(sql, params):
+            if people is not None and person not in people:
+                continue
+            summary[person] = {
+                "投注总额": total_bet,
+                "中奖金额": total_win,
+                "盈亏": total_win - total_bet,
+                "期数": count
+            }
+        return summary
+
+    @staticmethod
+    def write_results(conn, calc_id, results_by_person):
+        conn.execute("DELETE FROM results WHERE round_id = ?", (calc_id,))
+        conn.executemany(
+            "INSERT INTO results (round_id, person, bet_total, winnings) VALUES (?, ?, ?, ?)",
+            [(calc_id, person, results.get("投注总额", 0.0), results.get("中奖金额", 0.0))
+             for person, results in results_by_person.items()])
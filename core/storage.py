@@ -0,0 +1,155 @@
+import os
+import json
+
+from .fileio import atomic_write_json
+from .records import record_from_json, record_to_json
+from .record_format import JSON_FORMAT, read_format_setting, read_record_file, write_record_file
+from .trash import DEFAULT_EXPIRY_DAYS, clean_trash, expiry_timestamp, list_legacy_backups
+from .journal import SEQUENCE_KEY, RecordJournal, apply_entries
+from .history_index import HistoryIndex
+from .tracing import tracer
+from .ledger import PersonLedger
+from .versions import VersionStore
+
+
+def save_record_file(history_dir, versions, calc_id, record, backup=True,
+                     trash_expiry_days=DEFAULT_EXPIRY_DAYS, journal=None, record_format=JSON_FORMAT):
+    """把记录写入 history 目录，可在后台线程中调用
+
+    record 应是调用方的独立副本。文件已存在且 backup 为 True 时，先把旧版本
+    作为新的备份版本加入垃圾桶（VersionStore），并清理该记录的过期版本；
+    写入采用临时文件加原子替换，record_format 为 JSON 或紧凑格式。写入成功后，
+    修改日志中已包含在这份快照里的条目会被压缩掉。返回写入的文件路径。
+    """
+    file_path = os.path.join(history_dir, f"{calc_id}.json")
+
+    with tracer.span("save_record"):
+        if backup and os.path.exists(file_path):
+            try:
+                versions.add_version(calc_id, record_to_json(read_record_file(file_path)))
+                versions.expire(calc_id, expiry_timestamp(trash_expiry_days))
+            except Exception as e:
+                print(f"备份历史记录时出错: {e}")
+
+        write_record_file(file_path, record, record_format)
+
+        if journal is not None:
+            journal.compact(calc_id, record.get(SEQUENCE_KEY, 0))
+        tracer.annotate(people=len(record.get("人员", [])), bytes=os.path.getsize(file_path))
+    return file_path
+
+
+class JsonStorage:
+    """一条记录一个 JSON 文件的存储
+
+    记录在 history/（含索引、修改日志和账本），模板在 templates/，备份版本在
+    trash/。记录文件可以是 JSON 或紧凑格式，读取时自动识别；新保存的记录使用
+    history/.format 中设置的格式（见 python -m core convert），默认为 JSON。
+    与 SqliteStorage 提供相同的接口：index、journal、versions、ledger 以及
+    下面的读写方法，图形界面只通过这些接口访问存储。
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.history_dir = os.path.join(base_dir, "history")
+        self.templates_dir = os.path.join(base_dir, "templates")
+        self.trash_dir = os.path.join(base_dir, "trash")
+        for directory in (self.history_dir, self.templates_dir, self.trash_dir):
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+
+        self.record_format = read_format_setting(self.history_dir)
+        self.index = HistoryIndex(self.history_dir)
+        self.journal = RecordJournal(self.history_dir)
+        self.versions = VersionStore(self.trash_dir)
+        self.ledger = PersonLedger(self.history_dir, self.index, self.journal)
+
+    def load(self):
+        """读取索引和账本（只解析新增或已修改的文件）"""
+        self.index.load()
+        self.ledger.load()
+
+    def record_path(self, calc_id):
+        return os.path.join(self.history_dir, f"{calc_id}.json")
+
+    def record_exists(self, calc_id):
+        return os.path.exists(self.record_path(calc_id))
+
+    def load_record(self, calc_id):
+        """读取记录并重放修改日志，返回内存中的记录（"数据" 为 BetMatrix）"""
+        record = record_from_json(read_record_file(self.record_path(calc_id)))
+        entries = self.journal.read(calc_id)
+        if entries:
+            apply_entries(record, entries)
+        return record
+
+    def save_record(self, calc_id, record, backup=True, trash_expiry_days=DEFAULT_EXPIRY_DAYS):
+        """保存记录（可在后台线程中调用），返回写入的文件路径"""
+        return save_record_file(self.history_dir, self.versions, calc_id, record, backup,
+                                trash_expiry_days, self.journal, self.record_format)
+
+    def delete_record(self, calc_id):
+        self.journal.remove(calc_id)
+        if self.record_exists(calc_id):
+            os.remove(self.record_path(calc_id))
+
+    def restore_record(self, calc_id, data):
+        """用备份内容覆盖记录，并丢弃修改日志"""
+        write_record_file(self.record_path(calc_id), data, self.record_format)
+        self.journal.remove(calc_id)
+
+    def clean_trash(self, expiry_days=DEFAULT_EXPIRY_DAYS):
+        return clean_trash(self.trash_dir, expiry_days, self.versions)
+
+    def legacy_backups(self):
+        """旧格式的整份备份文件，返回 (文件名, 记录ID, 修改时间) 列表"""
+        return list_legacy_backups(self.trash_dir)
+
+    def read_legacy_backup(self, file_name):
+        with open(os.path.join(self.trash_dir, file_name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def delete_legacy_backup(self, file_name):
+        file_path = os.path.join(self.trash_dir, file_name)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def load_templates(self):
+        """读取全部模板，返回 {模板名: 模板数据}"""
+        templates = {}
+        if os.path.exists(self.templates_dir):
+            for file_name in os.listdir(self.templates_dir):
+                if file_name.endswith('.json'):
+                    with open(os.path.join(self.templates_dir, file_name), 'r', encoding='utf-8') as f:
+                        templates[file_name[:-len('.json')]] = json.load(f)
+        return templates
+
+    def template_exists(self, template_name):
+        return os.path.exists(os.path.join(self.templates_dir, f"{template_name}.json"))
+
+    def save_template(self, template_name, template_data):
+        atomic_write_json(os.path.join(self.templates_dir, f"{template_name}.json"), template_data, indent=2)
+
+    def delete_template(self, template_name):
+        file_path = os.path.join(self.templates_dir, f"{template_name}.json")
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def close(self):
+        pass
+
+
+def open_storage(base_dir, backend=None):
+    """打开程序目录下的存储
+
+    backend 为 "sqlite" 或 "json"；为 None 时，目录中已有 SQLite 数据库
+    （迁移后）就使用 SQLite，否则使用 JSON 文件。
+    """
+    from .sqlite_storage import SQLITE_FILE_NAME, SqliteStorage
+    if backend is None:
+        backend = "sqlite" if os.path.exists(os.path.join(base_dir, SQLITE_FILE_NAME)) else "json"
+    if backend == "sqlite":
+        return SqliteStorage(base_dir)
+    if backend == "json":
+        return JsonStorage(base_dir)
+    raise ValueError(f"未知的存储类型: {backend}")
@@ -0,0 +1,137 @@
+import math
+import time
+import threading
+import functools
+from collections import deque, namedtuple
+
+# 环形缓冲区中保存的最近操作数
+DEFAULT_CAPACITY = 2000
+# 超过此耗时（毫秒）的操作另外记入慢操作日志
+DEFAULT_SLOW_THRESHOLD_MS = 200
+DEFAULT_SLOW_CAPACITY = 100
+
+# 一次操作：名称、开始时间（time.time()）、耗时秒数、数量（人数、投注数、文件数、写入字节数等）
+SpanRecord = namedtuple("SpanRecord", ["name", "time", "duration", "counts"])
+
+
+def percentile(sorted_values, fraction):
+    """按最近秩法取百分位数，sorted_values 需已排序且非空"""
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class Tracer:
+    """热点路径的轻量计时
+
+    始终开启：每次操作只记录两次 perf_counter 和一个元组，保存在固定大小的
+    环形缓冲区中，内存占用不随运行时间增长。操作内部可以用 annotate() 补充
+    人数、投注数、文件数、写入字节数等数量。超过 slow_threshold_ms 的操作
+    另外保存在慢操作日志中，不会被大量的快操作挤出缓冲区。
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, slow_threshold_ms=DEFAULT_SLOW_THRESHOLD_MS,
+                 slow_capacity=DEFAULT_SLOW_CAPACITY):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._spans = deque(maxlen=capacity)
+        self._slow = deque(maxlen=slow_capacity)
+        self._lock = threading.Lock()
+        # 每个线程当前正在进行的操作（可以嵌套）
+        self._local = threading.local()
+
+    def span(self, name):
+        """记录一次操作的上下文管理器"""
+        return _Span(self, name)
+
+    def traced(self, name):
+        """记录函数每次调用的装饰器"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Span(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def annotate(self, **counts):
+        """为当前线程中最内层的操作补充数量，没有正在进行的操作时忽略"""
+        stack = getattr(self._local, "stack", None)
+        if stack:
+            stack[-1].counts.update(counts)
+
+    def spans(self):
+        """缓冲区中的全部操作（从旧到新）"""
+        with self._lock:
+            return list(self._spans)
+
+    def slow_spans(self):
+        """慢操作日志（从旧到新）"""
+        with self._lock:
+            return list(self._slow)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._slow.clear()
+
+    def stats(self):
+        """按操作名称统计缓冲区中的操作
+
+        返回 {名称: {"次数", "p50", "p95", "最长"（毫秒）, "数量"（各数量的平均值）}}。
+        """
+        durations = {}
+        counts = {}
+        for span in self.spans():
+            durations.setdefault(span.name, []).append(span.duration * 1000)
+            totals = counts.setdefault(span.name, {})
+            for key, value in span.counts.items():
+                total = totals.setdefault(key, [0, 0])
+                total[0] += value
+                total[1] += 1
+
+        stats = {}
+        for name, values in durations.items():
+            values.sort()
+            stats[name] = {
+                "次数": len(values),
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "最长": values[-1],
+                "数量": {key: total / count for key, (total, count) in counts[name].items()},
+            }
+        return stats
+
+    def _push(self, span):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(span)
+
+    def _finish(self, span, duration):
+        self._local.stack.pop()
+        record = SpanRecord(span.name, span.wall_time, duration, span.counts)
+        with self._lock:
+            self._spans.append(record)
+            if duration * 1000 >= self.slow_threshold_ms:
+                self._slow.append(record)
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "counts", "wall_time", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.counts = {}
+
+    def __enter__(self):
+        self.wall_time = time.time()
+        self.tracer._push(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._finish(self, time.perf_counter() - self.start)
+        return False
+
+
+# 程序共用的计时器
+tracer = Tracer()
@@ -0,0 +1,53 @@
+import os
+from datetime import datetime, timedelta
+
+from .tracing import tracer
+
+# 垃圾桶文件默认保留 7 天
+DEFAULT_EXPIRY_DAYS = 7
+
+
+def expiry_timestamp(expiry_days=DEFAULT_EXPIRY_DAYS):
+    return (datetime.now() - timedelta(days=expiry_days)).timestamp()
+
+
+def legacy_backup_id(file_name):
+    """旧格式备份文件 {calc_id}_{时间戳}.json 对应的记录 ID，不是旧格式时返回 None"""
+    if not file_name.endswith('.json') or '_' not in file_name:
+        return None
+    return file_name[:-len('.json')].rsplit('_', 1)[0]
+
+
+def list_legacy_backups(trash_dir):
+    """列出旧格式的整份备份文件，返回 (文件名, 记录ID, 修改时间) 列表"""
+    backups = []
+    if not os.path.exists(trash_dir):
+        return backups
+    with os.scandir(trash_dir) as it:
+        for entry in it:
+            calc_id = legacy_backup_id(entry.name)
+            if calc_id and entry.is_file():
+                backups.append((entry.name, calc_id, entry.stat().st_mtime))
+    return backups
+
+
+def clean_trash(trash_dir, expiry_days=DEFAULT_EXPIRY_DAYS, versions=None):
+    """清理超过过期时间的旧格式备份文件和版本历史，返回删除的备份文件和版本数"""
+    with tracer.span("clean_trash"):
+        expiry = expiry_timestamp(expiry_days)
+        backups = list_legacy_backups(trash_dir)
+        removed = 0
+        for file_name, _, mod_time in backups:
+            # 如果文件超过过期时间，则删除
+            if mod_time < expiry:
+                os.remove(os.path.join(trash_dir, file_name))
+                removed += 1
+                print(f"删除过期垃圾文件: {file_name}")
+        record_ids = versions.record_ids() if versions is not None else []
+        for calc_id in record_ids:
+            expired = versions.expire(calc_id, expiry)
+            if expired:
+                removed += expired
+                print(f"删除过期版本: {calc_id}")
+        tracer.annotate(files=len(backups) + len(record_ids), removed=removed)
+        return removed
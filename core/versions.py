@@ -0,0 +1,185 @@
+import os
+import json
+import threading
+import time
+
+from .fileio import atomic_write_json
+
+# 每条记录在垃圾桶中的三个文件
+LATEST_SUFFIX = ".latest"      # 最近一次备份的完整内容
+DELTAS_SUFFIX = ".deltas"      # 反向差异，每行把某个版本还原为上一个版本
+INDEX_SUFFIX = ".versions"     # 版本索引
+
+
+def diff(old, new):
+    """计算把 old 变为 new 的差异
+
+    两边都是字典时逐键比较并递归：
+    "-" 是要删除的键，"=" 是要替换的值，"~" 是需要递归修改的子字典。
+    """
+    delta = {}
+    removed = [key for key in old if key not in new]
+    if removed:
+        delta["-"] = removed
+    for key, value in new.items():
+        if key in old and old[key] == value:
+            continue
+        if key in old and isinstance(old[key], dict) and isinstance(value, dict):
+            delta.setdefault("~", {})[key] = diff(old[key], value)
+        else:
+            delta.setdefault("=", {})[key] = value
+    return delta
+
+
+def patch(obj, delta):
+    """把 diff 得到的差异应用到 obj 上，返回新的对象（不修改 obj）"""
+    result = dict(obj)
+    for key in delta.get("-", ()):
+        result.pop(key, None)
+    result.update(delta.get("=", {}))
+    for key, sub_delta in delta.get("~", {}).items():
+        result[key] = patch(result.get(key, {}), sub_delta)
+    return result
+
+
+class VersionStore:
+    """垃圾桶中每条记录的版本历史
+
+    每条记录只保留一份最近备份的完整内容（{id}.latest），更早的版本以反向差异
+    的形式追加在 {id}.deltas 中，{id}.versions 是版本索引（版本号、时间、标题、
+    差异在文件中的位置）。查找和恢复最近的备份只需读取一个文件，磁盘占用随修改量
+    而不是记录大小增长。
+    """
+
+    def __init__(self, trash_dir):
+        self.trash_dir = trash_dir
+        # 后台保存线程写入，主线程浏览和恢复
+        self._lock = threading.RLock()
+
+    def _path(self, calc_id, suffix):
+        return os.path.join(self.trash_dir, f"{calc_id}{suffix}")
+
+    def versions(self, calc_id):
+        """返回版本索引（从旧到新），没有备份时返回空列表"""
+        with self._lock:
+            try:
+                with open(self._path(calc_id, INDEX_SUFFIX), 'r', encoding='utf-8') as f:
+                    return json.load(f).get("版本", [])
+            except FileNotFoundError:
+                return []
+
+    def record_ids(self):
+        """垃圾桶中有版本历史的所有记录 ID"""
+        with self._lock:
+            if not os.path.exists(self.trash_dir):
+                return []
+            return [name[:-len(INDEX_SUFFIX)] for name in os.listdir(self.trash_dir)
+                    if name.endswith(INDEX_SUFFIX)]
+
+    def latest(self, calc_id):
+        """最近一次备份的完整内容，没有备份时返回 None"""
+        with self._lock:
+            try:
+                with open(self._path(calc_id, LATEST_SUFFIX), 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                return None
+
+    def get(self, calc_id, version):
+        """还原指定版本：从最近的备份开始依次应用反向差异"""
+        with self._lock:
+            entries = self.versions(calc_id)
+            if version not in [entry["版本"] for entry in entries]:
+                raise KeyError(version)
+            data = self.latest(calc_id)
+            newer = [entry for entry in entries[:-1] if entry["版本"] >= version]
+            if newer:
+                with open(self._path(calc_id, DELTAS_SUFFIX), 'rb') as f:
+                    for entry in reversed(newer):
+                        f.seek(entry["offset"])
+                        data = patch(data, json.loads(f.read(entry["length"])))
+            return data
+
+    def add_version(self, calc_id, data, timestamp=None):
+        """把 data 保存为该记录的最新备份版本"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            entries = self.versions(calc_id)
+            previous = self.latest(calc_id)
+            if previous is not None and entries:
+                # 原来的最新版本改为以反向差异保存
+                line = (json.dumps(diff(data, previous), ensure_ascii=False) + "\n").encode('utf-8')
+                deltas_path = self._path(calc_id, DELTAS_SUFFIX)
+                with open(deltas_path, 'ab') as f:
+                    offset = f.tell()
+                    f.write(line)
+                entries[-1]["offset"] = offset
+                entries[-1]["length"] = len(line)
+            number = entries[-1]["版本"] + 1 if entries else 1
+            entries.append({"版本": number, "时间": timestamp, "标题": data.get("标题", "未知记录")})
+            atomic_write_json(self._path(calc_id, LATEST_SUFFIX), data)
+            self._write_index(calc_id, entries)
+            return number
+
+    def delete_version(self, calc_id, version):
+        """删除某个版本，其余版本重新编码"""
+        with self._lock:
+            entries = self.versions(calc_id)
+            kept = [(entry, self.get(calc_id, entry["版本"])) for entry in entries if entry["版本"] != version]
+            self._rewrite(calc_id, kept)
+
+    def expire(self, calc_id, expiry_timestamp):
+        """删除早于 expiry_timestamp 的版本，返回删除的版本数"""
+        with self._lock:
+            entries = self.versions(calc_id)
+            expired = [entry for entry in entries if entry["时间"] < expiry_timestamp]
+            if not expired:
+                return 0
+            if len(expired) == len(entries):
+                self.remove(calc_id)
+                return len(expired)
+            # 剩下的版本的反向差异不依赖更早的版本，只需重写差异文件去掉过期部分
+            remaining = entries[len(expired):]
+            deltas_path = self._path(calc_id, DELTAS_SUFFIX)
+            chunks = []
+            with open(deltas_path, 'rb') as f:
+                for entry in remaining[:-1]:
+                    f.seek(entry["offset"])
+                    chunks.append(f.read(entry["length"]))
+            offset = 0
+            for entry, chunk in zip(remaining[:-1], chunks):
+                entry["offset"] = offset
+                offset += len(chunk)
+            if chunks:
+                temp_path = deltas_path + ".part"
+                with open(temp_path, 'wb') as f:
+                    f.writelines(chunks)
+                os.replace(temp_path, deltas_path)
+            elif os.path.exists(deltas_path):
+                os.remove(deltas_path)
+            self._write_index(calc_id, remaining)
+            return len(expired)
+
+    def remove(self, calc_id):
+        """删除该记录的全部版本"""
+        with self._lock:
+            for suffix in (LATEST_SUFFIX, DELTAS_SUFFIX, INDEX_SUFFIX):
+                path = self._path(calc_id, suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _write_index(self, calc_id, entries):
+        atomic_write_json(self._path(calc_id, INDEX_SUFFIX), {"版本": entries})
+
+    def _rewrite(self, calc_id, kept):
+        """用 (索引条目, 完整内容) 列表重新生成该记录的全部版本文件"""
+        self.remove(calc_id)
+        for entry, data in kept:
+            self.add_version(calc_id, data, entry["时间"])
+        if kept:
+            # 保留原来的版本号
+            entries = self.versions(calc_id)
+            for new_entry, (old_entry, _) in zip(entries, kept):
+                new_entry["版本"] = old_entry["版本"]
+            self._write_index(calc_id, entries)
+
@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+
+
+class BackgroundWriter:
+    """后台写入线程
+
+    写入任务按 key（通常是记录 ID）排队，在单独的线程中依次执行；同一个 key
+    尚未开始执行的任务会被新提交的任务替换，因此连续多次保存同一条记录只会
+    真正写入一次。每个任务完成后调用 on_done(key, result, error)，该回调在
+    后台线程中执行，GUI 需要自行转发到主线程。
+    """
+
+    def __init__(self, on_done=None, name="background-writer"):
+        self.on_done = on_done
+        self._pending = OrderedDict()
+        self._active = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, key, func, *args):
+        """提交写入任务，替换同一 key 尚未执行的旧任务"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("后台写入线程已关闭")
+            self._pending[key] = (func, args)
+            self._cond.notify_all()
+
+    def discard(self, key):
+        """取消同一 key 尚未执行的任务"""
+        with self._cond:
+            self._pending.pop(key, None)
+
+    def is_pending(self, key):
+        """该 key 是否还有排队中或正在执行的任务"""
+        with self._cond:
+            return key in self._pending or key == self._active
+
+    def flush(self, timeout=None):
+        """等待所有已提交的任务完成，返回是否在超时前完成"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and self._active is None, timeout)
+
+    def close(self, timeout=None):
+        """写完剩余任务后结束后台线程"""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                key, (func, args) = self._pending.popitem(last=False)
+                self._active = key
+
+            result = None
+            error = None
+            try:
+                result = func(*args)
+            except Exception as e:
+                error = e
+
+            with self._cond:
+                self._active = None
+                self._cond.notify_all()
+
+            if self.on_done is not None:
+                try:
+                    self.on_done(key, result, error)
+                except Exception as e:
+                    print(f"处理写入结果时出错 ({key}): {e}")
@@ -1,41 +1,418 @@
 import sys
 import os
-import json
-import shutil
+import bisect
 from datetime import datetime, timedelta
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                            QHBoxLayout, QPushButton, QLabel, QListWidget,
                            QStackedWidget, QLineEdit, QMessageBox, QListWidgetItem,
                            QFrame, QScrollArea, QSizePolicy, QSpacerItem, QMenu,
                            QButtonGroup, QRadioButton, QToolButton, QDialog, QDialogButtonBox,
-                           QInputDialog, QCheckBox, QGridLayout, QTabWidget)
-from PyQt6.QtCore import Qt, QSize, pyqtSignal
-from PyQt6.QtGui import QFont, QIcon, QCursor, QAction
+                           QInputDialog, QCheckBox, QGridLayout, QTabWidget,
+                           QTableView, QHeaderView, QAbstractItemView, QTableWidget, QTableWidgetItem,
+                           QFileDialog)
+from PyQt6.QtCore import Qt, QSize, QTimer, pyqtSignal, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QFont, QIcon, QCursor, QAction, QColor, QKeySequence, QShortcut
+
+from core import (RecordStore, BetMatrix, NUMBERS, Round, new_round_id,
+                  BackgroundWriter, open_storage)
+from core.journal import bet_entry, add_person_entry, delete_person_entry
+from core.csv_io import import_bets_csv, iter_export_rows, iter_stored_records, write_csv
+from core.profiling import profiler
+from core.tracing import tracer
+
+
+class PersonBetTotals:
+    """用户投注详情页的累计总额
+
+    保存每个号码输入框当前解析出的金额，输入框变化时只用新旧金额的差值
+    更新投注总额，不再重新解析全部 49 个输入框。
+    """
+
+    def __init__(self, bets=None):
+        self.amounts = [0.0] * (len(NUMBERS) + 1)
+        self.total = 0.0
+        if bets:
+            for number in NUMBERS:
+                amount = bets.get(str(number))
+                if amount is not None and amount > 0:
+                    self.amounts[number] = amount
+                    self.total += amount
+
+    def set_text(self, number, text):
+        """根据输入框文本更新某个号码的金额，无效或非正数输入按 0 处理"""
+        try:
+            amount = float(text.strip()) if text.strip() else 0.0
+        except ValueError:
+            amount = 0.0
+        if amount <= 0:
+            amount = 0.0
+        self.total += amount - self.amounts[number]
+        self.amounts[number] = amount
+
+    def winning_amount(self, winning_number, payout_rate):
+        if winning_number is None or payout_rate is None or payout_rate <= 0:
+            return 0.0
+        if not 1 <= winning_number <= len(NUMBERS):
+            return 0.0
+        return self.amounts[winning_number] * payout_rate
+
+
+class ResultsTableModel(QAbstractTableModel):
+    """用户投注结果表格模型
+
+    行按用户名排序。每次总额更新时只对新增、删除或数值发生变化的行发出通知，
+    配合 QTableView 只绘制可见的行。
+    """
+    HEADERS = ["用户", "投注总额", "中奖金额", "盈亏"]
+    
+    # 一次增删的行数超过该值时直接重置模型
+    RESET_THRESHOLD = 64
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._names = []
+        self._results = {}
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._names)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        name = self._names[index.row()]
+        bet_amount, win_amount = self._results[name]
+        net_result = win_amount - bet_amount # 计算盈亏
+        column = index.column()
+        
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return name
+            if column == 1:
+                return f"{bet_amount:.2f}"
+            if column == 2:
+                return f"{win_amount:.2f}"
+            return f"{net_result:+.2f}"
+        if role == Qt.ItemDataRole.ForegroundRole and column == 3:
+            # 根据盈亏设置颜色
+            return QColor("#4CAF50") if net_result >= 0 else QColor("#f44336")
+        if role == Qt.ItemDataRole.TextAlignmentRole and column > 0:
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return None
+    
+    def person_at(self, row):
+        return self._names[row]
+    
+    def update_results(self, results_by_person):
+        """用新的用户结果更新模型，只通知发生变化的行"""
+        new_results = {
+            name: (results.get("投注总额", 0.0), results.get("中奖金额", 0.0))
+            for name, results in results_by_person.items()
+        }
+        removed = [name for name in self._names if name not in new_results]
+        added = [name for name in new_results if name not in self._results]
+        
+        if len(removed) + len(added) > self.RESET_THRESHOLD:
+            self.beginResetModel()
+            self._names = sorted(new_results)
+            self._results = new_results
+            self.endResetModel()
+            return
+        
+        for name in removed:
+            row = bisect.bisect_left(self._names, name)
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._names[row]
+            del self._results[name]
+            self.endRemoveRows()
+        
+        for name in added:
+            row = bisect.bisect_left(self._names, name)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._names.insert(row, name)
+            self._results[name] = new_results[name]
+            self.endInsertRows()
+        
+        for row, name in enumerate(self._names):
+            value = new_results[name]
+            if self._results[name] != value:
+                self._results[name] = value
+                self.dataChanged.emit(self.index(row, 1), self.index(row, len(self.HEADERS) - 1))
+    
+    def update_people(self, results_by_person, names):
+        """只更新指定用户的行（开奖设置变化时只有部分用户的中奖金额会变）"""
+        for name in names:
+            results = results_by_person.get(name)
+            row = bisect.bisect_left(self._names, name)
+            if results is None or row >= len(self._names) or self._names[row] != name:
+                continue
+            value = (results.get("投注总额", 0.0), results.get("中奖金额", 0.0))
+            if self._results[name] != value:
+                self._results[name] = value
+                self.dataChanged.emit(self.index(row, 1), self.index(row, len(self.HEADERS) - 1))
+
+
+class LiabilityTableModel(QAbstractTableModel):
+    """各号码风险表模型
+
+    固定 49 行，每行是该号码开出时的投注合计、派彩额和商家盈亏。数值来自
+    投注矩阵维护的各号码合计，刷新时只通知数值发生变化的行。
+    """
+    HEADERS = ["号码", "投注合计", "派彩额", "商家盈亏"]
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = [(number, 0.0, 0.0, 0.0) for number in NUMBERS]
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        number, stake, payout, profit = self._rows[index.row()]
+        column = index.column()
+        
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return str(number)
+            if column == 1:
+                return f"{stake:.2f}"
+            if column == 2:
+                return f"{payout:.2f}"
+            return f"{profit:+.2f}"
+        if role == Qt.ItemDataRole.ForegroundRole and column == 3:
+            # 根据盈亏设置颜色
+            return QColor("#4CAF50") if profit >= 0 else QColor("#f44336")
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if column == 0:
+                return int(Qt.AlignmentFlag.AlignCenter)
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return None
+    
+    def update_table(self, table):
+        """用 liability_table 的结果更新模型，只通知发生变化的行"""
+        for row, values in enumerate(table):
+            if self._rows[row] != values:
+                self._rows[row] = values
+                self.dataChanged.emit(self.index(row, 1), self.index(row, len(self.HEADERS) - 1))
+
+
+class BetGridPage(QWidget):
+    """用户投注详情页
+
+    页面（49 个号码标签和输入框）只创建一次，查看不同人员时通过 bind
+    重新填入数值，不再每次重建整个控件树。
+    """
+    back_requested = pyqtSignal()
+    save_requested = pyqtSignal(str)
+    amount_changed = pyqtSignal(int, str)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.person_name = None
+        
+        main_layout = QVBoxLayout()
+        main_layout.setContentsMargins(10, 10, 10, 10)
+        self.setLayout(main_layout)
+        
+        # 添加标题
+        title_layout = QHBoxLayout()
+        back_button = QPushButton("返回")
+        back_button.setObjectName("backButton")
+        back_button.clicked.connect(self.back_requested.emit)
+        
+        self.title_label = QLabel()
+        self.title_label.setObjectName("pageTitle")
+        
+        title_layout.addWidget(back_button)
+        title_layout.addWidget(self.title_label)
+        title_layout.addStretch()
+        
+        main_layout.addLayout(title_layout)
+        main_layout.addSpacing(10)
+        
+        # 创建滚动区域
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
+        self.scroll_area.setFrameShape(QFrame.Shape.NoFrame)
+        
+        # 创建滚动内容窗口部件
+        scroll_content = QWidget()
+        scroll_layout = QVBoxLayout(scroll_content)
+        scroll_layout.setContentsMargins(5, 5, 5, 5)
+        
+        # 添加投注数字区域
+        details_frame = QFrame()
+        details_frame.setObjectName("detailsFrame")
+        details_layout = QVBoxLayout(details_frame)
+        
+        # 创建网格布局来显示数字输入框 (7列 x 7行)
+        grid_layout = QGridLayout()
+        grid_layout.setSpacing(10)
+        
+        # 输入框引用，用数字字符串作为键
+        self.inputs = {}
+        
+        # 生成1-49的输入框
+        for i in NUMBERS:
+            number_label = QLabel(str(i))
+            number_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            number_label.setMinimumWidth(30)
+            
+            number_input = QLineEdit()
+            number_input.setObjectName(f"numberInput_{i}")
+            number_input.setPlaceholderText("金额")
+            number_input.setMaximumWidth(80)
+            # 只连接一次信号，变化时只通知这一个号码
+            number_input.textChanged.connect(lambda text, n=i: self.amount_changed.emit(n, text))
+            
+            # 计算行列位置
+            row = (i - 1) // 7
+            col = (i - 1) % 7
+            
+            # 添加到网格布局
+            grid_layout.addWidget(number_label, row, col * 2) # 标签占一列
+            grid_layout.addWidget(number_input, row, col * 2 + 1) # 输入框占一列
+            
+            self.inputs[str(i)] = number_input
+            
+        details_layout.addLayout(grid_layout)
+        details_layout.addSpacing(15)
+        
+        # 添加总计信息区域
+        total_frame = QFrame()
+        total_frame.setObjectName("totalInfoFrame")
+        total_layout = QVBoxLayout(total_frame)
+        
+        # 显示投注总额和中奖金额
+        self.total_bet_label = QLabel("投注总额: 0.00")
+        self.total_bet_label.setObjectName("totalBetLabel")
+        
+        self.winning_amount_label = QLabel("中奖金额: 0.00")
+        self.winning_amount_label.setObjectName("winningAmountLabel")
+        
+        total_layout.addWidget(self.total_bet_label)
+        total_layout.addWidget(self.winning_amount_label)
+        
+        details_layout.addWidget(total_frame)
+        
+        # 添加详情框架到滚动区域内容
+        scroll_layout.addWidget(details_frame)
+        
+        # 设置滚动区域内容
+        self.scroll_area.setWidget(scroll_content)
+        
+        # 添加滚动区域到主布局
+        main_layout.addWidget(self.scroll_area, 1)
+        
+        # 添加按钮区域
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+        
+        # 添加保存按钮
+        save_button = QPushButton("保存")
+        save_button.setObjectName("primaryButton")
+        save_button.clicked.connect(lambda: self.save_requested.emit(self.person_name))
+        buttons_layout.addWidget(save_button)
+        
+        main_layout.addLayout(buttons_layout)
+    
+    def bind(self, person_name, bets):
+        """切换到另一个人员：只更新标题和输入框中的金额"""
+        self.person_name = person_name
+        self.title_label.setText(f"{person_name} - 用户投注详情")
+        
+        for number_str, number_input in self.inputs.items():
+            bet_amount = bets.get(number_str) # 获取金额，可能是数字或None
+            text = f"{bet_amount:.2f}" if bet_amount is not None and bet_amount > 0 else ""
+            # 填入数值时不触发 amount_changed，总额由调用方重新计算
+            number_input.blockSignals(True)
+            number_input.setText(text)
+            number_input.blockSignals(False)
+        
+        self.scroll_area.verticalScrollBar().setValue(0)
+
 
 class ExpenseCalculator(QMainWindow):
-    def __init__(self):
+    # 后台保存完成信号：(记录ID, 写入的文件路径, 错误)
+    save_finished = pyqtSignal(str, object, object)
+    
+    # 启动时后台加载的一步完成信号：(步骤名称, 结果, 错误)
+    startup_stage_loaded = pyqtSignal(str, object, object)
+    
+    # 启动后每次向侧边栏加入的历史记录条数，两批之间回到事件循环处理界面操作
+    history_chunk_size = 500
+    
+    # 详情页总额标签的刷新延迟（毫秒），0 表示每次输入后立即刷新
+    detail_total_debounce_ms = 0
+    
+    # 最后一次修改之后多久（毫秒）在后台写入索引和账本文件
+    metadata_save_delay_ms = 1000
+    
+    def __init__(self, base_dir=None):
         super().__init__()
         self.setWindowTitle("多事件计算器")
         self.setGeometry(100, 100, 900, 650)
         
-        # 确保history文件夹存在
-        self.history_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history")
-        if not os.path.exists(self.history_dir):
-            os.makedirs(self.history_dir)
-            
-        # 确保templates文件夹存在
-        self.templates_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
-        if not os.path.exists(self.templates_dir):
-            os.makedirs(self.templates_dir)
-            
-        # 创建垃圾桶文件夹
-        self.trash_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trash")
-        if not os.path.exists(self.trash_dir):
-            os.makedirs(self.trash_dir)
+        # 打开存储：迁移后程序目录中有 calculator.db 时使用 SQLite，
+        # 否则使用 history、templates、trash 文件夹中的 JSON 文件
+        # （base_dir 默认为程序目录，基准测试等场合可以指定其它目录）
+        self.storage = open_storage(base_dir or os.path.dirname(os.path.abspath(__file__)))
             
         # 添加垃圾桶过期时间（7天）
         self.trash_expiry_days = 7
         
+        # 垃圾桶中每条记录的版本历史
+        self.versions = self.storage.versions
+        
+        # 历史记录索引，侧边栏从索引生成而不必逐个读取记录
+        self.history_index = self.storage.index
+        
+        # 单笔修改只写入这一笔（JSON 存储追加到修改日志，SQLite 存储直接更新对应的行）
+        self.journal = self.storage.journal
+        
+        # 跨期的每人账本，保存记录时只更新这一期的贡献
+        self.ledger = self.storage.ledger
+        
+        # 后台保存线程，完成后通过信号回到主线程
+        self.save_writer = BackgroundWriter(on_done=self.save_finished.emit)
+        self.save_finished.connect(self.on_save_finished)
+        # 保存完成后需要显示的提示：{记录ID: (标题, 内容)}
+        self.pending_save_notices = {}
+        
+        # 索引和账本的修改先只记在内存中，停止保存一段时间后再由单独的后台线程写入，
+        # 连续保存、修改多条记录时不会每次都在主线程中重写整个文件
+        self.metadata_writer = BackgroundWriter(name="metadata-writer")
+        self.metadata_save_timer = QTimer(self)
+        self.metadata_save_timer.setSingleShot(True)
+        self.metadata_save_timer.setInterval(self.metadata_save_delay_ms)
+        self.metadata_save_timer.timeout.connect(self.flush_metadata_saves)
+        
+        # 启动时的后台加载线程：窗口先显示，历史记录、模板随后分步载入
+        self.startup_loader = BackgroundWriter(on_done=self.startup_stage_loaded.emit, name="startup-loader")
+        self.startup_stage_loaded.connect(self.on_startup_stage_loaded)
+        self.history_loading = False
+        # 历史记录加载期间保存的记录，加载完成后再更新索引和账本
+        self.deferred_index_updates = set()
+        # 分批填充侧边栏的批次编号，重新填充时旧的批次不再继续
+        self.history_fill_generation = 0
+        
         # 创建主窗口部件
         main_widget = QWidget()
         self.setCentralWidget(main_widget)
@@ -55,9 +432,16 @@ class ExpenseCalculator(QMainWindow):
         sidebar.setLayout(sidebar_layout)
         
         # 添加历史记录标题
-        history_label = QLabel("历史记录")
-        history_label.setObjectName("sectionTitle")
-        sidebar_layout.addWidget(history_label)
+        self.history_label = QLabel("历史记录")
+        self.history_label.setObjectName("sectionTitle")
+        sidebar_layout.addWidget(self.history_label)
+        
+        # 添加搜索框，按标题、日期或人员名筛选历史记录
+        self.history_search_input = QLineEdit()
+        self.history_search_input.setPlaceholderText("搜索标题、日期或人员")
+        self.history_search_input.setClearButtonEnabled(True)
+        self.history_search_input.textChanged.connect(lambda text: self.update_history_list())
+        sidebar_layout.addWidget(self.history_search_input)
         
         # 添加历史记录列表
         self.history_list = QListWidget()
@@ -93,6 +477,12 @@ class ExpenseCalculator(QMainWindow):
         trash_button.clicked.connect(self.show_trash_contents)
         sidebar_layout.addWidget(trash_button)
         
+        # 添加客户账本按钮
+        ledger_button = QPushButton("客户账本")
+        ledger_button.setObjectName("actionButton")
+        ledger_button.clicked.connect(self.show_ledger_dialog)
+        sidebar_layout.addWidget(ledger_button)
+        
         # 添加模板选项
         templates_label = QLabel("模板管理")
         templates_label.setObjectName("sectionTitle")
@@ -143,13 +533,13 @@ class ExpenseCalculator(QMainWindow):
         
         self.content_stack.addWidget(welcome_widget)
         
-        # 初始化数据
-        self.calculations = {}
+        # 初始化数据（记录内容按需加载）
+        self.calculations = RecordStore(self.storage)
         self.current_calculation_id = None
         self.templates = {}
         
-        # 存储每个人的消费数据 (现在是投注数据)
-        self.people_data = {}
+        # 存储每个人的消费数据 (现在是投注数据，人员×49 的矩阵)
+        self.people_data = BetMatrix()
         
         # 存储当前计算的人数 (保持用于显示)
         self.current_num_people = 0
@@ -164,13 +554,38 @@ class ExpenseCalculator(QMainWindow):
         # 标记是否是直接添加模式
         self.direct_add_mode = False
         
-        # 加载历史记录和模板
-        self.load_history()
-        self.load_templates()
+        # 可复用的用户投注详情页（首次查看详情时创建）
+        self.bet_grid_page = None
+        
+        # 用户投注详情页的累计总额和对应的标签
+        self.detail_totals = None
+        self.detail_total_bet_label = None
+        self.detail_winning_amount_label = None
+        self.detail_total_timer = QTimer(self)
+        self.detail_total_timer.setSingleShot(True)
+        self.detail_total_timer.timeout.connect(self.update_person_total)
         
         # 设置应用风格
         self.setup_styles()
         
+        # 隐藏的诊断窗口（Ctrl+Shift+D）：各操作的耗时分布和慢操作日志
+        diagnostics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        diagnostics_shortcut.activated.connect(self.show_diagnostics_dialog)
+        
+        # 在后台加载历史记录和模板，并清理过期的备份
+        # （保存时只会清理被保存的那条记录的版本）
+        self.start_background_load()
+        
+    @property
+    def current_calculation_id(self):
+        return self._current_calculation_id
+    
+    @current_calculation_id.setter
+    def current_calculation_id(self, calc_id):
+        # 当前记录固定在记录存储中，不会被 LRU 淘汰
+        self._current_calculation_id = calc_id
+        self.calculations.pin(calc_id)
+        
     def history_item_clicked(self, item):
         """单击选中历史记录项"""
         # 通过样式显示选中状态
@@ -185,6 +600,8 @@ class ExpenseCalculator(QMainWindow):
         
         load_action = menu.addAction("加载")
         rename_action = menu.addAction("重命名")
+        export_action = menu.addAction("导出为 CSV")
+        export_all_action = menu.addAction("导出全部记录为 CSV")
         delete_action = menu.addAction("删除")
         
         # 获取当前选中的项
@@ -199,6 +616,12 @@ class ExpenseCalculator(QMainWindow):
             self.load_calculation_from_history(item)
         elif action == rename_action:
             self.rename_history_record(item)
+        elif action == export_action:
+            calc_id = item.data(Qt.ItemDataRole.UserRole)
+            self.export_records_to_csv([calc_id], f"{item.text()}.csv")
+        elif action == export_all_action:
+            calc_ids = [calc_id for calc_id, _ in self.history_index.sorted_entries()][::-1]
+            self.export_records_to_csv(calc_ids, "全部记录.csv")
         elif action == delete_action:
             self.delete_record(item)
             
@@ -211,8 +634,9 @@ class ExpenseCalculator(QMainWindow):
         calc_id = item.data(Qt.ItemDataRole.UserRole)
         current_title = ""
         
-        if calc_id in self.calculations:
-            current_title = self.calculations[calc_id].get("标题", "")
+        header = self.calculations.header(calc_id)
+        if header:
+            current_title = header.get("标题", "")
         
         # 显示输入对话框
         new_title, ok = QInputDialog.getText(
@@ -226,36 +650,30 @@ class ExpenseCalculator(QMainWindow):
             
         # 更新计算数据
         if calc_id in self.calculations:
-            self.calculations[calc_id]["标题"] = new_title.strip()
-            
-            # 保存到文件
-            file_name = f"{calc_id}.json"
-            file_path = os.path.join(self.history_dir, file_name)
+            record = self.calculations[calc_id]
+            record["标题"] = new_title.strip()
             
+            # 在后台保存到文件，完成后更新索引和列表，并在写入成功后再提示
             try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.calculations[calc_id], f, ensure_ascii=False, indent=2)
-                
-                # 更新历史记录列表
-                self.update_history_list()
+                self.pending_save_notices[calc_id] = ("重命名成功", "记录已成功重命名。")
+                self.submit_record_save(calc_id, backup=False)
                 
                 # 如果当前正在查看的是被重命名的记录，则更新标题
                 if calc_id == self.current_calculation_id:
                     self.setWindowTitle(f"多事件计算器 - {new_title}")
-                
-                QMessageBox.information(self, "重命名成功", "记录已成功重命名。")
             except Exception as e:
+                self.pending_save_notices.pop(calc_id, None)
                 QMessageBox.warning(self, "重命名失败", f"重命名记录时出错: {str(e)}")
     
     def create_new_calculation(self):
         """创建新的计算"""
         try:
             # 清空当前人员数据
-            self.people_data = {}
+            self.people_data = BetMatrix()
             
             # 创建新的计算记录 ID 和日期
             import time
-            calculation_id = f"calc_{int(time.time())}"
+            calculation_id = new_round_id()
             calc_date = time.strftime("%Y-%m-%d %H:%M:%S")
             default_title = f"计算 {calc_date}"
             
@@ -275,18 +693,8 @@ class ExpenseCalculator(QMainWindow):
             else:
                 record_title = new_title.strip()
             
-            # 创建新计算结构
-            self.calculations[calculation_id] = {
-                "日期": calc_date,
-                "创建时间": calc_date,
-                "标题": record_title, # 使用用户输入或默认标题
-                "人员": [],
-                "人数": 0,
-                "数据": {},
-                "开奖设置": {"中奖号码": None, "赔率": None}, # 初始化开奖设置
-                "总览": {}, # 初始化总览
-                "用户结果": {} # 初始化用户结果
-            }
+            # 创建新计算结构（使用用户输入或默认标题）
+            self.calculations[calculation_id] = Round.new(record_title, calc_date).record
             
             # 设置当前计算ID
             self.current_calculation_id = calculation_id
@@ -331,26 +739,8 @@ class ExpenseCalculator(QMainWindow):
         # 获取当前计算数据
         calc_data = self.calculations[self.current_calculation_id]
 
-        # 确保人员列表存在
-        if "人员" not in calc_data:
-            calc_data["人员"] = []
-            
-        # 确保数据字典存在
-        if "数据" not in calc_data:
-            calc_data["数据"] = {}
-
-        # 检查人员是否已存在
-        if person_name not in calc_data["人员"]:
-            # 添加人员到列表
-            calc_data["人员"].append(person_name)
-            
-            # 在数据字典中为新人员创建条目（如果不存在）
-            if person_name not in calc_data["数据"]:
-                calc_data["数据"][person_name] = {} # 初始化为空字典，表示没有投注
-                
-            # 更新人数
-            calc_data["人数"] = len(calc_data["人员"])
-            
+        # 添加人员（人员已存在时返回 False）
+        if Round(calc_data).add_person(person_name):
             # 更新内存中的 people_data
             self.people_data = calc_data["数据"]
             
@@ -612,10 +1002,9 @@ class ExpenseCalculator(QMainWindow):
         # 从列表中删除项
         self.people_list.takeItem(row)
         
-        # 从数据结构中删除
+        # 从数据结构中删除（人员名单为 PeopleList，按人名直接删除）
         person_names = self.calculations[self.current_calculation_id]["人员"]
-        if person_name in person_names:
-            person_names.remove(person_name)
+        person_names.discard(person_name)
             
         # 删除该人员的数据
         if person_name in self.people_data:
@@ -634,14 +1023,11 @@ class ExpenseCalculator(QMainWindow):
             QMessageBox.warning(self, "错误", "请输入人员名称！")
             return
             
-        # 检查是否已存在同名人员
+        # 添加到人员列表（PeopleList，同名人员已存在时返回 False）
         person_names = self.calculations[self.current_calculation_id]["人员"]
-        if name in person_names:
+        if not person_names.append(name):
             QMessageBox.warning(self, "错误", f"已存在名为 '{name}' 的人员！")
             return
-            
-        # 添加到人员列表
-        person_names.append(name)
         
         # 更新人数
         self.calculations[self.current_calculation_id]["人数"] = len(person_names)
@@ -664,14 +1050,11 @@ class ExpenseCalculator(QMainWindow):
             QMessageBox.warning(self, "错误", "请输入人员名称！")
             return
             
-        # 检查是否已存在同名人员
+        # 添加到人员列表（PeopleList，同名人员已存在时返回 False）
         person_names = self.calculations[self.current_calculation_id]["人员"]
-        if name in person_names:
+        if not person_names.append(name):
             QMessageBox.warning(self, "错误", f"已存在名为 '{name}' 的人员！")
             return
-            
-        # 添加到人员列表
-        person_names.append(name)
         
         # 更新人数
         self.calculations[self.current_calculation_id]["人数"] = len(person_names)
@@ -765,6 +1148,7 @@ class ExpenseCalculator(QMainWindow):
         self.results_summary_widget = QWidget() 
         self.results_summary_widget.setObjectName("resultsSummary")
         self.results_layout = QVBoxLayout(self.results_summary_widget) # 将布局应用到QWidget
+        self.create_results_panel()
         
         content_layout.addWidget(self.results_summary_widget) # 将QWidget添加到主内容布局
         
@@ -782,8 +1166,13 @@ class ExpenseCalculator(QMainWindow):
         add_person_button.setObjectName("smallButton")
         add_person_button.clicked.connect(self.show_add_person_dialog)
         
+        import_button = QPushButton("导入投注")
+        import_button.setObjectName("smallButton")
+        import_button.clicked.connect(self.import_bets_from_csv)
+        
         people_header.addWidget(people_title)
         people_header.addStretch()
+        people_header.addWidget(import_button)
         people_header.addWidget(add_person_button)
         people_layout.addLayout(people_header)
         
@@ -817,6 +1206,9 @@ class ExpenseCalculator(QMainWindow):
              # 如果已存在，先移除旧的
              self.content_stack.removeWidget(existing_widget)
              existing_widget.deleteLater()
+        
+        # 详情页需要排在计算页面之后
+        self.detach_bet_grid_page()
              
         self.content_stack.addWidget(people_widget)
         
@@ -1038,6 +1430,22 @@ class ExpenseCalculator(QMainWindow):
                 font-size: 14px;
                 color: #e0e0e0;
             }
+            QTableView {
+                background-color: #353535;
+                border: 1px solid #454545;
+                border-radius: 4px;
+                color: #e0e0e0;
+                selection-background-color: #2979ff;
+                selection-color: white;
+            }
+            QHeaderView::section {
+                background-color: #3a3a3a;
+                color: #e0e0e0;
+                border: none;
+                border-bottom: 1px solid #454545;
+                padding: 6px;
+                font-weight: bold;
+            }
         """)
 
     def delete_person(self, person_name):
@@ -1055,21 +1463,13 @@ class ExpenseCalculator(QMainWindow):
         
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                # 从人员数据中删除
-                if person_name in self.people_data:
-                    del self.people_data[person_name]
-                
-                # 从人员列表中删除
+                # 从人员列表和人员数据中删除
                 calculation = self.calculations.get(self.current_calculation_id, {})
-                person_list = calculation.get("人员", [])
-                if person_name in person_list:
-                    person_list.remove(person_name)
-                
-                # 更新计算数据
                 calculation["数据"] = self.people_data
+                Round(calculation).remove_person(person_name)
                 
-                # 保存更改
-                self.save_current_calculation()
+                # 保存更改（只追加一条日志）
+                self.commit_edits([delete_person_entry(person_name)])
                 
                 # 更新界面
                 self.load_people_list()
@@ -1082,202 +1482,77 @@ class ExpenseCalculator(QMainWindow):
     def clear_content_pages(self):
         """清除内容页面"""
         # 保留主页面，移除其他页面
+        self.detach_bet_grid_page()
         while self.content_stack.count() > 1:
             widget = self.content_stack.widget(1)
             self.content_stack.removeWidget(widget)
             if widget:
                 widget.deleteLater()
     
+    @profiler.profiled("打开人员")
+    @tracer.traced("show_person_details")
     def show_person_details(self, person_name):
-        # 创建个人详情页面
-        details_widget = QWidget()
-        main_layout = QVBoxLayout()
-        main_layout.setContentsMargins(10, 10, 10, 10)
-        details_widget.setLayout(main_layout)
-        
-        # 添加标题
-        title_layout = QHBoxLayout()
-        back_button = QPushButton("返回")
-        back_button.setObjectName("backButton")
-        back_button.clicked.connect(self.return_from_details)
-        
-        # 修改标题为用户投注详情
-        title_label = QLabel(f"{person_name} - 用户投注详情") 
-        title_label.setObjectName("pageTitle")
-        
-        title_layout.addWidget(back_button)
-        title_layout.addWidget(title_label)
-        title_layout.addStretch()
-        
-        main_layout.addLayout(title_layout)
-        main_layout.addSpacing(10)
-        
-        # 创建滚动区域
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setFrameShape(QFrame.Shape.NoFrame)
-        
-        # 创建滚动内容窗口部件
-        scroll_content = QWidget()
-        scroll_layout = QVBoxLayout(scroll_content)
-        scroll_layout.setContentsMargins(5, 5, 5, 5)
-        
-        # 添加投注数字区域
-        details_frame = QFrame()
-        details_frame.setObjectName("detailsFrame")
-        details_layout = QVBoxLayout(details_frame)
-        
-        # 创建网格布局来显示数字输入框 (7列 x 7行)
-        grid_layout = QGridLayout()
-        grid_layout.setSpacing(10)
-        
-        category_inputs = {}
-        
-        # 生成1-49的输入框
-        for i in range(1, 50):
-            number_label = QLabel(str(i))
-            number_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            number_label.setMinimumWidth(30)
-            
-            number_input = QLineEdit()
-            number_input.setObjectName(f"numberInput_{i}")
-            number_input.setPlaceholderText("金额")
-            number_input.setMaximumWidth(80)
-            
-            # 获取当前用户的投注数据
-            # 使用 self.people_data (它应该在 update_all_totals 后被更新为清理过的数据)
-            user_bets = self.people_data.get(person_name, {})
-            bet_amount = user_bets.get(str(i)) # 获取金额，可能是数字或None
-            
-            # 如果有投注金额，显示在输入框中，否则保持为空
-            if bet_amount is not None and bet_amount > 0:
-                number_input.setText(f"{bet_amount:.2f}") # 格式化显示
-            # else: # 如果是 None 或 0，输入框默认就是空的，不需要setText('')
-            
-            # 计算行列位置
-            row = (i - 1) // 7
-            col = (i - 1) % 7
-            
-            # 添加到网格布局
-            grid_layout.addWidget(number_label, row, col * 2) # 标签占一列
-            grid_layout.addWidget(number_input, row, col * 2 + 1) # 输入框占一列
-            
-            # 保存输入框引用，用数字字符串作为键
-            category_inputs[str(i)] = number_input
-            
-        details_layout.addLayout(grid_layout)
-        details_layout.addSpacing(15)
-        
-        # 添加总计信息区域
-        total_frame = QFrame()
-        total_frame.setObjectName("totalInfoFrame")
-        total_layout = QVBoxLayout(total_frame)
-        
-        # 显示投注总额和中奖金额（将在update_person_total中更新）
-        total_bet_label = QLabel("投注总额: 0.00")
-        total_bet_label.setObjectName("totalBetLabel") # 新的对象名
-        
-        winning_amount_label = QLabel("中奖金额: 0.00")
-        winning_amount_label.setObjectName("winningAmountLabel") # 新的对象名
-        
-        total_layout.addWidget(total_bet_label)
-        total_layout.addWidget(winning_amount_label)
-        
-        details_layout.addWidget(total_frame)
-        
-        # 添加详情框架到滚动区域内容
-        scroll_layout.addWidget(details_frame)
-        
-        # 设置滚动区域内容
-        scroll_area.setWidget(scroll_content)
-        
-        # 添加滚动区域到主布局
-        main_layout.addWidget(scroll_area, 1)
-        
-        # 添加按钮区域
-        buttons_layout = QHBoxLayout()
-        buttons_layout.addStretch()
-        
-        # 添加保存按钮
-        save_button = QPushButton("保存")
-        save_button.setObjectName("primaryButton")
-        save_button.clicked.connect(lambda: self.save_person_details(person_name, category_inputs)) # 传递 category_inputs
-        buttons_layout.addWidget(save_button)
-        
-        main_layout.addLayout(buttons_layout)
-        
-        # 检查并移除旧的详情页
-        if self.content_stack.count() > 2:
-            widget_to_remove = self.content_stack.widget(self.content_stack.count() - 1)
-            self.content_stack.removeWidget(widget_to_remove)
-            widget_to_remove.deleteLater()
-        
-        # 添加新页面并切换
-        self.content_stack.addWidget(details_widget)
-        self.content_stack.setCurrentWidget(details_widget)
+        # 详情页只创建一次，之后切换人员时只重新绑定数据
+        if self.bet_grid_page is None:
+            self.bet_grid_page = BetGridPage()
+            self.bet_grid_page.back_requested.connect(self.return_from_details)
+            self.bet_grid_page.save_requested.connect(
+                lambda name: self.save_person_details(name, self.bet_grid_page.inputs))
+            self.bet_grid_page.amount_changed.connect(self.on_bet_input_changed)
+            self.detail_total_bet_label = self.bet_grid_page.total_bet_label
+            self.detail_winning_amount_label = self.bet_grid_page.winning_amount_label
+        
+        # 获取当前用户的投注数据
+        # 使用 self.people_data (它应该在 update_all_totals 后被更新为清理过的数据)
+        user_bets = self.people_data.get(person_name, {})
+        tracer.annotate(bets=len(user_bets))
+        self.detail_totals = PersonBetTotals(user_bets)
+        self.bet_grid_page.bind(person_name, user_bets)
+        
+        # 详情页始终位于计算页面之后
+        if self.content_stack.indexOf(self.bet_grid_page) < 0:
+            self.content_stack.addWidget(self.bet_grid_page)
+        self.content_stack.setCurrentWidget(self.bet_grid_page)
+        
+        # 显示个人总计
+        self.update_person_total()
+    
+    def detach_bet_grid_page(self):
+        """将详情页移出页面堆栈（不销毁），以免随其它页面一起被删除"""
+        if self.bet_grid_page is not None and self.content_stack.indexOf(self.bet_grid_page) >= 0:
+            self.content_stack.removeWidget(self.bet_grid_page)
+    
+    def on_bet_input_changed(self, number, text):
+        """详情页某个号码的输入变化时，增量更新累计总额"""
+        if self.detail_totals is None:
+            return
+        self.detail_totals.set_text(number, text)
         
-        # 计算并更新个人总计
-        self.update_person_total(person_name, category_inputs, total_bet_label, winning_amount_label)
+        if self.detail_total_debounce_ms > 0:
+            # 连续输入时合并为一次标签刷新
+            self.detail_total_timer.start(self.detail_total_debounce_ms)
+        else:
+            self.update_person_total()
     
-    def update_person_total(self, person_name, category_inputs, total_bet_label, winning_amount_label):
-        """实时更新用户投注详情页的总计信息"""
-        total_bet = 0.0
-        winning_amount = 0.0
+    def update_person_total(self):
+        """根据累计总额刷新用户投注详情页的总计信息"""
+        if self.detail_totals is None or self.detail_total_bet_label is None:
+            return
         
         # 获取当前记录的开奖设置
         prize_settings = {}
         if self.current_calculation_id in self.calculations:
             prize_settings = self.calculations[self.current_calculation_id].get("开奖设置", {})
-            
-        winning_number = prize_settings.get("中奖号码")
-        payout_rate = prize_settings.get("赔率")
-        
-        # 检查开奖设置是否有效
-        can_calculate_winnings = winning_number is not None and payout_rate is not None and payout_rate > 0
-        
-        # 计算投注总额和中奖金额
-        for number_str, input_field in category_inputs.items():
-            try:
-                value_text = input_field.text().strip()
-                if not value_text: # 如果输入为空，跳过
-                    continue
-                    
-                bet_value = float(value_text)
-                if bet_value <= 0:
-                    continue
-                    
-                # 累加投注总额
-                total_bet += bet_value
-                
-                # 如果开奖设置有效且当前数字是中奖号码，计算奖金
-                if can_calculate_winnings and number_str == str(winning_number):
-                    winning_amount += bet_value * payout_rate
-                    
-            except ValueError:
-                # 忽略无效输入
-                pass
         
-        # 更新标签显示
-        total_bet_label.setText(f"投注总额: {total_bet:.2f}")
-        winning_amount_label.setText(f"中奖金额: {winning_amount:.2f}")
+        winning_amount = self.detail_totals.winning_amount(prize_settings.get("中奖号码"), prize_settings.get("赔率"))
         
-        # 为输入框添加信号连接（确保只连接一次或先断开再连接）
-        for number_str, input_field in category_inputs.items():
-            try:
-                # 先尝试断开可能存在的旧连接
-                input_field.textChanged.disconnect()
-            except TypeError: # 如果没有连接，会抛出TypeError
-                pass
-            except Exception as e:
-                print(f"断开信号时出错 ({number_str}): {e}")
-            
-            try:
-                # 添加新连接
-                input_field.textChanged.connect(
-                    lambda: self.update_person_total(person_name, category_inputs, total_bet_label, winning_amount_label)
-                )
-            except Exception as e:
-                print(f"连接信号时出错 ({number_str}): {e}")
+        try:
+            # 更新标签显示
+            self.detail_total_bet_label.setText(f"投注总额: {self.detail_totals.total:.2f}")
+            self.detail_winning_amount_label.setText(f"中奖金额: {winning_amount:.2f}")
+        except RuntimeError:
+            # 详情页已被销毁
+            self.detail_totals = None
     
     def return_from_details(self):
         """从详情页面返回到主计算页面"""
@@ -1295,20 +1570,20 @@ class ExpenseCalculator(QMainWindow):
             # 如果主计算页面不存在（异常情况），则返回欢迎页
             self.content_stack.setCurrentIndex(0)
             
-        # 移除详情页面 (通常是索引大于1的页面)
+        # 移除详情页面 (通常是索引大于1的页面)，可复用的详情页只移出不销毁
         if current_index > main_calc_page_index and current_widget:
             self.content_stack.removeWidget(current_widget)
-            current_widget.deleteLater()
+            if current_widget is not self.bet_grid_page:
+                current_widget.deleteLater()
             
         # 返回后，再次更新主计算页面的显示以确保反映最新数据
         self.update_all_totals()
     
+    @profiler.profiled("结算")
+    @tracer.traced("update_all_totals")
     def update_all_totals(self):
         """更新所有用户的总投注额、总中奖金额和商家盈亏"""
         try:
-            total_bets_all_users = 0.0
-            total_winnings_all_users = 0.0
-            
             # 获取当前记录的开奖设置
             prize_settings = {}
             if self.current_calculation_id in self.calculations:
@@ -1316,70 +1591,22 @@ class ExpenseCalculator(QMainWindow):
             
             winning_number = prize_settings.get("中奖号码")
             payout_rate = prize_settings.get("赔率")
-            can_calculate_winnings = winning_number is not None and payout_rate is not None and payout_rate > 0
-            
-            # 用于存储每个用户的总投注和中奖金额
-            results_by_person = {}
-            
-            # 获取当前计算的人员列表和干净的投注数据
-            current_people = []
-            clean_people_data = {}
-            if self.current_calculation_id in self.calculations:
-                calc_data = self.calculations[self.current_calculation_id]
-                current_people = calc_data.get("人员", [])
-                # 确保只处理当前记录中应该存在的用户数据
-                all_data = calc_data.get("数据", {})
-                for person in current_people:
-                    if person in all_data and isinstance(all_data[person], dict):
-                        # 清理每个用户的投注，只保留数字键
-                        user_bets = {k: v for k, v in all_data[person].items() 
-                                     if k.isdigit() and isinstance(v, (int, float)) and v > 0}
-                        if user_bets: # 只添加有投注的用户
-                           clean_people_data[person] = user_bets
-            
-            # 使用清理后的数据进行计算
-            for person, bets_data in clean_people_data.items():
-                person_total_bet = 0.0
-                person_total_winnings = 0.0
-                
-                # 计算该用户的总投注和中奖金额
-                for number_str, bet_amount in bets_data.items(): 
-                    person_total_bet += bet_amount
-                    # 如果开奖且该号码中奖
-                    if can_calculate_winnings and number_str == str(winning_number):
-                        person_total_winnings += bet_amount * payout_rate
-                
-                # 保存该用户的结果
-                results_by_person[person] = {
-                    "投注总额": person_total_bet,
-                    "中奖金额": person_total_winnings
-                }
-                
-                # 累加全局总计
-                total_bets_all_users += person_total_bet
-                total_winnings_all_users += person_total_winnings
-                
-            # 计算商家盈亏
-            merchant_profit = total_bets_all_users - total_winnings_all_users
             
-            # 更新计算数据中的总览信息和清理后的用户数据
+            # 清理数据并结算，结果写回当前记录的 "总览" 和 "用户结果"
             if self.current_calculation_id in self.calculations:
-                summary_data = {
-                    "总投注额": total_bets_all_users,
-                    "总派彩额": total_winnings_all_users,
-                    "商家盈亏": merchant_profit
-                }
-                # 更新主计算字典
-                self.calculations[self.current_calculation_id]["总览"] = summary_data
-                self.calculations[self.current_calculation_id]["用户结果"] = results_by_person
-                # 将清理后的数据写回 "数据"，确保一致性
-                self.calculations[self.current_calculation_id]["数据"] = clean_people_data
+                calc_round = Round(self.calculations[self.current_calculation_id])
+                settlement = calc_round.settle()
                 # 更新内存中的 people_data 以便详情页使用
-                self.people_data = clean_people_data 
+                self.people_data = calc_round.bets
+                tracer.annotate(people=len(calc_round.people), bets=calc_round.bets.bet_count())
+            else:
+                settlement = Round.new().settle()
+            results_by_person, summary_data = settlement.results, settlement.summary
             
             # 更新界面显示
             if self.results_layout is not None and self.content_stack.currentIndex() == 1:
-                self.update_results_display(results_by_person, total_bets_all_users, total_winnings_all_users, merchant_profit)
+                self.update_results_display(results_by_person, summary_data["总投注额"],
+                                            summary_data["总派彩额"], summary_data["商家盈亏"])
             else:
                 print("Skipping results UI update: Layout not ready or page not visible.")
             
@@ -1394,94 +1621,44 @@ class ExpenseCalculator(QMainWindow):
             return
             
         try:
-            winning_number_text = self.winning_number_input.text().strip()
-            payout_rate_text = self.payout_rate_input.text().strip()
-            
-            winning_number = None
-            if winning_number_text.isdigit():
-                num = int(winning_number_text)
-                if 1 <= num <= 49:
-                    winning_number = num
-                else:
-                    pass # 忽略无效输入
-            
-            payout_rate = None
-            if payout_rate_text:
-                try:
-                    rate = float(payout_rate_text)
-                    if rate > 0:
-                        payout_rate = rate
-                    else:
-                        pass # 赔率必须为正数
-                except ValueError:
-                    pass # 赔率必须是数字
-            
-            prize_settings = {
-                "中奖号码": winning_number,
-                "赔率": payout_rate
-            }
-            
             # 仅保存到当前计算数据中 (内存)
+            # 无效的中奖号码（非 1-49）或赔率（非正数）按未设置处理
             if self.current_calculation_id in self.calculations:
-                self.calculations[self.current_calculation_id]["开奖设置"] = prize_settings
+                calculation = self.calculations[self.current_calculation_id]
                 
-                # 触发总额更新，因为赔率可能影响结果
-                self.update_all_totals()
+                # 只重新计算原中奖号码和新中奖号码上有投注的用户，总览直接由各号码合计得到
+                changed_people = Round(calculation).update_prize(
+                    self.winning_number_input.text(), self.payout_rate_input.text())
+                
+                if self.results_layout is not None and self.content_stack.currentIndex() == 1:
+                    summary_data = calculation["总览"]
+                    if changed_people is None:
+                        # 退回了完整结算，用户结果整体刷新（人员可能有增减）
+                        results_by_person = calculation["用户结果"]
+                    else:
+                        self.results_model.update_people(calculation["用户结果"], changed_people)
+                        results_by_person = None
+                    self.update_results_display(results_by_person, summary_data["总投注额"],
+                                                summary_data["总派彩额"], summary_data["商家盈亏"])
                 
         except Exception as e:
             print(f"保存开奖设置时出错: {e}")
     
+    @tracer.traced("save_current_calculation")
     def save_current_calculation(self):
         """保存当前计算"""
         if not self.current_calculation_id:
             return
             
-        # 获取历史记录的原始文件路径
-        file_name = f"{self.current_calculation_id}.json"
-        file_path = os.path.join(self.history_dir, file_name)
-        
         # 判断是否是在修改历史记录（而不是新建的计算）
-        is_existing_record = os.path.exists(file_path)
+        is_existing_record = self.storage.record_exists(self.current_calculation_id)
         
         # 判断是否是刚刚创建的新记录
-        is_new_record = False
-        if self.current_calculation_id in self.calculations:
-            created_time_str = self.calculations[self.current_calculation_id].get("创建时间", "")
-            if created_time_str:
-                try:
-                    created_time = datetime.strptime(created_time_str, "%Y-%m-%d %H:%M:%S")
-                    # 如果创建时间在最近两分钟内，认为是新记录
-                    is_new_record = (datetime.now() - created_time).total_seconds() < 120
-                except Exception as e:
-                    print(f"解析创建时间时出错: {e}")
+        is_new_record = self.is_new_record(self.current_calculation_id)
         
         # 如果是修改现有历史记录(且不是新记录)，弹出确认对话框
-        if is_existing_record and not is_new_record:
-            reply = QMessageBox.question(
-                self, "确认保存", 
-                "您正在修改历史记录。确定要保存更改吗？",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, 
-                QMessageBox.StandardButton.No
-            )
-            
-            if reply != QMessageBox.StandardButton.Yes:
-                return # 用户取消保存
-        
-        # 将旧版本备份到垃圾桶（如果是修改现有记录）
-        if is_existing_record:
-            try:
-                # 创建备份文件名，包含时间戳以避免冲突
-                backup_timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                backup_file_name = f"{self.current_calculation_id}_{backup_timestamp}.json"
-                backup_path = os.path.join(self.trash_dir, backup_file_name)
-                
-                # 复制原文件到垃圾桶
-                shutil.copy2(file_path, backup_path)
-                
-                # 清理过期的垃圾文件
-                self.clean_trash()
-            except Exception as e:
-                print(f"备份历史记录时出错: {e}")
+        if is_existing_record and not is_new_record and not self.confirm_history_edit():
+            return # 用户取消保存
         
         # 更新人数信息
         if self.current_calculation_id in self.calculations:
@@ -1490,21 +1667,151 @@ class ExpenseCalculator(QMainWindow):
                self.calculations[self.current_calculation_id]["人数"] = len(self.calculations[self.current_calculation_id]["人员"])
             else:
                self.calculations[self.current_calculation_id]["人数"] = 0 # 如果没有人员列表，则为0
+            tracer.annotate(people=self.calculations[self.current_calculation_id]["人数"])
 
-        # 保存到文件
+        # 提交后台保存（修改现有记录时先将旧版本备份到垃圾桶）
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.calculations[self.current_calculation_id], f, ensure_ascii=False, indent=2)
-            
-            # 更新历史记录列表
-            self.update_history_list()
-            
             # 显示保存成功提示（对于新记录或首次创建的记录，不显示提示）
             if not is_new_record:
-                QMessageBox.information(self, "保存成功", "计算数据已成功保存。")
-                
+                self.pending_save_notices[self.current_calculation_id] = ("保存成功", "计算数据已成功保存。")
+            self.submit_record_save(self.current_calculation_id, backup=is_existing_record)
+        except Exception as e:
+            QMessageBox.warning(self, "保存失败", f"无法保存计算数据: {str(e)}")
+    
+    def is_new_record(self, calc_id):
+        """创建时间在最近两分钟内的记录视为刚刚新建的记录"""
+        if calc_id in self.calculations:
+            created_time_str = self.calculations[calc_id].get("创建时间", "")
+            if created_time_str:
+                try:
+                    created_time = datetime.strptime(created_time_str, "%Y-%m-%d %H:%M:%S")
+                    return (datetime.now() - created_time).total_seconds() < 120
+                except Exception as e:
+                    print(f"解析创建时间时出错: {e}")
+        return False
+    
+    def confirm_history_edit(self):
+        """修改历史记录前请用户确认"""
+        reply = QMessageBox.question(
+            self, "确认保存", 
+            "您正在修改历史记录。确定要保存更改吗？",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, 
+            QMessageBox.StandardButton.No
+        )
+        return reply == QMessageBox.StandardButton.Yes
+    
+    def commit_edits(self, entries):
+        """将单笔修改追加到当前记录的修改日志，而不是重写整个记录文件"""
+        calc_id = self.current_calculation_id
+        if not calc_id or calc_id not in self.calculations:
+            return
+        
+        if not self.storage.record_exists(calc_id):
+            # 首次保存还在后台排队时先等它写完：SQLite 的日志条目引用 rounds 表中的记录，
+            # 记录写入之前追加会违反外键约束
+            if self.save_writer.is_pending(calc_id):
+                self.save_writer.flush()
+            if not self.storage.record_exists(calc_id):
+                # 记录还没有写入过磁盘（或首次保存失败），直接完整保存
+                self.save_current_calculation()
+                return
+        
+        is_new_record = self.is_new_record(calc_id)
+        if not is_new_record and not self.confirm_history_edit():
+            return # 用户取消保存
+        
+        record = self.calculations[calc_id]
+        record["人数"] = len(record.get("人员", []))
+        try:
+            with profiler.measure("保存单笔修改"):
+                self.journal.append(record, calc_id, entries)
         except Exception as e:
             QMessageBox.warning(self, "保存失败", f"无法保存计算数据: {str(e)}")
+            return
+        
+        # 修改已写入日志，按最新结果更新账本中这一期的贡献
+        Round(record).settle()
+        if self.history_loading:
+            # 账本还在后台加载，加载完成后再更新
+            self.deferred_index_updates.add(calc_id)
+        else:
+            self.ledger.update(calc_id, record, save=False)
+            self.schedule_metadata_save()
+            
+            # 人员有变化时更新索引中的人员名单，使搜索结果保持最新；
+            # 标题和日期不变，只有正在搜索时列表内容才可能变化
+            entry = self.history_index.get(calc_id) or {}
+            if entry.get("人员") != record.get("人员"):
+                self.history_index.update(calc_id, record, save=False)
+                if self.history_search_input.text().strip():
+                    self.update_history_list()
+        
+        # 日志条目累计较多时，在后台完整保存一次并压缩日志
+        if self.journal.needs_compaction(calc_id):
+            self.submit_record_save(calc_id, backup=True)
+        
+        if not is_new_record:
+            QMessageBox.information(self, "保存成功", "计算数据已成功保存。")
+    
+    def submit_record_save(self, calc_id, backup=True):
+        """在 GUI 线程中复制记录，交给后台线程写入磁盘"""
+        import copy
+        snapshot = copy.deepcopy(self.calculations[calc_id])
+        self.calculations.mark_saving(calc_id)
+        self.save_writer.submit(calc_id, profiler.call, "保存记录", self.storage.save_record,
+                                calc_id, snapshot, backup, self.trash_expiry_days)
+    
+    def on_save_finished(self, calc_id, file_path, error):
+        """后台保存完成（在主线程中执行）"""
+        # 同一记录还有后续保存在排队时，等最后一次完成再处理
+        if self.save_writer.is_pending(calc_id):
+            return
+        self.calculations.mark_saved(calc_id)
+        notice = self.pending_save_notices.pop(calc_id, None)
+        
+        if error is not None:
+            QMessageBox.warning(self, "保存失败", f"无法保存计算数据: {str(error)}")
+            return
+        
+        # 记录可能已在保存期间被删除
+        if calc_id not in self.calculations:
+            return
+        
+        # 历史记录还在后台加载时，等加载完成后再更新索引和账本
+        if self.history_loading:
+            self.deferred_index_updates.add(calc_id)
+        else:
+            # 只更新索引中对应的条目，然后刷新历史记录列表中的这一项
+            old_entry = self.history_index.get(calc_id)
+            self.history_index.update(calc_id, self.calculations[calc_id], file_path, save=False)
+            self.ledger.update(calc_id, self.calculations[calc_id], save=False)
+            self.schedule_metadata_save()
+            self.refresh_history_item(calc_id, old_entry)
+        
+        if notice is not None:
+            QMessageBox.information(self, *notice)
+    
+    def schedule_metadata_save(self):
+        """索引、账本已在内存中修改，稍后再写入磁盘（期间的修改合并为一次写入）"""
+        self.metadata_save_timer.start()
+    
+    def flush_metadata_saves(self):
+        """把索引和账本未保存的修改交给后台线程写入"""
+        self.metadata_save_timer.stop()
+        for name, target in (("索引", self.history_index), ("账本", self.ledger)):
+            snapshot = target.pending_snapshot()
+            if snapshot is not None:
+                self.metadata_writer.submit(name, profiler.call, f"保存{name}", target.write_snapshot, snapshot)
+    
+    def closeEvent(self, event):
+        """关闭窗口前等待后台保存全部完成"""
+        self.startup_loader.close()
+        self.save_writer.close()
+        self.flush_metadata_saves()
+        self.metadata_writer.close()
+        self.storage.close()
+        profiler.save_report()
+        super().closeEvent(event)
     
     def show_restore_notification(self, saved_file):
         """显示撤回保存的通知"""
@@ -1523,100 +1830,126 @@ class ExpenseCalculator(QMainWindow):
         if msg.clickedButton() == restore_button:
             self.restore_from_trash(saved_file)
     
-    def clean_trash(self):
-        """清理超过过期时间的垃圾桶文件"""
-        try:
-            # 计算过期时间
-            expiry_date = datetime.now() - timedelta(days=self.trash_expiry_days)
-            expiry_timestamp = expiry_date.timestamp()
-            
-            # 遍历垃圾桶中的所有文件
-            if os.path.exists(self.trash_dir):
-                for file_name in os.listdir(self.trash_dir):
-                    file_path = os.path.join(self.trash_dir, file_name)
-                    
-                    # 获取文件的最后修改时间
-                    file_mod_time = os.path.getmtime(file_path)
-                    
-                    # 如果文件超过过期时间，则删除
-                    if file_mod_time < expiry_timestamp:
-                        os.remove(file_path)
-                        print(f"删除过期垃圾文件: {file_name}")
-        except Exception as e:
-            print(f"清理垃圾桶时出错: {e}")
+    def start_background_load(self):
+        """在后台依次加载历史记录索引和账本、模板，并清理过期的备份
+
+        每一步完成后回到主线程处理。历史记录加载完成之前就可以新建计算，
+        期间保存的记录在加载完成后再加入索引。
+        """
+        self.history_loading = True
+        self.history_label.setText("历史记录（加载中…）")
+        self.startup_loader.submit("历史记录", profiler.call, "加载历史记录", self.storage.load)
+        self.startup_loader.submit("模板", profiler.call, "加载模板", self.storage.load_templates)
+        self.startup_loader.submit("垃圾桶", profiler.call, "清理垃圾桶",
+                                   self.storage.clean_trash, self.trash_expiry_days)
+    
+    def on_startup_stage_loaded(self, stage, result, error):
+        """后台加载的一步完成（在主线程中执行）"""
+        if stage == "历史记录":
+            self.history_loading = False
+            self.history_label.setText("历史记录")
+            if error is not None:
+                QMessageBox.warning(self, "加载失败", f"无法加载历史记录: {str(error)}")
+            
+            # 加载期间保存的记录，现在更新索引和账本
+            for calc_id in self.deferred_index_updates:
+                if calc_id in self.calculations:
+                    self.history_index.update(calc_id, self.calculations[calc_id], save=False)
+                    self.ledger.update(calc_id, self.calculations[calc_id], save=False)
+            self.deferred_index_updates.clear()
+            self.schedule_metadata_save()
+            
+            self.fill_history_list_in_chunks()
+            profiler.mark("历史记录可用")
+        elif stage == "模板":
+            if error is not None:
+                QMessageBox.warning(self, "加载失败", f"无法加载模板: {str(error)}")
+                return
+            # 加载期间新保存的模板已在 self.templates 中，保留它们
+            result.update(self.templates)
+            self.templates = result
+        elif stage == "垃圾桶":
+            if error is not None:
+                print(f"清理垃圾桶时出错: {error}")
+    
+    def fill_history_list_in_chunks(self):
+        """分批把历史记录加入侧边栏，记录很多时界面在填充期间也能响应"""
+        self.history_list.clear()
+        self.history_fill_generation += 1
+        generation = self.history_fill_generation
+        entries = self.history_index.search(self.history_search_input.text())
+        
+        def add_chunk(start):
+            # 期间列表已被重新填充，这一批作废
+            if generation != self.history_fill_generation:
+                return
+            for calc_id, entry in entries[start:start + self.history_chunk_size]:
+                item = QListWidgetItem(entry["标题"])
+                item.setData(Qt.ItemDataRole.UserRole, calc_id)
+                self.history_list.addItem(item)
+            if start + self.history_chunk_size < len(entries):
+                QTimer.singleShot(0, lambda: add_chunk(start + self.history_chunk_size))
+        
+        add_chunk(0)
     
     def load_history(self):
-        """加载所有历史记录"""
+        """加载历史记录索引并刷新侧边栏"""
+        # 等待启动时的后台加载结束，避免两个线程同时读取索引
+        self.startup_loader.flush()
+        # 先写完索引和账本未保存的修改，重新读取时才是最新的内容
+        self.flush_metadata_saves()
+        self.metadata_writer.flush()
         try:
-            # 清空当前历史记录
-            self.calculations = {}
+            # 清空当前历史记录（记录内容在打开时才加载）
+            self.calculations.clear()
             self.history_list.clear()
             
-            # 遍历history目录中的所有JSON文件
-            if os.path.exists(self.history_dir):
-                for file_name in os.listdir(self.history_dir):
-                    if file_name.endswith('.json'):
-                        file_path = os.path.join(self.history_dir, file_name)
-                        calculation_id = file_name.replace('.json', '')
-                        
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            calculation_data = json.load(f)
-                            self.calculations[calculation_id] = calculation_data
+            # 读取索引和账本（JSON 存储只解析新增或已修改的文件）
+            self.storage.load()
             
             # 更新历史记录列表
             self.update_history_list()
         except Exception as e:
             QMessageBox.warning(self, "加载失败", f"无法加载历史记录: {str(e)}")
     
+    def refresh_history_item(self, calc_id, old_entry):
+        """索引条目更新后只刷新侧边栏中对应的一项
+
+        新记录、日期有变化（排序位置可能改变）或正在搜索（是否匹配可能改变）时
+        重新生成整个列表。
+        """
+        entry = self.history_index.get(calc_id)
+        if (entry is None or old_entry is None or entry.get("日期") != old_entry.get("日期")
+                or self.history_search_input.text().strip()):
+            self.update_history_list()
+            return
+        for item in self.history_list.findItems(old_entry["标题"], Qt.MatchFlag.MatchExactly):
+            if item.data(Qt.ItemDataRole.UserRole) == calc_id:
+                item.setText(entry["标题"])
+                return
+        # 列表还在分批填充、尚未加入这一项
+        self.update_history_list()
+    
+    @tracer.traced("update_history_list")
     def update_history_list(self):
         """更新历史记录列表"""
+        # 索引还在后台加载，加载完成后会分批填充列表
+        if self.history_loading:
+            return
+        self.history_fill_generation += 1
+        
         # 清空列表
         self.history_list.clear()
         
-        # 历史记录列表
-        history_items = []
-        
-        # 遍历history文件夹
-        for file in os.listdir(self.history_dir):
-            if file.endswith(".json"):
-                # 构建完整路径
-                file_path = os.path.join(self.history_dir, file)
-                
-                # 读取文件内容
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        
-                    # 获取计算ID
-                    calc_id = file.replace(".json", "")
-                    
-                    # 获取日期和标题
-                    date = data.get("日期", "未知日期")
-                    title = data.get("标题", f"计算 {date}")
-                    # 移除人数显示
-                    # people_count = data.get("人数", len(data.get("人员", [])))
-                    
-                    # 将数据添加到计算字典
-                    self.calculations[calc_id] = data
-                    
-                    # 创建列表项，只显示标题
-                    display_text = title
-                    
-                    # 添加到历史记录列表
-                    history_items.append((date, calc_id, display_text))
-                    
-                except Exception as e:
-                    print(f"读取历史记录文件 {file} 时出错: {e}")
-        
-        # 按日期排序（最新的在前面）
-        history_items.sort(key=lambda x: x[0], reverse=True)
-        
-        # 将排序后的项添加到列表中
-        for _, calc_id, display_text in history_items:
-            item = QListWidgetItem(display_text)
+        # 从索引中按日期排序（最新的在前面），只显示标题；
+        # 搜索框有内容时只显示匹配的记录（由倒排索引查询，不读取记录内容）
+        for calc_id, entry in self.history_index.search(self.history_search_input.text()):
+            item = QListWidgetItem(entry["标题"])
             item.setData(Qt.ItemDataRole.UserRole, calc_id)
             self.history_list.addItem(item)
+        tracer.annotate(items=self.history_list.count())
     
+    @profiler.profiled("加载记录")
     def load_calculation_from_history(self, item):
         # 获取选中项的数据
         # 如果 item 是 QListWidgetItem，则从中获取数据
@@ -1645,9 +1978,10 @@ class ExpenseCalculator(QMainWindow):
                 
                 # 深拷贝数据，防止意外修改原始数据
                 import copy
-                self.people_data = copy.deepcopy(calculation_data.get("数据", {}))
+                self.people_data = copy.deepcopy(calculation_data.get("数据", BetMatrix()))
                 
                 # 每次切换历史记录时，清除旧的内容页面 (除了欢迎页)
+                self.detach_bet_grid_page()
                 while self.content_stack.count() > 1:
                      widget = self.content_stack.widget(1)
                      self.content_stack.removeWidget(widget)
@@ -1763,13 +2097,13 @@ class ExpenseCalculator(QMainWindow):
         self.current_calculation_id = calculation_id
         
         # 清空人员数据
-        self.people_data = {}
+        self.people_data = BetMatrix()
         
         # 如果有指定的计算ID
         if calculation_id is not None and calculation_id in self.calculations:
             # 深拷贝数据
             import copy
-            self.people_data = copy.deepcopy(self.calculations[calculation_id].get("数据", {}))
+            self.people_data = copy.deepcopy(self.calculations[calculation_id].get("数据", BetMatrix()))
         
         # 加载人员列表
         self.load_people_list()
@@ -1820,19 +2154,24 @@ class ExpenseCalculator(QMainWindow):
         # 获取计算ID
         calc_id = item.data(Qt.ItemDataRole.UserRole)
         
-        # 从文件系统中删除
-        file_path = os.path.join(self.history_dir, f"{calc_id}.json")
+        # 从存储中删除（先取消并等待该记录的后台保存）
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            self.save_writer.discard(calc_id)
+            self.save_writer.flush()
+            self.storage.delete_record(calc_id)
                 
-            # 从内存中删除
+            # 从内存和索引中删除
             if calc_id in self.calculations:
                 del self.calculations[calc_id]
+            self.history_index.remove(calc_id, save=False)
+            self.ledger.remove(calc_id, save=False)
+            self.schedule_metadata_save()
                 
-            # 更新列表
-            self.update_history_list()
-            
+            # 从列表中删除项
+            row = self.history_list.row(item)
+            if row >= 0:
+                self.history_list.takeItem(row)
+
             # 如果删除的是当前正在查看的记录，返回欢迎页面
             if calc_id == self.current_calculation_id:
                 self.current_calculation_id = None
@@ -1850,16 +2189,8 @@ class ExpenseCalculator(QMainWindow):
             # 清空当前模板
             self.templates = {}
             
-            # 遍历templates目录中的所有JSON文件
-            if os.path.exists(self.templates_dir):
-                for file_name in os.listdir(self.templates_dir):
-                    if file_name.endswith('.json'):
-                        file_path = os.path.join(self.templates_dir, file_name)
-                        template_name = file_name.replace('.json', '')
-                        
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            template_data = json.load(f)
-                            self.templates[template_name] = template_data
+            # 读取存储中的所有模板
+            self.templates = self.storage.load_templates()
         except Exception as e:
             QMessageBox.warning(self, "加载失败", f"无法加载模板: {str(e)}")
     
@@ -1883,12 +2214,8 @@ class ExpenseCalculator(QMainWindow):
             QMessageBox.warning(self, "错误", "模板名称包含非法字符！")
             return
             
-        # 生成文件名
-        file_name = f"{template_name}.json"
-        file_path = os.path.join(self.templates_dir, file_name)
-        
         # 检查是否已存在
-        if os.path.exists(file_path):
+        if self.storage.template_exists(template_name):
             reply = QMessageBox.question(
                 self, "确认覆盖", 
                 f"模板 \"{template_name}\" 已存在！是否覆盖？",
@@ -1898,16 +2225,15 @@ class ExpenseCalculator(QMainWindow):
             if reply != QMessageBox.StandardButton.Yes:
                 return
         
-        # 准备模板数据
+        # 准备模板数据（人员名单复制为列表，之后修改记录不会影响模板）
         template_data = {
-            "人员": self.calculations[self.current_calculation_id]["人员"],
+            "人员": list(self.calculations[self.current_calculation_id]["人员"]),
             "人数": len(self.calculations[self.current_calculation_id]["人员"])
         }
         
-        # 保存到文件
+        # 保存到存储
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(template_data, f, ensure_ascii=False, indent=2)
+            self.storage.save_template(template_name, template_data)
             
             # 更新模板字典
             self.templates[template_name] = template_data
@@ -1991,11 +2317,9 @@ class ExpenseCalculator(QMainWindow):
         if reply != QMessageBox.StandardButton.Yes:
             return
             
-        # 从文件系统中删除
-        file_path = os.path.join(self.templates_dir, f"{template_name}.json")
+        # 从存储中删除
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            self.storage.delete_template(template_name)
                 
             # 从内存中删除
             if template_name in self.templates:
@@ -2031,32 +2355,26 @@ class ExpenseCalculator(QMainWindow):
         
         # 获取当前计算记录
         current_calc = self.calculations[self.current_calculation_id]
-        current_person_names = current_calc.get("人员", [])
-        current_data = current_calc.get("数据", {})
+        calc_round = Round(current_calc)
         
-        # 合并人员列表，处理重复
+        # 合并人员列表，处理重复（人员名单为 PeopleList，判断是否已存在为 O(1)）
         duplicates = []
         added_count = 0
+        entries = []
         for name in template_person_names:
-            if name not in current_person_names:
-                current_person_names.append(name)
-                # 为新添加的人员初始化空的投注数据
-                if name not in current_data:
-                    current_data[name] = {}
+            # 新添加的人员同时初始化空的投注数据并更新人数
+            if calc_round.add_person(name):
+                entries.append(add_person_entry(name))
                 added_count += 1
             else:
                 duplicates.append(name)
-                
-        # 更新计算记录
-        current_calc["人员"] = current_person_names
-        current_calc["数据"] = current_data # 更新数据字典以包含新人员
-        current_calc["人数"] = len(current_person_names)
         
         # 更新内存中的 people_data (以防万一)
-        self.people_data = current_data
+        self.people_data = calc_round.bets
 
-        # 保存当前计算
-        self.save_current_calculation()
+        # 保存当前计算（新增的人员追加到修改日志）
+        if entries:
+            self.commit_edits(entries)
 
         # 刷新主计算页面的人员列表和总览
         self.load_people_list() 
@@ -2094,17 +2412,7 @@ class ExpenseCalculator(QMainWindow):
             record_title = new_title.strip() if new_title.strip() else default_title
             
             # 创建新计算结构
-            self.calculations[new_calc_id] = {
-                "日期": calc_date,
-                "创建时间": calc_date,
-                "标题": record_title,
-                "人员": [],
-                "人数": 0,
-                "数据": {},
-                "开奖设置": {"中奖号码": None, "赔率": None},
-                "总览": {},
-                "用户结果": {}
-            }
+            self.calculations[new_calc_id] = Round.new(record_title, calc_date).record
             
             # 设置当前计算ID
             self.current_calculation_id = new_calc_id
@@ -2199,15 +2507,18 @@ class ExpenseCalculator(QMainWindow):
         # 获取计算ID
         calc_id = item.data(Qt.ItemDataRole.UserRole)
         
-        # 从文件系统中删除
-        file_path = os.path.join(self.history_dir, f"{calc_id}.json")
+        # 从存储中删除（先取消并等待该记录的后台保存）
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            self.save_writer.discard(calc_id)
+            self.save_writer.flush()
+            self.storage.delete_record(calc_id)
                 
-            # 从内存中删除
+            # 从内存和索引中删除
             if calc_id in self.calculations:
                 del self.calculations[calc_id]
+            self.history_index.remove(calc_id, save=False)
+            self.ledger.remove(calc_id, save=False)
+            self.schedule_metadata_save()
                 
             # 从列表中删除项
             row = self.history_list.row(item)
@@ -2226,21 +2537,33 @@ class ExpenseCalculator(QMainWindow):
             QMessageBox.warning(self, "删除失败", f"无法删除记录: {str(e)}")
 
     def save_person_details(self, person_name, category_inputs):
-        # 确保该人员的数据字典已初始化
-        if person_name not in self.people_data:
-            self.people_data[person_name] = {}
-        
-        # 保存各个分类的金额
+        # 先解析全部输入，有无效输入时不做任何修改
+        new_values = {}
         for category, input_field in category_inputs.items():
             try:
-                value = float(input_field.text()) if input_field.text() else 0
-                self.people_data[person_name][category] = value
+                new_values[category] = float(input_field.text()) if input_field.text() else 0
             except ValueError:
                 QMessageBox.warning(self, "输入错误", f"请为 {category} 输入有效的数字金额")
                 return
         
-        # 保存当前计算
-        self.save_current_calculation()
+        calculation = self.calculations[self.current_calculation_id]
+        calculation["数据"] = self.people_data
+        calc_round = Round(calculation)
+        
+        # 确保该人员的数据已初始化
+        entries = []
+        if person_name not in self.people_data:
+            calc_round.add_person(person_name)
+            entries.append(add_person_entry(person_name))
+        
+        # 只记录金额发生变化的号码
+        for category, value in new_values.items():
+            if calc_round.set_bet(person_name, category, value):
+                entries.append(bet_entry(person_name, category, self.people_data[person_name].get(category, 0)))
+        
+        # 将修改追加到修改日志
+        if entries:
+            self.commit_edits(entries)
         
         # 更新总费用显示
         self.update_all_totals()
@@ -2248,50 +2571,235 @@ class ExpenseCalculator(QMainWindow):
         # 返回到上一页
         self.return_from_details()
 
+    def import_bets_from_csv(self):
+        """从 CSV 文件（每行 人员,号码,金额）批量导入投注到当前计算"""
+        if not self.current_calculation_id or self.current_calculation_id not in self.calculations:
+            QMessageBox.warning(self, "错误", "没有当前计算记录")
+            return
+        
+        file_path, _ = QFileDialog.getOpenFileName(self, "导入投注", "", "CSV 文件 (*.csv);;所有文件 (*)")
+        if not file_path:
+            return
+        
+        calculation = self.calculations[self.current_calculation_id]
+        calculation["数据"] = self.people_data
+        try:
+            # 逐行解析并校验，读取成功后才写入当前记录
+            result = import_bets_csv(Round(calculation), file_path)
+        except Exception as e:
+            QMessageBox.warning(self, "导入失败", f"无法导入投注: {str(e)}")
+            return
+        
+        message = f"已导入 {result.rows} 行（{result.bets} 笔投注），新增 {len(result.new_people)} 位用户。"
+        if result.error_count:
+            message += f"\n跳过 {result.error_count} 行无效数据：\n" + "\n".join(result.errors[:10])
+            if result.error_count > 10:
+                message += "\n……"
+        
+        if result.rows:
+            # 全部导入后只刷新一次列表、结算一次并保存一次
+            self.people_data = calculation["数据"]
+            self.load_people_list()
+            self.update_all_totals()
+            self.save_current_calculation()
+        
+        QMessageBox.information(self, "导入完成", message)
+    
+    def iter_export_records(self, calc_ids, errors):
+        """逐条提供要导出的记录：已在内存中的记录直接使用（包括尚未保存的修改），
+        其它记录从存储读取，用完即丢弃；读取出错的记录跳过并记入 errors"""
+        for calc_id in calc_ids:
+            if self.calculations.is_loaded(calc_id):
+                yield calc_id, self.calculations[calc_id]
+            else:
+                yield from iter_stored_records(self.storage, (calc_id,), errors)
+    
+    def export_records_to_csv(self, calc_ids, default_name):
+        """把记录的投注、用户结果和总览导出为 CSV 文件"""
+        file_path, _ = QFileDialog.getSaveFileName(self, "导出为 CSV", default_name, "CSV 文件 (*.csv)")
+        if not file_path:
+            return
+        
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        errors = []
+        try:
+            count = write_csv(file_path, iter_export_rows(self.iter_export_records(calc_ids, errors)))
+        except Exception as e:
+            QApplication.restoreOverrideCursor()
+            QMessageBox.warning(self, "导出失败", f"无法导出记录: {str(e)}")
+            return
+        QApplication.restoreOverrideCursor()
+        
+        message = f"已导出 {len(calc_ids) - len(errors)} 条记录（{count} 行）。"
+        if not errors:
+            QMessageBox.information(self, "导出成功", message)
+            return
+        message += f"\n跳过 {len(errors)} 条无法读取的记录：\n" + "\n".join(
+            f"{calc_id}: {error}" for calc_id, error in errors[:10])
+        if len(errors) > 10:
+            message += "\n……"
+        QMessageBox.warning(self, "部分记录未导出", message)
+    
+    def show_ledger_dialog(self):
+        """显示每个人跨期的累计投注、中奖和盈亏，可按日期范围查询"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("客户账本")
+        dialog.resize(600, 450)
+        
+        layout = QVBoxLayout(dialog)
+        
+        # 日期范围（可以只写年月或留空）
+        range_layout = QHBoxLayout()
+        since_input = QLineEdit()
+        since_input.setPlaceholderText("开始日期，如 2024-01-01")
+        until_input = QLineEdit()
+        until_input.setPlaceholderText("结束日期，如 2024-01-31")
+        query_button = QPushButton("查询")
+        query_button.setObjectName("actionButton")
+        range_layout.addWidget(since_input)
+        range_layout.addWidget(QLabel("至"))
+        range_layout.addWidget(until_input)
+        range_layout.addWidget(query_button)
+        layout.addLayout(range_layout)
+        
+        ledger_table = QTableWidget(0, 5)
+        ledger_table.setHorizontalHeaderLabels(["用户", "期数", "投注总额", "中奖金额", "盈亏"])
+        ledger_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        ledger_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        ledger_table.verticalHeader().setVisible(False)
+        ledger_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(ledger_table)
+        
+        total_label = QLabel()
+        layout.addWidget(total_label)
+        
+        def run_query():
+            summary = self.ledger.query(since_input.text().strip() or None, until_input.text().strip() or None)
+            ledger_table.setRowCount(len(summary))
+            for row, person in enumerate(sorted(summary)):
+                totals = summary[person]
+                values = [person, str(totals["期数"]), f"{totals['投注总额']:.2f}",
+                          f"{totals['中奖金额']:.2f}", f"{totals['盈亏']:+.2f}"]
+                for column, text in enumerate(values):
+                    cell = QTableWidgetItem(text)
+                    if column > 0:
+                        cell.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                    if column == 4:
+                        # 根据盈亏设置颜色
+                        cell.setForeground(QColor("#4CAF50") if totals["盈亏"] >= 0 else QColor("#f44336"))
+                    ledger_table.setItem(row, column, cell)
+            total_bets = sum(totals["投注总额"] for totals in summary.values())
+            total_winnings = sum(totals["中奖金额"] for totals in summary.values())
+            total_label.setText(f"合计  投注总额: {total_bets:.2f}  中奖金额: {total_winnings:.2f}  "
+                                f"商家盈亏: {total_bets - total_winnings:.2f}")
+        
+        query_button.clicked.connect(run_query)
+        run_query()
+        
+        close_button = QPushButton("关闭")
+        close_button.clicked.connect(dialog.accept)
+        layout.addWidget(close_button)
+        
+        dialog.exec()
+    
+    def show_diagnostics_dialog(self):
+        """显示各操作最近的耗时分布（p50 / p95）、数量和慢操作日志"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("性能诊断")
+        dialog.resize(760, 560)
+        
+        layout = QVBoxLayout(dialog)
+        
+        summary_label = QLabel()
+        layout.addWidget(summary_label)
+        
+        stats_table = QTableWidget(0, 6)
+        stats_table.setHorizontalHeaderLabels(["操作", "次数", "p50 (ms)", "p95 (ms)", "最长 (ms)", "平均数量"])
+        stats_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        stats_table.verticalHeader().setVisible(False)
+        stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        stats_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(stats_table)
+        
+        slow_label = QLabel()
+        slow_label.setObjectName("sectionTitle")
+        layout.addWidget(slow_label)
+        
+        slow_table = QTableWidget(0, 4)
+        slow_table.setHorizontalHeaderLabels(["时间", "操作", "耗时 (ms)", "数量"])
+        slow_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        slow_table.verticalHeader().setVisible(False)
+        slow_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        slow_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(slow_table)
+        
+        def format_counts(counts):
+            return "  ".join(f"{key}={value:g}" for key, value in counts.items())
+        
+        def set_row(table, row, values):
+            for column, text in enumerate(values):
+                cell = QTableWidgetItem(text)
+                if text and text[0].isdigit() and column > 0:
+                    cell.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                table.setItem(row, column, cell)
+        
+        def refresh():
+            stats = tracer.stats()
+            summary_label.setText(f"最近 {sum(item['次数'] for item in stats.values())} 次操作")
+            stats_table.setRowCount(len(stats))
+            for row, name in enumerate(sorted(stats)):
+                item = stats[name]
+                set_row(stats_table, row, [name, str(item["次数"]), f"{item['p50']:.1f}", f"{item['p95']:.1f}",
+                                           f"{item['最长']:.1f}", format_counts(item["数量"])])
+            
+            # 最新的慢操作在最上面
+            slow_spans = tracer.slow_spans()[::-1]
+            slow_label.setText(f"慢操作（超过 {tracer.slow_threshold_ms} ms）")
+            slow_table.setRowCount(len(slow_spans))
+            for row, span in enumerate(slow_spans):
+                set_row(slow_table, row, [datetime.fromtimestamp(span.time).strftime("%Y-%m-%d %H:%M:%S"),
+                                          span.name, f"{span.duration * 1000:.1f}", format_counts(span.counts)])
+        
+        def export():
+            file_path, _ = QFileDialog.getSaveFileName(dialog, "导出诊断数据", "diagnostics.json", "JSON (*.json)")
+            if not file_path:
+                return
+            try:
+                from core.fileio import atomic_write_json
+                atomic_write_json(file_path, {
+                    "统计": tracer.stats(),
+                    "慢操作": [span._asdict() for span in tracer.slow_spans()],
+                    "最近操作": [span._asdict() for span in tracer.spans()]
+                }, indent=2)
+            except Exception as e:
+                QMessageBox.warning(dialog, "导出失败", f"无法导出诊断数据: {str(e)}")
+        
+        def clear():
+            tracer.clear()
+            refresh()
+        
+        buttons_layout = QHBoxLayout()
+        for text, handler in (("刷新", refresh), ("导出", export), ("清空", clear), ("关闭", dialog.accept)):
+            button = QPushButton(text)
+            button.clicked.connect(handler)
+            buttons_layout.addWidget(button)
+        layout.addLayout(buttons_layout)
+        
+        refresh()
+        dialog.exec()
+    
     def restore_from_trash(self, original_file_name):
         """从垃圾桶恢复文件"""
         try:
             # 获取计算ID
             calc_id = original_file_name.replace('.json', '')
             
-            # 查找垃圾桶中与这个计算ID相关的最新备份
-            latest_backup = None
-            latest_time = 0
+            # 通过版本索引直接取得最近的备份
+            latest_backup = self.versions.latest(calc_id)
             
-            for file_name in os.listdir(self.trash_dir):
-                # 检查文件是否与当前计算ID相关
-                if file_name.startswith(f"{calc_id}_") and file_name.endswith('.json'):
-                    file_path = os.path.join(self.trash_dir, file_name)
-                    file_time = os.path.getmtime(file_path)
-                    
-                    # 找到最新的备份
-                    if file_time > latest_time:
-                        latest_time = file_time
-                        latest_backup = file_name
-            
-            # 如果找到备份文件
-            if latest_backup:
-                # 构建路径
-                backup_path = os.path.join(self.trash_dir, latest_backup)
-                original_path = os.path.join(self.history_dir, original_file_name)
-                
-                # 恢复文件
-                shutil.copy2(backup_path, original_path)
-                
-                # 重新加载历史记录
-                self.load_history()
-                
-                # 如果当前正在查看的是被恢复的记录，则重新加载它
-                if calc_id == self.current_calculation_id:
-                    # 找到对应的列表项
-                    for i in range(self.history_list.count()):
-                        item = self.history_list.item(i)
-                        item_id = item.data(Qt.ItemDataRole.UserRole)
-                        if item_id == calc_id:
-                            # 重新加载
-                            self.load_calculation_from_history(item)
-                            break
-                
+            # 如果找到备份
+            if latest_backup is not None:
+                self.restore_record_data(calc_id, latest_backup)
                 QMessageBox.information(self, "恢复成功", "已恢复到上一个版本。")
             else:
                 QMessageBox.warning(self, "恢复失败", "找不到备份文件。")
@@ -2299,6 +2807,26 @@ class ExpenseCalculator(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "恢复失败", f"恢复文件时出错: {str(e)}")
     
+    def restore_record_data(self, calc_id, data):
+        """用备份内容覆盖历史记录文件，并刷新界面"""
+        # 先等待后台保存完成，避免被覆盖；恢复后丢弃修改日志
+        self.save_writer.flush()
+        self.storage.restore_record(calc_id, data)
+        
+        # 重新加载历史记录
+        self.load_history()
+        
+        # 如果当前正在查看的是被恢复的记录，则重新加载它
+        if calc_id == self.current_calculation_id:
+            # 找到对应的列表项
+            for i in range(self.history_list.count()):
+                item = self.history_list.item(i)
+                item_id = item.data(Qt.ItemDataRole.UserRole)
+                if item_id == calc_id:
+                    # 重新加载
+                    self.load_calculation_from_history(item)
+                    break
+    
     def show_trash_contents(self):
         """显示垃圾桶内容"""
         # 创建对话框
@@ -2317,34 +2845,31 @@ class ExpenseCalculator(QMainWindow):
         trash_list = QListWidget()
         layout.addWidget(trash_list)
         
-        # 获取垃圾桶中的文件并按修改时间排序
+        # 从版本索引中获取所有备份版本（不读取备份内容）
         trash_files = []
-        for file_name in os.listdir(self.trash_dir):
-            if file_name.endswith('.json'):
-                file_path = os.path.join(self.trash_dir, file_name)
-                mod_time = os.path.getmtime(file_path)
-                
-                # 提取计算ID
-                parts = file_name.split('_')
-                calc_id = parts[0]
-                
-                # 获取原始计算的标题
-                title = "未知记录"
-                if calc_id in self.calculations:
-                    title = self.calculations[calc_id].get("标题", "未知记录")
-                
-                # 格式化时间
-                backup_time = datetime.fromtimestamp(mod_time).strftime("%Y-%m-%d %H:%M:%S")
-                
-                trash_files.append((file_name, title, backup_time, mod_time))
-        
-        # 按修改时间排序（最新的在前面）
-        trash_files.sort(key=lambda x: x[3], reverse=True)
+        for calc_id in self.versions.record_ids():
+            for entry in self.versions.versions(calc_id):
+                backup = {"记录": calc_id, "版本": entry["版本"]}
+                trash_files.append((backup, entry.get("标题", "未知记录"), entry["时间"]))
+        
+        # 旧格式的整份备份文件
+        for file_name, calc_id, mod_time in self.storage.legacy_backups():
+            # 获取原始计算的标题
+            title = "未知记录"
+            header = self.calculations.header(calc_id)
+            if header:
+                title = header.get("标题", "未知记录")
+            trash_files.append(({"记录": calc_id, "文件": file_name}, title, mod_time))
+        
+        # 按备份时间排序（最新的在前面）
+        trash_files.sort(key=lambda x: x[2], reverse=True)
         
         # 填充列表
-        for file_name, title, backup_time, _ in trash_files:
+        for backup, title, mod_time in trash_files:
+            # 格式化时间
+            backup_time = datetime.fromtimestamp(mod_time).strftime("%Y-%m-%d %H:%M:%S")
             item = QListWidgetItem(f"{title} (备份于 {backup_time})")
-            item.setData(Qt.ItemDataRole.UserRole, file_name)
+            item.setData(Qt.ItemDataRole.UserRole, backup)
             trash_list.addItem(item)
         
         # 添加按钮
@@ -2377,47 +2902,29 @@ class ExpenseCalculator(QMainWindow):
             QMessageBox.information(self, "提示", "请先选择要恢复的文件")
             return
             
-        file_name = selected_items[0].data(Qt.ItemDataRole.UserRole)
+        backup = selected_items[0].data(Qt.ItemDataRole.UserRole)
+        calc_id = backup["记录"]
         
-        # 提取计算ID
-        parts = file_name.split('_')
-        if len(parts) >= 2:
-            calc_id = parts[0]
-            original_file = f"{calc_id}.json"
-            
-            # 确认恢复
-            reply = QMessageBox.question(
-                self, "确认恢复", 
-                f"确定要恢复此备份吗？当前的数据将被覆盖。",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-            
-            if reply == QMessageBox.StandardButton.Yes:
-                # 构建路径
-                backup_path = os.path.join(self.trash_dir, file_name)
-                original_path = os.path.join(self.history_dir, original_file)
+        # 确认恢复
+        reply = QMessageBox.question(
+            self, "确认恢复", 
+            f"确定要恢复此备份吗？当前的数据将被覆盖。",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        
+        if reply == QMessageBox.StandardButton.Yes:
+            try:
+                # 还原备份内容
+                if "版本" in backup:
+                    data = self.versions.get(calc_id, backup["版本"])
+                else:
+                    data = self.storage.read_legacy_backup(backup["文件"])
                 
-                try:
-                    # 恢复文件
-                    shutil.copy2(backup_path, original_path)
-                    
-                    # 重新加载历史记录
-                    self.load_history()
-                    
-                    # 如果当前正在查看的是被恢复的记录，则重新加载它
-                    if calc_id == self.current_calculation_id:
-                        # 找到对应的列表项
-                        for i in range(self.history_list.count()):
-                            item = self.history_list.item(i)
-                            item_id = item.data(Qt.ItemDataRole.UserRole)
-                            if item_id == calc_id:
-                                # 重新加载
-                                self.load_calculation_from_history(item)
-                                break
-                    
-                    QMessageBox.information(self, "恢复成功", "已恢复选中的备份。")
-                except Exception as e:
-                    QMessageBox.warning(self, "恢复失败", f"恢复文件时出错: {str(e)}")
+                self.restore_record_data(calc_id, data)
+                
+                QMessageBox.information(self, "恢复成功", "已恢复选中的备份。")
+            except Exception as e:
+                QMessageBox.warning(self, "恢复失败", f"恢复文件时出错: {str(e)}")
     
     def delete_selected_trash(self, trash_list):
         """删除选中的垃圾文件"""
@@ -2426,7 +2933,7 @@ class ExpenseCalculator(QMainWindow):
             QMessageBox.information(self, "提示", "请先选择要删除的文件")
             return
             
-        file_name = selected_items[0].data(Qt.ItemDataRole.UserRole)
+        backup = selected_items[0].data(Qt.ItemDataRole.UserRole)
         
         # 确认删除
         reply = QMessageBox.question(
@@ -2436,11 +2943,13 @@ class ExpenseCalculator(QMainWindow):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            file_path = os.path.join(self.trash_dir, file_name)
             try:
-                # 删除文件
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+                # 删除备份（后台线程可能正在为同一记录添加版本）
+                self.save_writer.flush()
+                if "版本" in backup:
+                    self.versions.delete_version(backup["记录"], backup["版本"])
+                else:
+                    self.storage.delete_legacy_backup(backup["文件"])
                     
                 # 从列表中移除
                 row = trash_list.row(selected_items[0])
@@ -2450,161 +2959,160 @@ class ExpenseCalculator(QMainWindow):
             except Exception as e:
                 QMessageBox.warning(self, "删除失败", f"删除文件时出错: {str(e)}")
 
+    def create_results_panel(self):
+        """在结果区域中创建用户结果表格和本期总览（每个计算页面只创建一次）"""
+        # 添加用户结果区域
+        people_results_frame = QFrame()
+        people_results_frame.setObjectName("summaryFrame")
+        people_results_layout = QVBoxLayout(people_results_frame)
+        
+        people_title = QLabel("用户投注结果")
+        people_title.setObjectName("sectionTitle")
+        people_results_layout.addWidget(people_title)
+        
+        # 表格只绘制可见的行，点击某一行查看该用户详情；
+        # 模型属于表格，页面重建时随表格一起销毁
+        self.results_view = QTableView()
+        self.results_model = ResultsTableModel(self.results_view)
+        self.results_view.setObjectName("resultsTable")
+        self.results_view.setModel(self.results_model)
+        self.results_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.results_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.results_view.setShowGrid(False)
+        self.results_view.setMinimumHeight(220)
+        self.results_view.verticalHeader().setVisible(False)
+        self.results_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.results_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.results_view.clicked.connect(
+            lambda index: self.show_person_details(self.results_model.person_at(index.row())))
+        people_results_layout.addWidget(self.results_view)
+        
+        # 各号码风险表：开奖前查看每个号码开出时的派彩和商家盈亏
+        liability_frame = QFrame()
+        liability_frame.setObjectName("summaryFrame")
+        liability_layout = QVBoxLayout(liability_frame)
+        
+        liability_title = QLabel("各号码风险")
+        liability_title.setObjectName("sectionTitle")
+        liability_layout.addWidget(liability_title)
+        
+        self.liability_view = QTableView()
+        self.liability_model = LiabilityTableModel(self.liability_view)
+        self.liability_view.setObjectName("resultsTable")
+        self.liability_view.setModel(self.liability_model)
+        self.liability_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.liability_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.liability_view.setShowGrid(False)
+        self.liability_view.setMinimumHeight(220)
+        self.liability_view.verticalHeader().setVisible(False)
+        self.liability_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.liability_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        liability_layout.addWidget(self.liability_view)
+        
+        # 将用户结果框架和风险表并排添加到主结果布局
+        results_row = QHBoxLayout()
+        results_row.addWidget(people_results_frame, 3)
+        results_row.addWidget(liability_frame, 2)
+        self.results_layout.addLayout(results_row)
+        self.results_layout.addSpacing(15)
+        
+        # 添加总计区域
+        summary_frame = QFrame()
+        summary_frame.setObjectName("summaryFrame")
+        summary_layout = QVBoxLayout(summary_frame)
+        
+        summary_title = QLabel("本期总览")
+        summary_title.setObjectName("sectionTitle")
+        summary_layout.addWidget(summary_title)
+        
+        # 总投注额
+        total_bet_layout = QHBoxLayout()
+        total_bet_label = QLabel("总投注额:")
+        total_bet_label.setObjectName("summaryLabel")
+        self.total_bet_value = QLabel("0.00")
+        self.total_bet_value.setObjectName("summaryValue")
+        total_bet_layout.addWidget(total_bet_label)
+        total_bet_layout.addStretch()
+        total_bet_layout.addWidget(self.total_bet_value)
+        summary_layout.addLayout(total_bet_layout)
+        
+        # 总派彩额
+        total_win_layout = QHBoxLayout()
+        total_win_label = QLabel("总派彩额:")
+        total_win_label.setObjectName("summaryLabel")
+        self.total_win_value = QLabel("0.00")
+        self.total_win_value.setObjectName("summaryValue")
+        total_win_layout.addWidget(total_win_label)
+        total_win_layout.addStretch()
+        total_win_layout.addWidget(self.total_win_value)
+        summary_layout.addLayout(total_win_layout)
+        
+        # 商家盈亏
+        profit_layout = QHBoxLayout()
+        profit_label = QLabel("商家盈亏:")
+        profit_label.setObjectName("totalLabel") # 使用更醒目的样式
+        self.profit_value = QLabel("0.00")
+        self.profit_value.setObjectName("totalValue") # 使用更醒目的样式
+        profit_layout.addWidget(profit_label)
+        profit_layout.addStretch()
+        profit_layout.addWidget(self.profit_value)
+        summary_layout.addLayout(profit_layout)
+        
+        # 将总计框架添加到主结果布局
+        self.results_layout.addWidget(summary_frame)
+    
+    @tracer.traced("update_results_display")
     def update_results_display(self, results_by_person, total_bets, total_winnings, merchant_profit):
-        """更新主页面的结果显示区域"""
+        """更新主页面的结果显示区域（只刷新变化的行和总览数值）"""
         try:
             # 直接使用保存的布局引用，并检查其有效性
             if self.results_layout is None:
                 print("错误：results_layout 尚未初始化")
                 return
-                
-            # 安全地清除现有内容
-            items_to_remove = []
-            while self.results_layout.count() > 0:
-                items_to_remove.append(self.results_layout.takeAt(0))
-
-            for item in items_to_remove:
-                if item is None: continue
-                widget = item.widget()
-                if widget:
-                    widget.deleteLater()
-                else:
-                    layout_item = item.layout()
-                    if layout_item:
-                        # 递归清除子布局（使用相同安全模式）
-                        sub_items_to_remove = []
-                        while layout_item.count() > 0:
-                            sub_items_to_remove.append(layout_item.takeAt(0))
-                        for sub_item in sub_items_to_remove:
-                            if sub_item is None: continue
-                            sub_widget = sub_item.widget()
-                            if sub_widget:
-                                sub_widget.deleteLater()
-                            else:
-                                inner_layout = sub_item.layout()
-                                if inner_layout:
-                                    inner_items_to_remove = []
-                                    while inner_layout.count() > 0:
-                                        inner_items_to_remove.append(inner_layout.takeAt(0))
-                                    for inner_item in inner_items_to_remove:
-                                        if inner_item and inner_item.widget():
-                                            inner_item.widget().deleteLater()
-            
-            # --- 后续添加新内容的逻辑保持不变 --- 
-            # 添加用户结果区域
-            people_results_frame = QFrame()
-            people_results_frame.setObjectName("summaryFrame")
-            people_results_layout = QVBoxLayout(people_results_frame)
-            
-            people_title = QLabel("用户投注结果")
-            people_title.setObjectName("sectionTitle")
-            people_results_layout.addWidget(people_title)
-            
-            # 按用户名排序显示
-            sorted_persons = sorted(results_by_person.keys())
-
-            for person in sorted_persons:
-                results = results_by_person[person]
-                item_layout = QHBoxLayout()
-                
-                person_button = QPushButton(person)
-                person_button.setObjectName("personButton")
-                # 使用 lambda 确保传递正确的 person 值
-                person_button.clicked.connect(lambda checked, p=person: self.show_person_details(p))
-                
-                bet_amount = results.get("投注总额", 0.0)
-                win_amount = results.get("中奖金额", 0.0)
-                net_result = win_amount - bet_amount # 计算盈亏
-                
-                # 根据盈亏设置颜色
-                if net_result >= 0:
-                    result_color = "#4CAF50" # 绿色
-                else:
-                    result_color = "#f44336" # 红色
-                    
-                result_text = f"投注: {bet_amount:.2f}, 中奖: {win_amount:.2f}, 盈亏: {net_result:+.2f}"
-                result_label = QLabel(result_text)
-                result_label.setObjectName("summaryValue")
-                result_label.setAlignment(Qt.AlignmentFlag.AlignRight)
-                # 应用颜色 (注意: 可能需要调整样式表优先级或使用更具体的选择器)
-                result_label.setStyleSheet(f"color: {result_color};") 
-                result_label.setMinimumWidth(250) # 增加最小宽度以容纳新字段
-                
-                item_layout.addWidget(person_button)
-                item_layout.addStretch()
-                item_layout.addWidget(result_label)
-                
-                people_results_layout.addLayout(item_layout)
-            
-            # 将用户结果框架添加到主结果布局
-            self.results_layout.addWidget(people_results_frame)
-            self.results_layout.addSpacing(15)
-            
-            # 添加总计区域
-            summary_frame = QFrame()
-            summary_frame.setObjectName("summaryFrame")
-            summary_layout = QVBoxLayout(summary_frame)
-            
-            summary_title = QLabel("本期总览")
-            summary_title.setObjectName("sectionTitle")
-            summary_layout.addWidget(summary_title)
-            
-            # 总投注额
-            total_bet_layout = QHBoxLayout()
-            total_bet_label = QLabel("总投注额:")
-            total_bet_label.setObjectName("summaryLabel")
-            total_bet_value = QLabel(f"{total_bets:.2f}")
-            total_bet_value.setObjectName("summaryValue")
-            total_bet_layout.addWidget(total_bet_label)
-            total_bet_layout.addStretch()
-            total_bet_layout.addWidget(total_bet_value)
-            summary_layout.addLayout(total_bet_layout)
-            
-            # 总派彩额
-            total_win_layout = QHBoxLayout()
-            total_win_label = QLabel("总派彩额:")
-            total_win_label.setObjectName("summaryLabel")
-            total_win_value = QLabel(f"{total_winnings:.2f}")
-            total_win_value.setObjectName("summaryValue")
-            total_win_layout.addWidget(total_win_label)
-            total_win_layout.addStretch()
-            total_win_layout.addWidget(total_win_value)
-            summary_layout.addLayout(total_win_layout)
-            
-            # 商家盈亏
-            profit_layout = QHBoxLayout()
-            profit_label = QLabel("商家盈亏:")
-            profit_label.setObjectName("totalLabel") # 使用更醒目的样式
-            profit_value = QLabel(f"{merchant_profit:.2f}")
-            profit_value.setObjectName("totalValue") # 使用更醒目的样式
+            
+            # results_by_person 为 None 时表示用户结果已单独更新
+            if results_by_person is not None:
+                self.results_model.update_results(results_by_person)
+                tracer.annotate(people=len(results_by_person))
+            
+            # 风险表直接读取投注矩阵维护的各号码合计
+            if self.current_calculation_id in self.calculations:
+                self.liability_model.update_table(Round(self.calculations[self.current_calculation_id]).liability())
+            
+            self.total_bet_value.setText(f"{total_bets:.2f}")
+            self.total_win_value.setText(f"{total_winnings:.2f}")
+            self.profit_value.setText(f"{merchant_profit:.2f}")
             # 根据盈亏设置颜色
             if merchant_profit >= 0:
-                profit_value.setStyleSheet("color: #4CAF50;") # 绿色表示盈利或持平
+                self.profit_value.setStyleSheet("color: #4CAF50;") # 绿色表示盈利或持平
             else:
-                profit_value.setStyleSheet("color: #f44336;") # 红色表示亏损
-                
-            profit_layout.addWidget(profit_label)
-            profit_layout.addStretch()
-            profit_layout.addWidget(profit_value)
-            summary_layout.addLayout(profit_layout)
-            
-            # 将总计框架添加到主结果布局
-            self.results_layout.addWidget(summary_frame)
+                self.profit_value.setStyleSheet("color: #f44336;") # 红色表示亏损
 
         except RuntimeError as e:
             # 捕获特定错误，打印提示信息
             print(f"运行时错误 (可能对象已删除) in update_results_display: {e}")
-            # 可以选择在这里尝试重新获取 self.results_layout 的引用，
-            # 但更简单的做法是忽略这次更新，等待下一次UI交互触发的更新。
+            # 忽略这次更新，等待下一次UI交互触发的更新。
             pass 
         except Exception as e:
             print(f"更新结果显示时出错: {e}")
             import traceback
             traceback.print_exc()
 
-
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
+    import argparse
+    arg_parser = argparse.ArgumentParser(description="多事件计算器")
+    arg_parser.add_argument("--profile", action="store_true",
+                            help="性能分析模式：记录启动各阶段和主要操作的耗时")
+    arg_parser.add_argument("--profile-dir",
+                            help="同时把每次操作的 cProfile 结果和耗时汇总保存到此目录")
+    args, qt_args = arg_parser.parse_known_args()
+    
+    # 命令行参数或环境变量 CALCULATOR_PROFILE=1 / CALCULATOR_PROFILE_DIR=目录 开启性能分析
+    profiler.configure_from_env()
+    if args.profile or args.profile_dir:
+        profiler.configure(True, args.profile_dir or profiler.output_dir)
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     
     # 设置全局字体
     font = QFont("Microsoft YaHei", 10)
@@ -2976,7 +3484,10 @@ if __name__ == '__main__':
         }
     """
     app.setStyleSheet(dark_stylesheet)
+    profiler.mark("创建应用")
     
-    window = ExpenseCalculator()
+    with profiler.measure("创建窗口"):
+        window = ExpenseCalculator()
     window.show()
+    profiler.mark("显示窗口")
     sys.exit(app.exec())
\ No newline at end of file